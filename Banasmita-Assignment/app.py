@@ -1,8 +1,18 @@
+import os
+import sys
 import streamlit as st
-import pandas as pd
 import numpy as np
 import pickle
-import matplotlib.pyplot as plt
+
+# shared team / venue registry (lives with the IPL engine)
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "ketireddypallyvamshi05@gmail.com_IPL"
+))
+from entities import CORE_TEAMS, model_aliases
+from model_host import ModelClient, RemoteCore, host_available
+from serving import ServingCore, legacy_frame, match_state
 
 # PAGE CONFIG
 st.set_page_config(
@@ -80,26 +90,38 @@ section[data-testid="stSidebar"] {
 </style>
 """, unsafe_allow_html=True)
 
-# LOAD MODEL
-pipe = pickle.load(open("pipe.pkl", "rb"))
+# LOAD MODEL (ONCE PER PROCESS, NOT ON EVERY RERUN)
+@st.cache_resource
+def load_pipe():
+    return pickle.load(open("pipe.pkl", "rb"))
+
+pipe = load_pipe()
+
+# name of this pipe.pkl on the shared model host (serving.LEGACY_PIPES)
+SERVED_AS = "banasmita_pipe.pkl"
+
+def local_core():
+    core = ServingCore()
+    core.add_model(SERVED_AS, pipe)
+    return core
+
+@st.cache_resource
+def load_core():
+    # a running model_host.py already holds this model for every UI;
+    # if it goes away later, the app scores locally
+    if host_available():
+        return RemoteCore(ModelClient(), fallback=local_core)
+    return local_core()
 
 # CONSTANTS (MATCH TRAINING DATA)
-teams = [
-    'Chennai Super Kings',
-    'Delhi Daredevils',
-    'Kings XI Punjab',
-    'Kolkata Knight Riders',
-    'Mumbai Indians',
-    'Rajasthan Royals',
-    'Royal Challengers Bangalore',
-    'Sunrisers Hyderabad'
-]
-
-cities = [
-    'Ahmedabad','Bangalore','Chandigarh','Chennai','Delhi',
-    'Dharamsala','Hyderabad','Jaipur','Kolkata','Mumbai',
-    'Pune','Ranchi'
-]
+# canonical name -> the spelling pipe.pkl was trained on, per column
+encoder = pipe.named_steps["transform"].named_transformers_["cat"]
+batting_names = model_aliases(encoder.categories_[0], "team")
+bowling_names = model_aliases(encoder.categories_[1], "team")
+city_names = model_aliases(encoder.categories_[2], "city")
+
+teams = CORE_TEAMS
+cities = list(city_names)
 
 # SIDEBAR INPUTS (LIKE FILTER PANEL)
 st.sidebar.markdown("## Match Configuration")
@@ -118,47 +140,89 @@ wickets_fallen = st.sidebar.number_input("Wickets Fallen", 0, 10)
 
 predict = st.sidebar.button("Predict Probability")
 
-# HEADER
-st.markdown("## IPL Win Probability Dashboard")
-st.caption("Real-time match outcome analytics powered by machine learning")
-
-st.divider()
-
-# PREDICTION LOGIC
-if predict:
-
-    balls_bowled = int(overs * 6)
-    balls_left = max(0, 120 - balls_bowled)
-    runs_left = target - score
-    wickets_left = 10 - wickets_fallen
-
-    cur_rr = 0 if balls_bowled == 0 else (score * 6) / balls_bowled
-    req_rr = 0 if balls_left == 0 else (runs_left * 6) / balls_left
-
-    input_df = pd.DataFrame({
-        'batting_team': [batting_team],
-        'bowling_team': [bowling_team],
-        'city': [city],
-        'runs_left': [runs_left],
-        'balls_left': [balls_left],
-        'wickets': [wickets_left],
-        'total_runs_x': [target],
-        'cur_run_rate': [cur_rr],
-        'req_run_rate': [req_rr]
-    })
-
-    result = pipe.predict_proba(input_df)
-    win_prob = result[0][1]
-    loss_prob = result[0][0]
-
-    # KPI CARDS (TOP ROW)
+# SHARED PREDICTION CORE (CACHED PER MATCH STATE)
+@st.cache_data(max_entries=1024)
+def predict_state(batting_team, bowling_team, city, target, score, overs, wickets_fallen):
+
+    # one canonical state; the serving core builds the pipe.pkl columns
+    state = match_state(batting_team, bowling_team, target, score,
+                        int(overs * 6), wickets_fallen, city=city)
+
+    win_prob = float(load_core().score(state, [SERVED_AS])[SERVED_AS].iloc[0])
+
+    # the KPI cards show the same numbers the model sees
+    row = legacy_frame(state, None).iloc[0]
+
+    return {
+        "win_prob": win_prob,
+        "loss_prob": 1 - win_prob,
+        "runs_left": int(row["runs_left"]),
+        "balls_left": int(row["balls_left"]),
+        "wickets_left": int(row["wickets"]),
+        "cur_rr": row["cur_run_rate"],
+        "req_rr": row["req_run_rate"],
+    }
+
+# CHARTS (VEGA-LITE SPECS, DRAWN IN THE BROWSER)
+# only the numbers travel to the client; nothing is rasterized or kept
+# open on the server
+@st.cache_data(max_entries=1024)
+def probability_chart(batting_team, bowling_team, win_pct, loss_pct):
+    return {
+        "data": {"values": [
+            {"team": batting_team, "probability": win_pct},
+            {"team": bowling_team, "probability": loss_pct},
+        ]},
+        "mark": {"type": "bar", "cornerRadiusEnd": 4},
+        "encoding": {
+            "x": {"field": "team", "type": "nominal", "sort": None, "title": None,
+                  "axis": {"labelAngle": 0}},
+            "y": {"field": "probability", "type": "quantitative",
+                  "scale": {"domain": [0, 100]}, "title": "Probability (%)"},
+            "color": {"field": "team", "type": "nominal", "legend": None,
+                      "scale": {"range": ["#2563eb", "#94a3b8"]}},
+        },
+        "height": 320,
+    }
+
+# rebuilt from the whole history on every prediction: the chart element
+# does not survive a rerun, so it cannot be extended with add_rows. The
+# history holds at most one point per over value (~120), so this is cheap
+def overs_chart(points):
+    return {
+        "data": {"values": [
+            {"overs": overs, "probability": pct} for overs, pct in points
+        ]},
+        "mark": {"type": "line", "point": True, "color": "#2563eb"},
+        "encoding": {
+            "x": {"field": "overs", "type": "quantitative",
+                  "scale": {"domain": [0, 20]}, "title": "Overs"},
+            "y": {"field": "probability", "type": "quantitative",
+                  "scale": {"domain": [0, 100]}, "title": "Win Probability (%)"},
+        },
+        "height": 240,
+    }
+
+# PROBABILITY-OVER-OVERS HISTORY
+# one point per over value entered for the current chase; a new
+# chase (teams, city or target changed) starts a fresh curve
+def record_point(match, overs, win_prob):
+    history = st.session_state.setdefault("history", {"match": None, "points": {}})
+    if history["match"] != match:
+        history["match"] = match
+        history["points"] = {}
+    history["points"][round(overs, 1)] = round(win_prob * 100, 1)
+    return tuple(sorted(history["points"].items()))
+
+# KPI CARDS (TOP ROW)
+def kpi_panel(batting_team, bowling_team, p):
     c1, c2, c3, c4 = st.columns(4)
 
     with c1:
         st.markdown(f"""
         <div class="card">
             <div class="label">{batting_team}</div>
-            <div class="kpi">{round(win_prob*100)}%</div>
+            <div class="kpi">{round(p["win_prob"]*100)}%</div>
             <div class="label">Win Probability</div>
         </div>
         """, unsafe_allow_html=True)
@@ -167,7 +231,7 @@ if predict:
         st.markdown(f"""
         <div class="card">
             <div class="label">{bowling_team}</div>
-            <div class="kpi">{round(loss_prob*100)}%</div>
+            <div class="kpi">{round(p["loss_prob"]*100)}%</div>
             <div class="label">Win Probability</div>
         </div>
         """, unsafe_allow_html=True)
@@ -176,7 +240,7 @@ if predict:
         st.markdown(f"""
         <div class="card">
             <div class="label">Runs Left</div>
-            <div class="kpi">{runs_left}</div>
+            <div class="kpi">{p["runs_left"]}</div>
         </div>
         """, unsafe_allow_html=True)
 
@@ -184,33 +248,64 @@ if predict:
         st.markdown(f"""
         <div class="card">
             <div class="label">Balls Left</div>
-            <div class="kpi">{balls_left}</div>
+            <div class="kpi">{p["balls_left"]}</div>
         </div>
         """, unsafe_allow_html=True)
 
-    st.divider()
-
-    # ANALYTICS SECTION
+# ANALYTICS SECTION
+def analytics_panel(batting_team, bowling_team, p, points):
     a1, a2 = st.columns([2, 1])
 
     with a1:
         st.markdown("### Probability Comparison")
-        fig, ax = plt.subplots()
-        ax.bar(
-            [batting_team, bowling_team],
-            [win_prob*100, loss_prob*100]
+        st.vega_lite_chart(
+            probability_chart(batting_team, bowling_team,
+                              round(p["win_prob"]*100, 1), round(p["loss_prob"]*100, 1)),
+            use_container_width=True
         )
-        ax.set_ylim(0, 100)
-        ax.set_ylabel("Probability (%)")
-        st.pyplot(fig)
 
     with a2:
         st.markdown("### Match Metrics")
-        st.metric("Current Run Rate", round(cur_rr, 2))
-        st.metric("Required Run Rate", round(req_rr, 2))
-        st.metric("Wickets Remaining", wickets_left)
+        st.metric("Current Run Rate", round(p["cur_rr"], 2))
+        st.metric("Required Run Rate", round(p["req_rr"], 2))
+        st.metric("Wickets Remaining", p["wickets_left"])
+
+    st.progress(p["win_prob"])
+
+    if len(points) > 1:
+        st.markdown("### Win Probability by Over")
+        st.vega_lite_chart(overs_chart(points), use_container_width=True)
+
+# HEADER
+st.markdown("## IPL Win Probability Dashboard")
+st.caption("Real-time match outcome analytics powered by machine learning")
+
+st.divider()
+
+# PREDICTION LOGIC
+if predict:
+
+    p = predict_state(batting_team, bowling_team, city,
+                      target, score, overs, wickets_fallen)
+
+    unseen = [
+        team for team, known in [(batting_team, batting_names), (bowling_team, bowling_names)]
+        if team not in known
+    ]
+    if unseen:
+        st.warning(
+            f"pipe.pkl never saw {', '.join(unseen)} in this role – "
+            "the prediction ignores the team for that side."
+        )
+
+    points = record_point((batting_team, bowling_team, city, target),
+                          overs, p["win_prob"])
+
+    kpi_panel(batting_team, bowling_team, p)
+
+    st.divider()
 
-    st.progress(win_prob)
+    analytics_panel(batting_team, bowling_team, p, points)
 
 else:
     st.info("Use the left panel to configure match details and generate predictions.")
@@ -1,75 +1,110 @@
+import os
+import sys
 import streamlit as st
-import pandas as pd
 import pickle
 
+# the shared team / venue registry lives with the IPL engine
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'ketireddypallyvamshi05@gmail.com_IPL'))
+
+from entities import CORE_TEAMS, model_aliases
+from model_host import ModelClient, RemoteCore, host_available
+from serving import ServingCore, match_state
+
+# load the model once per process, not on every rerun
+
+@st.cache_resource
+def load_pipe():
+    return pickle.load(open('pipe.pkl', 'rb'))
+
+
+def local_core():
+    core = ServingCore()
+    core.add_model('pipe.pkl', load_pipe())
+    return core
+
+
+@st.cache_resource
+def load_core():
+    # a running model_host.py already holds pipe.pkl for every UI;
+    # if it goes away later, the app scores locally
+    if host_available():
+        return RemoteCore(ModelClient(), fallback=local_core)
+    return local_core()
+
+
+pipe = load_pipe()
+encoder = pipe.named_steps['step1'].named_transformers_['trf']
+
+# canonical name -> the spelling pipe.pkl was trained on
+team_names = model_aliases(encoder.categories_[0], 'team')
+city_names = model_aliases(encoder.categories_[2], 'city')
+
 # Declaring the teams
 
-teams = ['Sunrisers Hyderabad',
-         'Mumbai Indians',
-         'Royal Challengers Bangalore',
-         'Kolkata Knight Riders',
-         'Kings XI Punjab',
-         'Chennai Super Kings',
-         'Rajasthan Royals',
-         'Delhi Capitals']
+teams = [team for team in CORE_TEAMS if team in team_names]
 
 # declaring the venues
 
-cities = ['Hyderabad', 'Bangalore', 'Mumbai', 'Indore', 'Kolkata', 'Delhi',
-          'Chandigarh', 'Jaipur', 'Chennai', 'Cape Town', 'Port Elizabeth',
-          'Durban', 'Centurion', 'East London', 'Johannesburg', 'Kimberley',
-          'Bloemfontein', 'Ahmedabad', 'Cuttack', 'Nagpur', 'Dharamsala',
-          'Visakhapatnam', 'Pune', 'Raipur', 'Ranchi', 'Abu Dhabi',
-          'Sharjah', 'Mohali', 'Bengaluru']
+cities = list(city_names)
 
 
-pipe = pickle.load(open('pipe.pkl', 'rb'))
-st.title('IPL Win Predictor')
+# shared prediction core, cached per match state
+
+@st.cache_data(max_entries=1024)
+def predict(battingteam, bowlingteam, city, target, score, overs, wickets):
+
+    # the serving core builds the pipe.pkl columns (and old spellings)
+    state = match_state(battingteam, bowlingteam, target, score,
+                        int(overs*6), wickets, city=city)
 
+    winprob = float(load_core().score(state, ['pipe.pkl'])['pipe.pkl'].iloc[0])
+
+    return winprob, 1-winprob
+
+
+st.title('IPL Win Predictor')
 
-col1, col2 = st.columns(2)
 
-with col1:
-    battingteam = st.selectbox('Select the batting team', sorted(teams))
+# the inputs and the result form one fragment: changing an input
+# reruns only this panel, not the whole script
 
-with col2:
+@st.fragment
+def prediction_panel():
 
-    bowlingteam = st.selectbox('Select the bowling team', sorted(teams))
+    col1, col2 = st.columns(2)
 
+    with col1:
+        battingteam = st.selectbox('Select the batting team', sorted(teams))
 
-city = st.selectbox(
-    'Select the city where the match is being played', sorted(cities))
+    with col2:
 
+        bowlingteam = st.selectbox('Select the bowling team', sorted(teams))
 
-target = st.number_input('Target')
+    city = st.selectbox(
+        'Select the city where the match is being played', sorted(cities))
 
-col3, col4, col5 = st.columns(3)
+    target = st.number_input('Target')
 
-with col3:
-    score = st.number_input('Score')
+    col3, col4, col5 = st.columns(3)
 
-with col4:
-    overs = st.number_input('Overs Completed')
+    with col3:
+        score = st.number_input('Score')
 
-with col5:
-    wickets = st.number_input('Wickets Fallen')
+    with col4:
+        overs = st.number_input('Overs Completed')
 
+    with col5:
+        wickets = st.number_input('Wickets Fallen')
 
-if st.button('Predict Probability'):
+    if st.button('Predict Probability'):
 
-    runs_left = target-score
-    balls_left = 120-(overs*6)
-    wickets = 10-wickets
-    currentrunrate = score/overs
-    requiredrunrate = (runs_left*6)/balls_left
+        winprob, lossprob = predict(battingteam, bowlingteam, city,
+                                    target, score, overs, wickets)
 
-    input_df = pd.DataFrame({'batting_team': [battingteam], 'bowling_team': [bowlingteam], 'city': [city], 'runs_left': [runs_left], 'balls_left': [
-                            balls_left], 'wickets': [wickets], 'total_runs_x': [target], 'cur_run_rate': [currentrunrate], 'req_run_rate': [requiredrunrate]})
+        st.header(battingteam+"- "+str(round(winprob*100))+"%")
 
-    result = pipe.predict_proba(input_df)
-    lossprob = result[0][0]
-    winprob = result[0][1]
+        st.header(bowlingteam+"- "+str(round(lossprob*100))+"%")
 
-    st.header(battingteam+"- "+str(round(winprob*100))+"%")
 
-    st.header(bowlingteam+"- "+str(round(lossprob*100))+"%")
+prediction_panel()
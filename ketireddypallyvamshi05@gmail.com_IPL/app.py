@@ -1,13 +1,23 @@
+import pickle
+import time
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import pickle
 
 from utils import (
+    MODEL_FILES,
     compute_team_strength,
     compute_venue_chase_bias,
+    predict_win_prob,
     prepare_streamlit_input
 )
+from compact_trees import load_any
+from entities import canonicalize_frame
+from explain import Explainer, group_contributions
+from first_innings import INDEX_FILE, load_first_innings_index, project_first_innings
+from model_host import ModelClient, RemoteModel, host_available
+from uncertainty import load_bands
+from audit import AuditLog
 
 # ------------------------------------------------------
 # PAGE CONFIG
@@ -23,38 +33,111 @@ st.markdown(
     "A real-time, ball-by-ball win probability model built using IPL data."
 )
 
-# ------------------------------------------------------
-# MODEL FILES (DO NOT CHANGE NAMES)
-# ------------------------------------------------------
-MODEL_FILES = {
-    "XGBoost (Advanced)": "model.pkl",
-    "Logistic Regression": "logistic_model.pkl",
-    "Linear Regression": "linear_model.pkl",
-    "Random Forest": "rf_model.pkl"
-}
-
 # ------------------------------------------------------
 # LOAD MODEL & DATA
 # ------------------------------------------------------
 @st.cache_resource
 def load_model(model_path):
-    with open(model_path, "rb") as f:
-        return pickle.load(f)
+    # a running model_host.py serves every app process from one copy
+    if host_available():
+        # loads the model locally only if the host goes away later
+        return RemoteModel(ModelClient(), model_path, fallback=lambda: load_any(model_path))
+    # prefers the compact export (compact_trees.py) when there is one
+    return load_any(model_path)
 
-@st.cache_data
-def load_data():
-    matches = pd.read_csv("data/matches.csv")
-    deliveries = pd.read_csv("data/deliveries.csv")
-    return matches, deliveries
+@st.cache_resource
+def load_explainer(model_path):
+    # built from the pickle itself, however predictions are served
+    # (compact export, model host); None for the histogram GBM
+    try:
+        with open(model_path, "rb") as f:
+            return Explainer(pickle.load(f))
+    except (AttributeError, ValueError):
+        return None
 
-matches, deliveries = load_data()
+@st.cache_resource
+def load_uncertainty(model_path):
+    # None unless uncertainty.py has built bands for this model
+    return load_bands(model_path=model_path) if model_path == "model.pkl" else None
 
-# helpers
-team_strength = compute_team_strength(matches)
-venue_bias = compute_venue_chase_bias(matches)
+@st.cache_resource
+def load_audit():
+    # one writer thread per app process, see audit.py
+    return AuditLog()
 
-teams = sorted(matches["team1"].unique())
-venues = sorted(matches["venue"].dropna().unique())
+@st.cache_resource
+def load_projection_index():
+    return load_first_innings_index(INDEX_FILE)
+
+@st.cache_data
+def load_reference_data():
+    """
+    Team / venue lists plus the team strength and venue bias lookups.
+    Only these small objects are cached, not the raw csv.
+    """
+    matches = canonicalize_frame(pd.read_csv("data/matches.csv"))
+
+    teams = sorted(matches["team1"].dropna().unique())
+    venues = sorted(matches["venue"].dropna().unique())
+
+    return (
+        teams,
+        venues,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches),
+    )
+
+teams, venues, team_strength, venue_bias = load_reference_data()
+
+# ------------------------------------------------------
+# SHARED PREDICTION CORE (CACHED PER MATCH STATE)
+# ------------------------------------------------------
+@st.cache_data(max_entries=4096)
+def predict_state(model_path, state):
+    """
+    Win probability for one match state (keyword arguments of
+    prepare_streamlit_input). Every panel showing the same state
+    reuses one prediction.
+    """
+    input_df = prepare_streamlit_input(
+        **state, team_strength=team_strength, venue_bias=venue_bias
+    )
+    return float(predict_win_prob(load_model(model_path), input_df)[0])
+
+def served_prob(model_path, state):
+    """
+    predict_state plus an audit record of what was shown, cache hits
+    included. Recording only queues the record.
+    """
+    started = time.perf_counter()
+    prob = predict_state(model_path, state)
+    load_audit().record(model_path, state, prob, time.perf_counter() - started)
+    return prob
+
+@st.cache_data(max_entries=4096)
+def predict_band(model_path, state):
+    """
+    (low, high) of the 90% uncertainty band for one match state.
+    """
+    input_df = prepare_streamlit_input(
+        **state, team_strength=team_strength, venue_bias=venue_bias
+    )
+    band = load_uncertainty(model_path).predict_interval(input_df).iloc[0]
+    return float(band["low"]), float(band["high"])
+
+@st.cache_data(max_entries=4096)
+def explain_move(model_path, state, sim_state):
+    """
+    Change in each feature group's contribution between two states,
+    largest first (groups that moved less than 0.005 are left out).
+    """
+    frame = pd.concat([
+        prepare_streamlit_input(**s, team_strength=team_strength, venue_bias=venue_bias)
+        for s in (state, sim_state)
+    ])
+    moved = group_contributions(load_explainer(model_path).explain(frame)).diff().iloc[-1]
+    moved = moved[moved.abs() >= 0.005].sort_values(key=abs, ascending=False)
+    return moved.to_dict()
 
 # ------------------------------------------------------
 # SIDEBAR – MODEL SELECTION
@@ -66,7 +149,7 @@ selected_model_name = st.sidebar.selectbox(
     list(MODEL_FILES.keys())
 )
 
-model = load_model(MODEL_FILES[selected_model_name])
+model_path = MODEL_FILES[selected_model_name]
 
 # ------------------------------------------------------
 # SIDEBAR – MATCH SETUP
@@ -81,9 +164,12 @@ bowling_team = st.sidebar.selectbox(
 
 venue = st.sidebar.selectbox("Venue", venues)
 
-target = st.sidebar.number_input(
-    "Target Score", min_value=50, max_value=300, value=180
-)
+innings = st.sidebar.radio("Innings", ["1st Innings", "2nd Innings"], index=1)
+
+if innings == "2nd Innings":
+    target = st.sidebar.number_input(
+        "Target Score", min_value=50, max_value=300, value=180
+    )
 
 # ------------------------------------------------------
 # SIDEBAR – CURRENT STATE
@@ -97,6 +183,35 @@ current_score = st.sidebar.number_input(
 )
 wickets_fallen = st.sidebar.slider("Wickets Fallen", 0, 10, 3)
 
+# ------------------------------------------------------
+# FIRST INNINGS PROJECTION (PRECOMPUTED INDEX)
+# ------------------------------------------------------
+if innings == "1st Innings":
+    try:
+        projection_index = load_projection_index()
+    except FileNotFoundError:
+        st.warning(f"{INDEX_FILE} not found – run `python first_innings.py` first.")
+        st.stop()
+
+    projection = project_first_innings(
+        projection_index, int(over * 6), wickets_fallen, current_score, venue
+    ).iloc[0]
+    first_pct = int(projection["win_prob"] * 100)
+
+    st.markdown("## 📈 First Innings Projection")
+
+    p1, p2, p3 = st.columns(3)
+    p1.metric("Projected Total", int(projection["projected_total"]))
+    p2.metric("Par Score", int(projection["par_score"]))
+    p3.metric(f"{batting_team} Win %", f"{first_pct}%")
+
+    st.progress(first_pct)
+    st.caption(
+        f"Likely range: {int(projection['projected_low'])}"
+        f" – {int(projection['projected_high'])}"
+    )
+    st.stop()
+
 # ------------------------------------------------------
 # SIDEBAR – MOMENTUM
 # ------------------------------------------------------
@@ -110,9 +225,9 @@ wkts_last_6 = st.sidebar.slider("Wickets in Last 6 Balls", 0, 3, 0)
 wkts_last_12 = st.sidebar.slider("Wickets in Last 12 Balls", 0, 5, 1)
 
 # ------------------------------------------------------
-# BUILD MODEL INPUT
+# MATCH STATE (MODEL INPUT ARGUMENTS)
 # ------------------------------------------------------
-input_df = prepare_streamlit_input(
+state = dict(
     batting_team=batting_team,
     bowling_team=bowling_team,
     venue=venue,
@@ -120,8 +235,6 @@ input_df = prepare_streamlit_input(
     current_score=current_score,
     wickets_fallen=wickets_fallen,
     target=target,
-    team_strength=team_strength,
-    venue_bias=venue_bias,
     runs_last_6=runs_last_6,
     runs_last_12=runs_last_12,
     runs_last_18=runs_last_12,
@@ -131,84 +244,71 @@ input_df = prepare_streamlit_input(
 )
 
 # ------------------------------------------------------
-# PREDICTION (SAFE FOR ALL MODELS)
+# MAIN DASHBOARD
 # ------------------------------------------------------
-if hasattr(model, "predict_proba"):
-    prob = model.predict_proba(input_df)[0][1]
-else:
-    prob = model.predict(input_df)[0]
-    prob = float(np.clip(prob, 0, 1))
+def prediction_panel(model_path, state):
+    prob_pct = int(served_prob(model_path, state) * 100)
 
-prob_pct = int(prob * 100)
+    st.markdown("## 📈 Win Probability")
 
-# ------------------------------------------------------
-# MAIN DASHBOARD
-# ------------------------------------------------------
-st.markdown("## 📈 Win Probability")
+    col1, col2 = st.columns([2, 1])
 
-col1, col2 = st.columns([2, 1])
+    with col1:
+        st.progress(prob_pct)
 
-with col1:
-    st.progress(prob_pct)
+    with col2:
+        st.metric(
+            label=f"{state['batting_team']} Win %",
+            value=f"{prob_pct}%"
+        )
 
-with col2:
-    st.metric(
-        label=f"{batting_team} Win %",
-        value=f"{prob_pct}%"
-    )
+    if load_uncertainty(model_path) is not None:
+        low, high = predict_band(model_path, state)
+        st.caption(f"Likely range: {int(low * 100)}% – {int(high * 100)}% (90% band)")
 
-# ------------------------------------------------------
-# CONTEXT MESSAGE
-# ------------------------------------------------------
-if prob_pct >= 65:
-    st.success("🟢 Batting team is in a strong position")
-elif prob_pct >= 40:
-    st.warning("🟡 Match is evenly balanced")
-else:
-    st.error("🔴 Bowling team is dominating")
+    # context message
+    if prob_pct >= 65:
+        st.success("🟢 Batting team is in a strong position")
+    elif prob_pct >= 40:
+        st.warning("🟡 Match is evenly balanced")
+    else:
+        st.error("🔴 Bowling team is dominating")
 
 # ------------------------------------------------------
-# WHAT-IF SIMULATION
+# WHAT-IF SIMULATION (BUTTONS RERUN ONLY THIS PANEL)
 # ------------------------------------------------------
-st.markdown("---")
-st.markdown("## 🧪 What-If Simulation")
-
-sim_col1, sim_col2, sim_col3 = st.columns(3)
-
-if sim_col1.button("➕ +12 Runs Next Over"):
-    current_score += 12
-
-if sim_col2.button("❌ Lose 1 Wicket"):
-    wickets_fallen = min(wickets_fallen + 1, 10)
-
-if sim_col3.button("⏭ Advance 1 Over"):
-    over = min(over + 1, 20)
-
-sim_input = prepare_streamlit_input(
-    batting_team,
-    bowling_team,
-    venue,
-    over,
-    current_score,
-    wickets_fallen,
-    target,
-    team_strength,
-    venue_bias,
-    runs_last_6,
-    runs_last_12,
-    runs_last_12,
-    wkts_last_6,
-    wkts_last_12,
-    wkts_last_12
-)
+@st.fragment
+def what_if_panel(model_path, state):
+    st.markdown("---")
+    st.markdown("## 🧪 What-If Simulation")
+
+    sim_col1, sim_col2, sim_col3 = st.columns(3)
+    sim_state = dict(state)
+
+    if sim_col1.button("➕ +12 Runs Next Over"):
+        sim_state["current_score"] += 12
+
+    if sim_col2.button("❌ Lose 1 Wicket"):
+        sim_state["wickets_fallen"] = min(sim_state["wickets_fallen"] + 1, 10)
+
+    if sim_col3.button("⏭ Advance 1 Over"):
+        sim_state["over"] = min(sim_state["over"] + 1, 20)
+
+    sim_prob = served_prob(model_path, sim_state)
+
+    st.info(f"Simulated Win Probability: **{int(sim_prob * 100)}%**")
 
-if hasattr(model, "predict_proba"):
-    sim_prob = model.predict_proba(sim_input)[0][1]
-else:
-    sim_prob = model.predict(sim_input)[0]
-    sim_prob = float(np.clip(sim_prob, 0, 1))
+    # which feature groups moved the simulated probability
+    explainer = load_explainer(model_path)
+    if explainer is not None and sim_state != state:
+        moved = explain_move(model_path, state, sim_state)
+        st.caption(
+            f"Why it moved ({explainer.units}): "
+            + (", ".join(f"{group} {value:+.2f}" for group, value in moved.items()) or "no change")
+        )
 
-st.info(f"Simulated Win Probability: **{int(sim_prob * 100)}%**")
+prediction_panel(model_path, state)
+what_if_panel(model_path, state)
 
 # ------------------------------------------------------
 # FOOTER
@@ -0,0 +1,315 @@
+import argparse
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from bulk_score import score_file
+from utils import MODEL_FILES, load_matches, compute_team_strength, compute_venue_chase_bias
+
+
+# ======================================================
+# SETTINGS
+# ======================================================
+AUDIT_DIR = os.environ.get("IPL_AUDIT_DIR", "audit_logs")
+
+# one JSON object per prediction: the prepare_streamlit_input
+# arguments (bulk_score.py input columns) plus these fields
+AUDIT_FIELDS = ["time", "model", "prob", "latency_ms"]
+
+
+def _plain(value):
+    # numpy scalars from the apps' widgets / frames
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# ======================================================
+# AUDIT LOG (QUEUE -> BACKGROUND WRITER -> ROTATING SEGMENTS)
+# ======================================================
+class AuditLog:
+    """
+    Records every served prediction without touching the disk on the
+    request path. record() only puts a tuple on a bounded queue and
+    never blocks: when the queue is full the record is dropped and
+    counted. A daemon thread drains the queue in batches into JSON
+    Lines segments under `directory`, starting a new segment once the
+    current one reaches `max_bytes` or is `max_seconds` old. Only the
+    newest `max_segments` segments of this process are kept.
+
+    Segments are bulk_score.py input files: every line holds the match
+    state columns next to the model, logged probability and latency.
+    """
+
+    def __init__(self, directory: str = AUDIT_DIR, max_bytes: int = 32 * 2**20,
+                 max_seconds: float = 3600, max_segments: int = 100,
+                 batch: int = 512, flush_seconds: float = 1.0, maxsize: int = 100_000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.max_segments = max_segments
+        self.batch = batch
+        self.flush_seconds = flush_seconds
+
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.counts = {"recorded": 0, "dropped": 0, "written": 0, "failed": 0, "segments": 0}
+        self.last_error = None
+        self._lock = threading.Lock()
+
+        self._file = None
+        self._opened = 0.0
+        self._segments = []
+
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    # --------------------------------------------------
+    # REQUEST PATH
+    # --------------------------------------------------
+    def record(self, model: str, state: dict, prob: float, seconds: float):
+        """
+        Queues one prediction: the state it was made for (keyword
+        arguments of prepare_streamlit_input), the model file, the
+        probability and how long serving it took.
+        """
+        try:
+            self.queue.put_nowait((time.time(), model, state, prob, seconds))
+        except queue.Full:
+            with self._lock:
+                self.counts["dropped"] += 1
+            return
+        with self._lock:
+            self.counts["recorded"] += 1
+
+    def stats(self) -> dict:
+        """
+        Counters plus the queue depth. "failed" counts records that
+        could not be serialized or written; last_error says why.
+        """
+        with self._lock:
+            return {**self.counts, "queued": self.queue.qsize(), "last_error": self.last_error}
+
+    # --------------------------------------------------
+    # WRITER THREAD
+    # --------------------------------------------------
+    def _segment_path(self) -> str:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(
+            self.directory, f"audit-{stamp}-{os.getpid()}-{self.counts['segments']:04d}.jsonl"
+        )
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+
+        path = self._segment_path()
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(path, "a")
+        self._opened = time.time()
+        self._segments.append(path)
+        with self._lock:
+            self.counts["segments"] += 1
+
+        while len(self._segments) > self.max_segments:
+            try:
+                os.remove(self._segments.pop(0))
+            except OSError:
+                pass
+
+    def _failed(self, count: int, exc: Exception):
+        with self._lock:
+            self.counts["failed"] += count
+            self.last_error = f"{type(exc).__name__}: {exc}"
+
+    def _write(self, items: list):
+        lines = []
+        for stamp, model, state, prob, seconds in items:
+            try:
+                lines.append(json.dumps({
+                    "time": round(stamp, 3),
+                    "model": model,
+                    **state,
+                    "prob": round(float(prob), 6),
+                    "latency_ms": round(seconds * 1000, 3),
+                }, separators=(",", ":"), default=_plain))
+            except (TypeError, ValueError) as exc:
+                self._failed(1, exc)
+        if not lines:
+            return
+
+        # a failed write (disk full, directory removed) loses this batch
+        # only: the next one starts a fresh segment
+        try:
+            if (
+                self._file is None
+                or self._file.tell() >= self.max_bytes
+                or time.time() - self._opened >= self.max_seconds
+            ):
+                self._rotate()
+
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+        except OSError as exc:
+            self._failed(len(lines), exc)
+            self._discard_file()
+            return
+        with self._lock:
+            self.counts["written"] += len(lines)
+
+    def _discard_file(self):
+        try:
+            self._close_file()
+        except OSError:
+            self._file = None
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+
+            items = [item]
+            while len(items) < self.batch:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write_batch(items)
+                    self._discard_file()
+                    return
+                items.append(item)
+            self._write_batch(items)
+
+        self._discard_file()
+
+    def _write_batch(self, items: list):
+        # nothing may end the writer thread: a dead writer would turn
+        # every later record into a drop
+        try:
+            self._write(items)
+        except Exception as exc:
+            self._failed(len(items), exc)
+            self._discard_file()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self, timeout: float = 10):
+        """
+        Writes what is queued (up to `timeout` seconds) and stops the
+        writer.
+        """
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+
+# ======================================================
+# READING SEGMENTS BACK
+# ======================================================
+def segments(directory: str = AUDIT_DIR) -> list:
+    """
+    Audit segments, oldest first.
+    """
+    return sorted(glob.glob(os.path.join(directory, "audit-*.jsonl")), key=os.path.getmtime)
+
+
+def read_audit(directory: str = AUDIT_DIR) -> pd.DataFrame:
+    paths = segments(directory)
+    if not paths:
+        return pd.DataFrame(columns=AUDIT_FIELDS)
+    return pd.concat([pd.read_json(p, lines=True) for p in paths], ignore_index=True)
+
+
+def summarize(log: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per model: predictions, mean probability and latency p50 / p95.
+    """
+    return log.groupby("model").agg(
+        predictions=("prob", "size"),
+        mean_prob=("prob", "mean"),
+        latency_ms_p50=("latency_ms", "median"),
+        latency_ms_p95=("latency_ms", lambda s: s.quantile(0.95)),
+    )
+
+
+def replay(directory: str, model_path: str, matches_path: str, workers: int) -> pd.DataFrame:
+    """
+    Re-scores every logged state of `model_path` with bulk_score.py
+    and compares the result with the logged probability: what a
+    retrained or calibrated model would have said on real traffic.
+    """
+    matches = load_matches(matches_path)
+    team_strength = compute_team_strength(matches)
+    venue_bias = compute_venue_chase_bias(matches)
+
+    name = os.path.basename(model_path)
+    parts = []
+    for path in segments(directory):
+        out = path[:-len(".jsonl")] + ".replay.jsonl"
+        start = time.perf_counter()
+        rows = score_file(path, out, model_path, team_strength, venue_bias,
+                          workers=workers, keep=AUDIT_FIELDS)
+        seconds = time.perf_counter() - start
+
+        scored = pd.read_json(out, lines=True)
+        os.remove(out)
+        scored = scored[scored["model"] == name]
+        parts.append(pd.DataFrame({
+            "segment": os.path.basename(path),
+            "rows": [rows],
+            "replayed": [len(scored)],
+            "max_abs_diff": [float((scored["win_prob"] - scored["prob"]).abs().max()) if len(scored) else np.nan],
+            "rows_per_s": [rows / max(seconds, 1e-9)],
+        }))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarise or replay the prediction audit log."
+    )
+    parser.add_argument("command", choices=["summary", "replay"])
+    parser.add_argument("--dir", default=AUDIT_DIR)
+    parser.add_argument("--model", default=MODEL_FILES["XGBoost (Advanced)"],
+                        help="model to replay the logged states with")
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        log = read_audit(args.dir)
+        if log.empty:
+            print(f"⚠️  no audit segments in {args.dir}")
+            return
+        print(f"Segments      : {len(segments(args.dir))}, {len(log):,} predictions")
+        print(summarize(log).round(4).to_string())
+        return
+
+    table = replay(args.dir, args.model, args.matches, args.workers)
+    if table.empty:
+        print(f"⚠️  no audit segments in {args.dir}")
+        return
+    print(table.round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
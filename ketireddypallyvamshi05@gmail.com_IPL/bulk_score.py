@@ -0,0 +1,251 @@
+import argparse
+import os
+import resource
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from compact_trees import load_any
+from entities import canonicalize_frame
+from player_form import INDEX_FILE, PLAYER_FEATURES, load_player_index, player_form
+from utils import (
+    MODEL_FILES,
+    load_matches,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_state_frame,
+    model_features,
+    predict_win_prob
+)
+
+
+# ======================================================
+# INPUT LAYOUT (ONE MATCH STATE PER ROW)
+# ======================================================
+# The arguments of prepare_streamlit_input, one column each.
+# `over` is overs completed as in the app (10.3 -> int(10.3 * 6) balls).
+STATE_COLUMNS = [
+    "batting_team", "bowling_team", "venue",
+    "over", "current_score", "wickets_fallen", "target"
+]
+
+# optional momentum columns, 0 when missing (as in the app)
+MOMENTUM_COLUMNS = ["runs_last_6", "runs_last_12", "wkts_last_6", "wkts_last_12"]
+
+# optional striker / bowler / match date, used by models trained with
+# --player-form (unknown players get league-average form, a missing
+# date the players' current form)
+PLAYER_COLUMNS = ["batsman", "bowler", "date"]
+
+FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".json": "jsonl",
+}
+
+
+def file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"{path}: expected one of {sorted(FORMATS)}")
+    return FORMATS[ext]
+
+
+def read_chunks(path: str, chunk: int, keep: list):
+    """
+    Match states from a CSV or JSON Lines file, `chunk` rows at a time.
+    """
+    wanted = STATE_COLUMNS + MOMENTUM_COLUMNS + PLAYER_COLUMNS + keep
+
+    if file_format(path) == "csv":
+        reader = pd.read_csv(path, chunksize=chunk, usecols=lambda c: c in wanted)
+    else:
+        reader = pd.read_json(path, lines=True, chunksize=chunk)
+
+    for states in reader:
+        missing = [c for c in STATE_COLUMNS + keep if c not in states.columns]
+        if missing:
+            raise ValueError(f"{path}: missing column(s) {missing}")
+        yield states[[c for c in wanted if c in states.columns]]
+
+
+# ======================================================
+# SCORING (ONE MODEL PER WORKER PROCESS)
+# ======================================================
+_WORKER = {}
+
+
+def _init_worker(model_path: str, team_strength: dict, venue_bias: dict, player_index: str = INDEX_FILE):
+    _WORKER["model"] = load_any(model_path)
+    _WORKER["team_strength"] = team_strength
+    _WORKER["venue_bias"] = venue_bias
+
+    if set(PLAYER_FEATURES) <= set(model_features(_WORKER["model"])):
+        if not os.path.exists(player_index):
+            raise FileNotFoundError(
+                f"{model_path} uses player form: run player_form.py to build {player_index}"
+            )
+        _WORKER["player_index"] = load_player_index(player_index)
+
+
+def score_chunk(states: pd.DataFrame) -> np.ndarray:
+    """
+    Win probability for every state in the chunk, built with the
+    vectorized prepare_streamlit_input (build_state_frame).
+    """
+    states = canonicalize_frame(states)
+
+    momentum = {
+        col: states[col].fillna(0).to_numpy() if col in states.columns else 0
+        for col in MOMENTUM_COLUMNS
+    }
+
+    X = build_state_frame(
+        states["batting_team"].to_numpy(),
+        states["bowling_team"].to_numpy(),
+        states["venue"].to_numpy(),
+        np.trunc(states["over"].to_numpy(dtype=float) * 6),
+        states["current_score"].to_numpy(),
+        states["wickets_fallen"].to_numpy(),
+        states["target"].to_numpy(),
+        _WORKER["team_strength"],
+        _WORKER["venue_bias"],
+        **momentum
+    )
+
+    if "player_index" in _WORKER:
+        players = {
+            col: states[col].fillna("").to_numpy() if col in states.columns
+            else np.full(len(states), "", dtype=object)
+            for col in ("batsman", "bowler")
+        }
+        form = player_form(
+            _WORKER["player_index"],
+            players["batsman"],
+            players["bowler"],
+            states["date"].to_numpy() if "date" in states.columns else None
+        )
+        X = X.assign(**form.to_dict("series"))
+
+    return predict_win_prob(_WORKER["model"], X).astype(np.float32)
+
+
+# ======================================================
+# OUTPUT (SAME ORDER AS THE INPUT)
+# ======================================================
+def write_chunk(f, fmt: str, states: pd.DataFrame, p: np.ndarray, keep: list, first: bool):
+    out = states[keep].assign(win_prob=np.round(p.astype(float), 6))
+
+    if fmt == "csv":
+        out.to_csv(f, header=first, index=False)
+    else:
+        f.write(out.to_json(orient="records", lines=True))
+
+
+def score_file(
+    in_path: str,
+    out_path: str,
+    model_path: str,
+    team_strength: dict,
+    venue_bias: dict,
+    chunk: int = 100_000,
+    workers: int = 1,
+    keep: list = (),
+    player_index: str = INDEX_FILE,
+) -> int:
+    """
+    Scores every state in `in_path` and writes `keep` columns plus
+    win_prob to `out_path`, row for row. At most 2 chunks per worker
+    are in flight, so memory does not grow with the file. Returns the
+    number of rows scored.
+    """
+    keep = list(keep)
+    fmt = file_format(out_path)
+    rows = 0
+
+    with open(out_path + ".tmp", "w", newline="") as f:
+        if workers <= 1:
+            _init_worker(model_path, team_strength, venue_bias, player_index)
+            for states in read_chunks(in_path, chunk, keep):
+                write_chunk(f, fmt, states, score_chunk(states), keep, rows == 0)
+                rows += len(states)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(model_path, team_strength, venue_bias, player_index)
+            ) as pool:
+                # futures are written oldest first, which keeps the order
+                pending = deque()
+                for states in read_chunks(in_path, chunk, keep):
+                    pending.append((states[keep], pool.submit(score_chunk, states)))
+                    if len(pending) >= 2 * workers:
+                        done, future = pending.popleft()
+                        write_chunk(f, fmt, done, future.result(), keep, rows == 0)
+                        rows += len(done)
+
+                while pending:
+                    done, future = pending.popleft()
+                    write_chunk(f, fmt, done, future.result(), keep, rows == 0)
+                    rows += len(done)
+
+    os.replace(out_path + ".tmp", out_path)
+
+    return rows
+
+
+def _peak_rss_mb() -> tuple:
+    # ru_maxrss is in kB on Linux; children = the largest worker
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, workers / 1024
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score a CSV / JSON Lines file of chase states."
+    )
+    parser.add_argument("input", help="states (.csv or .jsonl)")
+    parser.add_argument("output", help="win probabilities (.csv or .jsonl)")
+    parser.add_argument("--model", default=MODEL_FILES["XGBoost (Advanced)"])
+    parser.add_argument("--matches", default="data/matches.csv",
+                        help="source of team strength and venue chase bias")
+    parser.add_argument("--chunk", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--keep", nargs="*", default=[],
+                        help="input columns copied to the output (e.g. an id)")
+    parser.add_argument("--player-index", default=INDEX_FILE,
+                        help="player form index for models trained with --player-form")
+    args = parser.parse_args()
+
+    matches = load_matches(args.matches)
+
+    start = time.perf_counter()
+    rows = score_file(
+        args.input,
+        args.output,
+        args.model,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches),
+        chunk=args.chunk,
+        workers=args.workers,
+        keep=args.keep,
+        player_index=args.player_index
+    )
+    seconds = time.perf_counter() - start
+
+    own_mb, worker_mb = _peak_rss_mb()
+    print(f"Rows        : {rows:,}")
+    print(f"Time        : {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+    print(f"Peak RSS    : {own_mb:.0f} MB (reader), {worker_mb:.0f} MB (largest worker)")
+    print(f"✅ {args.output} written")
+
+
+if __name__ == "__main__":
+    main()
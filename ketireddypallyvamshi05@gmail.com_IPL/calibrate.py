@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import pickle
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sklearn.isotonic import IsotonicRegression
+from sklearn.metrics import brier_score_loss
+from sklearn.model_selection import GroupKFold
+from threadpoolctl import threadpool_limits
+
+from compact_trees import compact_path, export_compact, save_compact
+from evaluate import (
+    CACHE_DIR,
+    XGB_FEATURES,
+    MODELS,
+    build_model,
+    calibration_error,
+    data_fingerprint,
+    reliability_bins,
+    reliability_table
+)
+from train_all import OUT_FILES
+from uncertainty import BANDS_DIR, MODEL_FILE, restamp_bands
+from utils import (
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features,
+    apply_calibration
+)
+
+warnings.filterwarnings("ignore")
+
+
+# ======================================================
+# SETTINGS
+# ======================================================
+FOLDS = 5
+MAX_BREAKPOINTS = 64
+REPORT_FILE = "calibration_report.csv"
+
+
+# ======================================================
+# CALIBRATION MAP (ISOTONIC -> COMPACT BREAKPOINTS)
+# ======================================================
+def fit_calibration(p: np.ndarray, y: np.ndarray, max_points: int = MAX_BREAKPOINTS) -> np.ndarray:
+    """
+    (2, k) float32 breakpoints of an isotonic fit of y on p, read
+    off at up to `max_points` quantiles of p (plus 0 and 1), so the
+    map stays a few hundred bytes whatever the number of rows.
+    """
+    iso = IsotonicRegression(y_min=0, y_max=1, out_of_bounds="clip").fit(p, y)
+
+    x = np.unique(np.concatenate([[0.0], np.quantile(p, np.linspace(0, 1, max_points - 2)), [1.0]]))
+    return np.vstack([x, iso.predict(x)]).astype(np.float32)
+
+
+# ======================================================
+# OUT-OF-FOLD PREDICTIONS (MATCH-GROUPED, ONE FOLD PER WORKER)
+# ======================================================
+_FRAMES = {}
+
+
+def oof_fold(model_name: str, fold: int, features_path: str, folds: int) -> tuple:
+    """
+    (row positions, predictions) of one held-out fold: whole matches
+    the fold's model never saw.
+    """
+    if features_path not in _FRAMES:
+        _FRAMES[features_path] = pd.read_pickle(features_path)
+    df = _FRAMES[features_path]
+
+    pipe, features = build_model(model_name)
+    splits = GroupKFold(n_splits=folds).split(df, groups=df["match_id"])
+    train, test = list(splits)[fold]
+
+    with threadpool_limits(1):
+        pipe.fit(df[features].iloc[train], df["win"].iloc[train])
+
+        # raw output, exactly as predict_win_prob sees it before calibration
+        X = df[features].iloc[test]
+        if hasattr(pipe, "predict_proba"):
+            p = pipe.predict_proba(X)[:, 1]
+        else:
+            p = np.clip(pipe.predict(X), 0, 1)
+    return test, p
+
+
+def cached_frame(matches_path: str, deliveries_path: str) -> str:
+    key = data_fingerprint([matches_path, deliveries_path])
+    path = os.path.join(CACHE_DIR, f"calibration_{key}.pkl")
+    if os.path.exists(path):
+        return path
+
+    matches, deliveries = load_match_data(matches_path, deliveries_path)
+    deliveries = build_chase_features(
+        matches,
+        deliveries,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches)
+    )
+    df = deliveries[XGB_FEATURES + ["match_id", "win"]].dropna().reset_index(drop=True)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df.to_pickle(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+# ======================================================
+# REPORT (RAW VS CALIBRATED, ON MATCHES THE MAP DID NOT SEE)
+# ======================================================
+def cross_fitted(p: np.ndarray, y: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    Calibrated out-of-fold predictions where each half of the matches
+    is mapped by a calibration fitted on the other half.
+    """
+    out = np.empty_like(p)
+    for fit, apply in GroupKFold(n_splits=2).split(p, groups=groups):
+        out[apply] = apply_calibration(p[apply], fit_calibration(p[fit], y[fit]))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fit a calibration map for every app model on match-grouped held-out data."
+    )
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--models", nargs="+", default=MODELS, choices=MODELS)
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--report", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    features_path = cached_frame(args.matches, args.deliveries)
+    df = pd.read_pickle(features_path)
+    y, groups = df["win"].to_numpy(), df["match_id"].to_numpy()
+    print(f"Features      : {len(df):,} rows, {df['match_id'].nunique()} matches "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    oof = {name: np.empty(len(df)) for name in args.models}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            (name, fold): pool.submit(oof_fold, name, fold, features_path, args.folds)
+            for name in args.models
+            for fold in range(args.folds)
+        }
+        for (name, _), future in futures.items():
+            rows, p = future.result()
+            oof[name][rows] = p
+    print(f"Out-of-fold   : {len(args.models)} models x {args.folds} folds "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    summary, report_rows = {}, []
+    for name in args.models:
+        p = oof[name]
+        calibrated = cross_fitted(p, y, groups)
+
+        summary[name] = {
+            "brier_raw": brier_score_loss(y, p),
+            "brier_calibrated": brier_score_loss(y, calibrated),
+            "ece_raw": calibration_error(y, p),
+            "ece_calibrated": calibration_error(y, calibrated),
+        }
+        report_rows += [
+            {"model": f"{name} raw", "reliability": reliability_bins(y, p)},
+            {"model": f"{name} calibrated", "reliability": reliability_bins(y, calibrated)},
+        ]
+
+        # the served map is fitted on every out-of-fold prediction
+        path = OUT_FILES[name]
+        previous = data_fingerprint([path])
+        with open(path, "rb") as f:
+            pipe = pickle.load(f)
+        pipe.calibration_ = fit_calibration(p, y)
+        with open(path, "wb") as f:
+            pickle.dump(pipe, f)
+        summary[name]["breakpoints"] = pipe.calibration_.shape[1]
+
+        # load_any serves the compact export: rewrite it with the same options
+        target = compact_path(path)
+        if os.path.isdir(target):
+            with open(os.path.join(target, "meta.json")) as f:
+                options = json.load(f)
+            compact = export_compact(pipe, options["leaf_dtype"], options["thresholds"])
+            compact["meta"]["model"] = data_fingerprint([path])
+            save_compact(compact, target, options["compress"])
+            print(f"✅ {target} re-exported with the map")
+
+        # the rewritten pickle has a new fingerprint; its trees are the same
+        if path == MODEL_FILE and os.path.isdir(BANDS_DIR):
+            if restamp_bands(previous, BANDS_DIR, MODEL_FILE):
+                print(f"✅ {BANDS_DIR} restamped with the map")
+            else:
+                print(f"⚠️  {BANDS_DIR} was built for another {MODEL_FILE} – re-run uncertainty.py")
+
+    reliability = reliability_table(report_rows)
+    reliability.to_csv(args.report, index=False)
+
+    print()
+    print(pd.DataFrame(summary).T.round(4).to_string())
+    print("\nReliability (observed win rate per predicted-probability bin):")
+    print(reliability.pivot(index="bin", columns="model", values="observed").round(3).to_string())
+    print(f"\n✅ calibration maps saved into {', '.join(OUT_FILES[n] for n in args.models)}; "
+          f"{args.report} written")
+
+
+if __name__ == "__main__":
+    main()
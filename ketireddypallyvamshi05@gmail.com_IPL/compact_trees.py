@@ -0,0 +1,575 @@
+import argparse
+import io
+import json
+import lzma
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from evaluate import data_fingerprint
+from utils import MODEL_FILES, predict_win_prob
+
+
+# ======================================================
+# STORAGE LAYOUT
+# ======================================================
+# <model>.trees/ holds one .npy file per array plus the fitted
+# preprocessing step (prep.pkl) and meta.json. Every tree of the
+# ensemble lives in the same flat node arrays:
+#
+#   feature       int16    split feature, -1 on leaves
+#   threshold     float32  split value (or uint16 bin index, see below)
+#   left, right   int32    global child index, a leaf points at itself
+#   default_left  bool     branch taken by a missing value
+#   value         float16  leaf value (class-1 share / XGBoost margin)
+#   roots         int32    first node of every tree
+#
+# Uncompressed arrays are memory-mapped on load. With --compress the
+# .npy files are stored as .npy.zst / .npy.xz and read into memory.
+COMPACT_SUFFIX = ".trees"
+
+COMPRESSORS = {
+    "none": "",
+    "zstd": ".zst",
+    "lzma": ".xz",
+}
+
+ARRAYS = ["feature", "threshold", "left", "right", "default_left", "value", "roots"]
+BIN_ARRAYS = ["edges", "edge_offsets"]
+
+
+def compact_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + COMPACT_SUFFIX
+
+
+# ======================================================
+# EXPORT (FITTED PIPELINE -> FLAT NODE ARRAYS)
+# ======================================================
+def _float32_floor(values: np.ndarray) -> np.ndarray:
+    """
+    Largest float32 <= each float64 threshold. Inputs are compared as
+    float32, so `x <= t` keeps exactly the same outcome.
+    """
+    out = values.astype(np.float32)
+    over = out.astype(np.float64) > values
+    out[over] = np.nextafter(out[over], np.float32(-np.inf))
+    return out
+
+
+def _sklearn_trees(forest) -> list:
+    trees = []
+    for est in forest.estimators_:
+        tree = est.tree_
+        leaf = tree.children_left == -1
+        value = tree.value[:, 0, :]
+        missing_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count))
+
+        trees.append({
+            "feature": np.where(leaf, -1, tree.feature),
+            "threshold": _float32_floor(tree.threshold),
+            "left": tree.children_left,
+            "right": tree.children_right,
+            "default_left": missing_left.astype(bool),
+            "value": np.where(leaf, value[:, 1] / value.sum(axis=1), 0.0),
+        })
+    return trees
+
+
+def _xgboost_trees(booster) -> tuple:
+    raw = json.loads(booster.save_raw("json"))
+    learner = raw["learner"]
+
+    if learner["objective"]["name"] != "binary:logistic":
+        raise ValueError("only binary:logistic XGBoost models can be exported")
+
+    base_score = float(learner["learner_model_param"]["base_score"])
+    base_margin = float(np.log(base_score / (1 - base_score)))
+
+    trees = []
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"])
+        leaf = left == -1
+        split = np.asarray(tree["split_conditions"], dtype=np.float32)
+
+        trees.append({
+            "feature": np.where(leaf, -1, tree["split_indices"]),
+            "threshold": np.where(leaf, 0, split).astype(np.float32),
+            "left": left,
+            "right": np.asarray(tree["right_children"]),
+            "default_left": np.asarray(tree["default_left"], dtype=bool),
+            "value": np.where(leaf, split, 0.0),
+        })
+    return trees, base_margin
+
+
+def _quantize_thresholds(feature, threshold, n_features) -> tuple:
+    """
+    Replaces every split value by its rank among the distinct split
+    values of its feature. Comparing an input's rank against the
+    stored rank gives the same branch as comparing the raw values.
+    """
+    split = feature >= 0
+    edges, offsets = [], [0]
+    ranks = np.zeros(len(feature), dtype=np.uint16)
+
+    for f in range(n_features):
+        nodes = split & (feature == f)
+        table, inverse = np.unique(threshold[nodes], return_inverse=True)
+        if len(table) > np.iinfo(np.uint16).max:
+            raise ValueError(f"feature {f} has too many distinct splits for uint16 bins")
+        ranks[nodes] = inverse
+        edges.append(table)
+        offsets.append(offsets[-1] + len(table))
+
+    return ranks, np.concatenate(edges).astype(np.float32), np.asarray(offsets, dtype=np.int32)
+
+
+def export_compact(pipe, leaf_dtype: str = "float16", thresholds: str = "float32") -> dict:
+    """
+    Flattens a fitted (prep, RandomForest | XGBoost) pipeline into the
+    compact arrays. Returns {"meta", "prep", "arrays"}.
+    """
+    prep, model = pipe.steps[0][1], pipe.steps[-1][1]
+
+    if hasattr(model, "get_booster"):
+        kind = "xgboost"
+        trees, base_margin = _xgboost_trees(model.get_booster())
+        n_features = model.n_features_in_
+    elif hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        kind = "forest"
+        trees, base_margin = _sklearn_trees(model), 0.0
+        n_features = model.n_features_in_
+    else:
+        raise ValueError(f"{type(model).__name__} is not a tree ensemble")
+
+    arrays = flatten_trees(trees, leaf_dtype)
+
+    if thresholds == "bins":
+        ranks, edges, offsets = _quantize_thresholds(
+            arrays["feature"], arrays["threshold"], n_features
+        )
+        arrays.update(threshold=ranks, edges=edges, edge_offsets=offsets)
+
+    depth = _max_depth(arrays)
+
+    meta = {
+        "kind": kind,
+        "n_trees": len(trees),
+        "n_features": int(n_features),
+        "max_depth": depth,
+        "base_margin": base_margin,
+        "thresholds": thresholds,
+        "leaf_dtype": leaf_dtype,
+    }
+    # the calibration map (calibrate.py) travels with the trees
+    if getattr(pipe, "calibration_", None) is not None:
+        meta["calibration"] = np.asarray(pipe.calibration_).tolist()
+    return {"meta": meta, "prep": prep, "arrays": arrays}
+
+
+def flatten_trees(trees: list, leaf_dtype: str = "float16") -> dict:
+    """
+    The flat node arrays (see STORAGE LAYOUT) of a list of trees.
+    """
+    sizes = np.array([len(t["left"]) for t in trees])
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    def stacked(key, dtype):
+        return np.concatenate([t[key] for t in trees]).astype(dtype)
+
+    # children become global node indices; leaves point at themselves
+    # so a fixed number of traversal steps never walks off a leaf
+    node = np.arange(sizes.sum())
+    leaf = stacked("feature", np.int32) < 0
+    offset = np.repeat(roots, sizes)
+
+    arrays = {
+        "feature": stacked("feature", np.int16),
+        "threshold": stacked("threshold", np.float32),
+        "left": np.where(leaf, node, stacked("left", np.int64) + offset).astype(np.int32),
+        "right": np.where(leaf, node, stacked("right", np.int64) + offset).astype(np.int32),
+        "default_left": stacked("default_left", bool),
+        "value": stacked("value", np.float64).astype(leaf_dtype),
+        "roots": roots.astype(np.int32),
+    }
+    return arrays
+
+
+def _max_depth(arrays) -> int:
+    """
+    Longest root-to-leaf path: the number of traversal steps needed.
+    """
+    node, depth = arrays["roots"], 0
+    while (arrays["feature"][node] >= 0).any():
+        node = node[arrays["feature"][node] >= 0]
+        node = np.concatenate([arrays["left"][node], arrays["right"][node]])
+        depth += 1
+    return depth
+
+
+def save_compact(compact: dict, path: str, compress: str = "none"):
+    if compress == "zstd" and zstandard is None:
+        raise ImportError("zstd compression needs the zstandard package")
+
+    os.makedirs(path, exist_ok=True)
+    suffix = COMPRESSORS[compress]
+
+    for name in os.listdir(path):
+        os.remove(os.path.join(path, name))
+
+    for name, arr in compact["arrays"].items():
+        target = os.path.join(path, name + ".npy" + suffix)
+        if compress == "none":
+            np.save(target, arr)
+            continue
+
+        with open(target, "wb") as f:
+            _write_npy(f, arr, compress)
+
+    with open(os.path.join(path, "prep.pkl"), "wb") as f:
+        pickle.dump(compact["prep"], f)
+
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({**compact["meta"], "compress": compress}, f, indent=2)
+
+
+def _write_npy(f, arr, compress):
+    buf = io.BytesIO()
+    np.save(buf, arr)
+    data = buf.getvalue()
+    if compress == "zstd":
+        f.write(zstandard.ZstdCompressor(level=19).compress(data))
+    else:
+        f.write(lzma.compress(data, preset=9))
+
+
+def _read_npy(path, compress):
+    with open(path, "rb") as f:
+        data = f.read()
+    if compress == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = lzma.decompress(data)
+    return np.load(io.BytesIO(data))
+
+
+# ======================================================
+# COMPACT MODEL (DROP-IN FOR THE PICKLED PIPELINE)
+# ======================================================
+class CompactTrees:
+    """
+    Tree ensemble predicted straight from the flat node arrays.
+    Every row walks all trees at once, one level per numpy step.
+    """
+
+    CHUNK = 2048
+
+    def __init__(self, meta: dict, prep, arrays: dict):
+        self.meta = meta
+        self.prep = prep
+        self.arrays = arrays
+        self.steps = [("prep", prep)]
+
+        calibration = meta.get("calibration")
+        self.calibration_ = None if calibration is None else np.asarray(calibration, dtype=np.float32)
+
+    def _inputs(self, X):
+        Xt = self.prep.transform(X)
+        if sparse.issparse(Xt):
+            values = Xt.toarray().astype(np.float32)
+            # XGBoost reads entries absent from a sparse matrix as missing
+            if self.meta["kind"] == "xgboost":
+                present = Xt.copy()
+                present.data[:] = 1
+                return values, present.toarray() == 0
+        else:
+            values = np.asarray(Xt, dtype=np.float32)
+        return values, np.isnan(values)
+
+    def _binned(self, values):
+        """
+        Rank of every input among its feature's split values (the
+        searchsorted side matches the split comparison).
+        """
+        edges, offsets = self.arrays["edges"], self.arrays["edge_offsets"]
+        side = "right" if self.meta["kind"] == "xgboost" else "left"
+        out = np.empty(values.shape, dtype=np.int32)
+        for f in range(values.shape[1]):
+            table = edges[offsets[f]:offsets[f + 1]]
+            out[:, f] = np.searchsorted(table, values[:, f], side=side)
+        return out
+
+    def _leaf_values(self, values, missing):
+        a = self.arrays
+        binned = self.meta["thresholds"] == "bins"
+        if binned:
+            values = self._binned(values)
+
+        rows = np.arange(len(values))[:, None]
+        node = np.broadcast_to(a["roots"], (len(values), len(a["roots"])))
+
+        for _ in range(self.meta["max_depth"]):
+            feature = a["feature"][node]
+            x = values[rows, feature]
+            threshold = a["threshold"][node]
+
+            if binned or self.meta["kind"] == "forest":
+                go_left = x <= threshold
+            else:
+                go_left = x < threshold
+
+            go_left = np.where(missing[rows, feature], a["default_left"][node], go_left)
+            node = np.where(go_left, a["left"][node], a["right"][node])
+
+        return a["value"][node].astype(np.float64)
+
+    def leaf_chunks(self, X):
+        """
+        (row slice, leaf value of every row in every tree) per CHUNK
+        rows of X.
+        """
+        values, missing = self._inputs(X)
+        for start in range(0, len(values), self.CHUNK):
+            chunk = slice(start, start + self.CHUNK)
+            yield chunk, self._leaf_values(values[chunk], missing[chunk])
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = np.empty(len(X))
+
+        for chunk, leaves in self.leaf_chunks(X):
+            if self.meta["kind"] == "xgboost":
+                margin = self.meta["base_margin"] + leaves.sum(axis=1)
+                p[chunk] = 1 / (1 + np.exp(-margin))
+            else:
+                p[chunk] = leaves.mean(axis=1)
+
+        return np.column_stack([1 - p, p])
+
+
+def load_compact(path: str) -> CompactTrees:
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    with open(os.path.join(path, "prep.pkl"), "rb") as f:
+        prep = pickle.load(f)
+
+    compress = meta["compress"]
+    names = ARRAYS + (BIN_ARRAYS if meta["thresholds"] == "bins" else [])
+
+    arrays = {}
+    for name in names:
+        target = os.path.join(path, name + ".npy" + COMPRESSORS[compress])
+        if compress == "none":
+            arrays[name] = np.load(target, mmap_mode="r")
+        else:
+            arrays[name] = _read_npy(target, compress)
+
+    return CompactTrees(meta, prep, arrays)
+
+
+def load_any(model_path: str):
+    """
+    The compact export next to a pickle when one exists and was made
+    from the pickle as it is now, else the pickle.
+    """
+    target = compact_path(model_path)
+    if os.path.isdir(target):
+        compact = load_compact(target)
+        if not os.path.exists(model_path) or compact.meta.get("model") == data_fingerprint([model_path]):
+            return compact
+        print(f"⚠️  {target} was exported from an older {model_path} – serving the pickle; "
+              f"re-run compact_trees.py {model_path}")
+    with open(model_path, "rb") as f:
+        return pickle.load(f)
+
+
+# ======================================================
+# REPORT (COMPACT EXPORT VS PICKLE)
+# ======================================================
+def disk_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def measure_load(path: str) -> dict:
+    """
+    Load time and RSS growth of loading `path` in a fresh interpreter
+    (after the shared imports), so runs don't interfere. Memory-mapped
+    arrays only count once their pages are read.
+    """
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", path],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(path: str):
+    import sklearn.ensemble  # noqa: F401  same imports for both formats
+    import xgboost  # noqa: F401
+
+    rss = _rss_mb()
+    start = time.perf_counter()
+    if os.path.isdir(path):
+        load_compact(path)
+    else:
+        with open(path, "rb") as f:
+            pickle.load(f)
+    seconds = time.perf_counter() - start
+    rss_mb = _rss_mb() - rss
+
+    print(json.dumps({"seconds": seconds, "rss_mb": rss_mb}))
+
+
+def holdout_set(pipe):
+    """
+    The test split the training scripts report on.
+    """
+    from sklearn.model_selection import train_test_split
+    from utils import (
+        load_match_data,
+        compute_team_strength,
+        compute_venue_chase_bias,
+        build_chase_features,
+        model_features
+    )
+
+    matches, deliveries = load_match_data()
+    deliveries = build_chase_features(
+        matches,
+        deliveries,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches)
+    )
+
+    features = model_features(pipe)
+    df = deliveries[features + ["win"]].dropna()
+
+    _, X_test, _, y_test = train_test_split(
+        df[features], df["win"], test_size=0.2, stratify=df["win"], random_state=42
+    )
+    return X_test, y_test.to_numpy()
+
+
+def report(model_path: str, compact_dir: str, pipe):
+    from sklearn.metrics import accuracy_score, brier_score_loss
+
+    rows = []
+    for label, path in [("pickle", model_path), ("compact", compact_dir)]:
+        load = measure_load(path)
+        rows.append((label, disk_size(path) / 1e6, load["seconds"], load["rss_mb"]))
+
+    print(f"{'':10}{'disk MB':>10}{'load s':>10}{'RSS MB':>10}")
+    for label, disk, seconds, rss in rows:
+        print(f"{label:10}{disk:10.2f}{seconds:10.3f}{rss:10.1f}")
+
+    try:
+        X_test, y_test = holdout_set(pipe)
+    except FileNotFoundError as exc:
+        print(f"⚠️  accuracy check skipped: {exc}")
+        return
+
+    compact = load_compact(compact_dir)
+
+    start = time.perf_counter()
+    p_pickle = predict_win_prob(pipe, X_test)
+    t_pickle = time.perf_counter() - start
+
+    start = time.perf_counter()
+    p_compact = predict_win_prob(compact, X_test)
+    t_compact = time.perf_counter() - start
+
+    # the app scores one state at a time
+    row = X_test.iloc[:1]
+    single = {}
+    for label, model in [("pickle", pipe), ("compact", compact)]:
+        start = time.perf_counter()
+        for _ in range(50):
+            predict_win_prob(model, row)
+        single[label] = (time.perf_counter() - start) / 50 * 1000
+
+    print(f"Test rows      : {len(y_test)}")
+    for label, p, seconds in [("pickle", p_pickle, t_pickle), ("compact", p_compact, t_compact)]:
+        print(
+            f"{label:8} accuracy {accuracy_score(y_test, p > 0.5):.4f}  "
+            f"brier {brier_score_loss(y_test, p):.5f}  "
+            f"batch {seconds:.2f}s  1 row {single[label]:.1f} ms"
+        )
+    print(f"max |Δp|       : {np.abs(p_pickle - p_compact).max():.2e}")
+    print(f"decision flips : {int(((p_pickle > 0.5) != (p_compact > 0.5)).sum())}")
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export tree-ensemble pickles to compact node arrays."
+    )
+    parser.add_argument(
+        "files", nargs="*",
+        default=[MODEL_FILES["XGBoost (Advanced)"], MODEL_FILES["Histogram GBM"]],
+        help="pipeline pickles to export (default: model.pkl rf_model.pkl)"
+    )
+    parser.add_argument("--compress", choices=list(COMPRESSORS), default="none")
+    parser.add_argument("--thresholds", choices=["float32", "bins"], default="float32")
+    parser.add_argument("--leaf-dtype", choices=["float16", "float32"], default="float16")
+    parser.add_argument("--no-report", action="store_true",
+                        help="skip the size / load time / accuracy comparison")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure(args.measure)
+        return
+
+    for path in args.files:
+        if not os.path.exists(path):
+            print(f"⚠️  {path} not found – skipped")
+            continue
+
+        with open(path, "rb") as f:
+            pipe = pickle.load(f)
+
+        try:
+            compact = export_compact(pipe, args.leaf_dtype, args.thresholds)
+        except ValueError as exc:
+            print(f"⚠️  {path}: {exc} – skipped")
+            continue
+        # load_any only serves the export while the pickle is unchanged
+        compact["meta"]["model"] = data_fingerprint([path])
+        target = compact_path(path)
+        save_compact(compact, target, args.compress)
+
+        meta = compact["meta"]
+        print(f"\n✅ {path} -> {target}  ({meta['n_trees']} trees, "
+              f"{len(compact['arrays']['feature'])} nodes, depth {meta['max_depth']})")
+
+        if not args.no_report:
+            report(path, target, pipe)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from compact_trees import load_any
+from serving import match_state
+from utils import (
+    MODEL_FILES,
+    load_matches,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_state_frame,
+    predict_win_prob
+)
+
+
+# ======================================================
+# CANDIDATE FUTURE STATES (RUNS x WICKETS OVER A HORIZON)
+# ======================================================
+# A query is a canonical state row (serving.match_state). Its future
+# after `horizon` more balls is one cell of a (wickets lost, runs
+# scored) grid. Cells that settle the chase are not scored: reaching
+# the target is a win, losing the tenth wicket a defeat.
+WON, LOST = 1.0, 0.0
+
+
+def _recent(old, runs, horizon, window: int):
+    # runs spread evenly over the horizon; the part of the old window
+    # still inside the new one is kept pro rata
+    share = np.minimum(horizon, window) / np.maximum(horizon, 1)
+    kept = np.maximum(window - horizon, 0) / window
+    return runs * share + old * kept
+
+
+class ChaseSolver:
+    """
+    Answers "what does the chase need" for many states at once. All
+    candidate futures are featurised like prepare_streamlit_input and
+    scored in one call; thresholds are found by bisection over the
+    scored grid, every query in the same numpy step.
+    """
+
+    def __init__(self, model, team_strength: dict, venue_bias: dict):
+        self.model = model
+        self.team_strength = team_strength
+        self.venue_bias = venue_bias
+
+    def cells(self, state: pd.DataFrame, qi, wi, ri, horizon: int) -> np.ndarray:
+        """
+        Win probability of query qi after ri runs for wi wickets over
+        the next `horizon` balls, for flat arrays of cells, in one
+        predict call. Runs beyond six an over are not reachable and
+        score -inf.
+        """
+        balls = state["balls_bowled"].to_numpy(dtype=float)[qi]
+        score = state["current_score"].to_numpy(dtype=float)[qi]
+        wickets = state["wickets_fallen"].to_numpy(dtype=float)[qi] + wi
+        steps = np.clip(horizon, 0, 120 - balls)
+
+        prob = np.full(len(qi), np.nan)
+        prob[ri >= state["target"].to_numpy()[qi] - score] = WON
+        prob[wickets >= 10] = LOST
+        prob[ri > 6 * steps] = -np.inf
+
+        open_ = np.isnan(prob)
+        if not open_.any():
+            return prob
+
+        pick = lambda col: state[col].to_numpy()[qi[open_]]
+        r, w, steps = ri[open_], wi[open_], steps[open_]
+
+        X = build_state_frame(
+            pick("batting_team"),
+            pick("bowling_team"),
+            pick("venue"),
+            balls[open_] + steps,
+            score[open_] + r,
+            wickets[open_],
+            pick("target"),
+            self.team_strength,
+            self.venue_bias,
+            runs_last_6=_recent(pick("runs_last_6"), r, steps, 6),
+            runs_last_12=_recent(pick("runs_last_12"), r, steps, 12),
+            wkts_last_6=_recent(pick("wkts_last_6"), w, steps, 6),
+            wkts_last_12=_recent(pick("wkts_last_12"), w, steps, 12),
+        )
+        prob[open_] = predict_win_prob(self.model, X)
+        return prob
+
+    def max_runs(self, state: pd.DataFrame, horizon: int) -> int:
+        # past the runs still needed (or six an over) nothing changes
+        balls = state["balls_bowled"].to_numpy(dtype=float)
+        runs_left = state["target"].to_numpy(dtype=float) - state["current_score"].to_numpy()
+        reach = np.minimum(6 * np.clip(horizon, 0, 120 - balls), runs_left)
+        return int(np.clip(reach, 0, None).max()) if len(state) else 0
+
+    def grid(self, state: pd.DataFrame, horizon: int = 12, max_wickets: int = 3) -> np.ndarray:
+        """
+        Every candidate future as one batch: win probabilities of shape
+        (queries, max_wickets + 1, max_runs + 1), indexed by wickets
+        lost and runs scored over the horizon.
+        """
+        shape = (len(state), max_wickets + 1, self.max_runs(state, horizon) + 1)
+        q, w, r = (axis.ravel() for axis in np.indices(shape))
+        return self.cells(state, q, w, r, horizon).reshape(shape)
+
+    def runs_needed(
+        self,
+        state: pd.DataFrame,
+        horizon: int = 12,
+        target_prob: float = 0.5,
+        max_wickets: int = 3,
+        lazy: bool = False
+    ) -> pd.DataFrame:
+        """
+        Fewest runs in the next `horizon` balls that lift the batting
+        side to `target_prob`, for every query and every number of
+        wickets lost on the way (0..max_wickets). NaN when no run
+        count within the horizon gets there.
+
+        By default the whole grid is scored in one call and searched
+        on its running maximum over runs. lazy=True scores only the
+        bisection midpoints (one call per step, about log2(runs)
+        calls), which is cheaper for slow models but trusts the model
+        to be monotone in runs.
+        """
+        top = self.max_runs(state, horizon)
+        shape = (len(state), max_wickets + 1)
+        q, w = np.indices(shape)
+
+        if not lazy:
+            # monotone in runs: the best probability reached by r runs
+            reached = np.maximum.accumulate(self.grid(state, horizon, max_wickets), axis=2)
+            score = lambda mid: np.take_along_axis(reached, mid[..., None], axis=2)[..., 0]
+        else:
+            score = lambda mid: self.cells(
+                state, q.ravel(), w.ravel(), mid.ravel(), horizon
+            ).reshape(shape)
+
+        # vectorized bisection: the first run count reaching target_prob
+        lo = np.zeros(shape, dtype=int)
+        hi = np.full(shape, top + 1)
+        while (lo < hi).any():
+            mid = np.minimum((lo + hi) // 2, top)
+            ok = score(mid) >= target_prob
+            active = lo < hi
+            hi = np.where(active & ok, mid, hi)
+            lo = np.where(active & ~ok, mid + 1, lo)
+
+        # monotone in wickets: losing one more never needs fewer runs
+        needed = np.maximum.accumulate(lo, axis=1)
+        found = needed <= top
+        win_prob = score(np.minimum(needed, top)).ravel()
+
+        return pd.DataFrame({
+            "query": state.index.to_numpy()[q.ravel()],
+            "wickets_lost": w.ravel(),
+            "runs_needed": np.where(found, needed, np.nan).ravel(),
+            "win_prob": np.where(found.ravel(), win_prob, np.nan),
+        })
+
+
+# ======================================================
+# BENCHMARK
+# ======================================================
+def benchmark(model, matches: pd.DataFrame, queries: int, horizon: int, target_prob: float, lazy: bool):
+    rng = np.random.default_rng(42)
+    rows = matches.dropna(subset=["team1", "team2", "venue"]).sample(
+        queries, replace=True, random_state=42
+    )
+
+    balls = rng.integers(30, 108, queries)
+    target = rng.integers(140, 221, queries)
+    state = match_state(
+        batting_team=rows["team2"].to_numpy(),
+        bowling_team=rows["team1"].to_numpy(),
+        venue=rows["venue"].to_numpy(),
+        target=target,
+        current_score=(target * balls / 120 * rng.uniform(0.7, 1.1, queries)).astype(int),
+        balls_bowled=balls,
+        wickets_fallen=rng.integers(0, 8, queries),
+        runs_last_6=rng.integers(0, 15, queries),
+        runs_last_12=rng.integers(8, 30, queries),
+    )
+
+    solver = ChaseSolver(model, compute_team_strength(matches), compute_venue_chase_bias(matches))
+    solver.runs_needed(state.iloc[:1], horizon, target_prob, lazy=lazy)
+
+    start = time.perf_counter()
+    answer = solver.runs_needed(state, horizon, target_prob, lazy=lazy)
+    batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(min(queries, 20)):
+        solver.runs_needed(state.iloc[[i]], horizon, target_prob, lazy=lazy)
+    single = (time.perf_counter() - start) / min(queries, 20)
+
+    print(answer[answer["query"] < 3].to_string(index=False))
+    print()
+    print(f"Queries        : {queries} x {answer['wickets_lost'].nunique()} wicket counts")
+    print(f"Batch solve    : {batch * 1000:.1f} ms ({batch / queries * 1000:.2f} ms per query)")
+    print(f"Single query   : {single * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs needed over the next few balls to reach a win probability."
+    )
+    parser.add_argument("--model", default=MODEL_FILES["XGBoost (Advanced)"])
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--horizon", type=int, default=12, help="balls ahead")
+    parser.add_argument("--target-prob", type=float, default=0.5)
+    parser.add_argument("--lazy", action="store_true",
+                        help="score only the bisection midpoints instead of the whole grid")
+    args = parser.parse_args()
+
+    matches = load_matches(args.matches)
+    benchmark(load_any(args.model), matches, args.queries, args.horizon, args.target_prob, args.lazy)
+
+
+if __name__ == "__main__":
+    main()
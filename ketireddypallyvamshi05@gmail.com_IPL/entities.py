@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+
+# ======================================================
+# CANONICAL ENTITIES (APPEND ONLY – POSITION IS THE CODE)
+# ======================================================
+# canonical name -> other spellings / former names seen in the data
+TEAMS = {
+    "Chennai Super Kings": [],
+    "Delhi Capitals": ["Delhi Daredevils"],
+    "Kings XI Punjab": ["Punjab Kings"],
+    "Kolkata Knight Riders": [],
+    "Mumbai Indians": [],
+    "Rajasthan Royals": [],
+    "Royal Challengers Bangalore": ["Royal Challengers Bengaluru"],
+    "Sunrisers Hyderabad": ["Deccan Chargers"],
+    "Gujarat Lions": [],
+    "Kochi Tuskers Kerala": [],
+    "Pune Warriors": [],
+    "Rising Pune Supergiant": ["Rising Pune Supergiants"],
+}
+
+VENUES = {
+    "ACA-VDCA Stadium": ["Dr. Y.S. Rajasekhara Reddy ACA-VDCA Cricket Stadium"],
+    "Barabati Stadium": [],
+    "Brabourne Stadium": [],
+    "Buffalo Park": [],
+    "De Beers Diamond Oval": [],
+    "Dr DY Patil Sports Academy": [],
+    "Dubai International Cricket Stadium": [],
+    "Eden Gardens": [],
+    "Feroz Shah Kotla": ["Feroz Shah Kotla Ground"],
+    "Green Park": [],
+    "Himachal Pradesh Cricket Association Stadium": [],
+    "Holkar Cricket Stadium": [],
+    "JSCA International Stadium Complex": [],
+    "Kingsmead": [],
+    "M Chinnaswamy Stadium": ["M. Chinnaswamy Stadium"],
+    "MA Chidambaram Stadium, Chepauk": ["M. A. Chidambaram Stadium"],
+    "Maharashtra Cricket Association Stadium": [],
+    "Nehru Stadium": [],
+    "New Wanderers Stadium": [],
+    "Newlands": [],
+    "OUTsurance Oval": [],
+    "Punjab Cricket Association Stadium, Mohali": [
+        "Punjab Cricket Association IS Bindra Stadium, Mohali",
+        "IS Bindra Stadium",
+    ],
+    "Rajiv Gandhi International Stadium, Uppal": ["Rajiv Gandhi Intl. Cricket Stadium"],
+    "Sardar Patel Stadium, Motera": [],
+    "Saurashtra Cricket Association Stadium": [],
+    "Sawai Mansingh Stadium": [],
+    "Shaheed Veer Narayan Singh International Stadium": [],
+    "Sharjah Cricket Stadium": [],
+    "Sheikh Zayed Stadium": [],
+    "St George's Park": [],
+    "Subrata Roy Sahara Stadium": [],
+    "SuperSport Park": [],
+    "Vidarbha Cricket Association Stadium, Jamtha": [],
+    "Wankhede Stadium": [],
+}
+
+CITIES = {
+    "Abu Dhabi": [],
+    "Ahmedabad": [],
+    "Bangalore": ["Bengaluru"],
+    "Bloemfontein": [],
+    "Cape Town": [],
+    "Centurion": [],
+    "Chandigarh": [],
+    "Chennai": [],
+    "Cuttack": [],
+    "Delhi": [],
+    "Dharamsala": [],
+    "Durban": [],
+    "East London": [],
+    "Hyderabad": [],
+    "Indore": [],
+    "Jaipur": [],
+    "Johannesburg": [],
+    "Kanpur": [],
+    "Kimberley": [],
+    "Kochi": [],
+    "Kolkata": [],
+    "Mohali": [],
+    "Mumbai": [],
+    "Nagpur": [],
+    "Port Elizabeth": [],
+    "Pune": [],
+    "Raipur": [],
+    "Rajkot": [],
+    "Ranchi": [],
+    "Sharjah": [],
+    "Visakhapatnam": [],
+}
+
+# the eight franchises that have played every season
+CORE_TEAMS = list(TEAMS)[:8]
+
+REGISTRY = {"team": TEAMS, "venue": VENUES, "city": CITIES}
+
+# which registry each known column belongs to
+COLUMN_KINDS = {
+    "team1": "team",
+    "team2": "team",
+    "toss_winner": "team",
+    "winner": "team",
+    "batting_team": "team",
+    "bowling_team": "team",
+    "venue": "venue",
+    "city": "city",
+}
+
+UNKNOWN = -1
+
+
+# ======================================================
+# LOOKUP TABLES (BUILT ONCE AT IMPORT)
+# ======================================================
+def _lookup(entities: dict) -> tuple:
+    """
+    Every spelling, plus a parallel array giving its entity code.
+    The extra trailing slot maps pandas' -1 (not found) to UNKNOWN.
+    """
+    spellings, codes = [], []
+    for code, (name, aliases) in enumerate(entities.items()):
+        for spelling in [name, *aliases]:
+            spellings.append(spelling)
+            codes.append(code)
+
+    return pd.Index(spellings), np.array(codes + [UNKNOWN], dtype=np.int16)
+
+
+_LOOKUPS = {kind: _lookup(entities) for kind, entities in REGISTRY.items()}
+
+
+def names(kind: str) -> list:
+    """
+    Canonical names of a registry, in code order.
+    """
+    return list(REGISTRY[kind])
+
+
+# ======================================================
+# VECTORIZED ENCODING
+# ======================================================
+def encode(values, kind: str) -> np.ndarray:
+    """
+    Small-integer codes for any mix of aliases; UNKNOWN for
+    names (or missing values) the registry does not know.
+    """
+    spellings, codes = _LOOKUPS[kind]
+    positions = pd.Categorical(values, categories=spellings).codes
+
+    return codes[positions]
+
+
+def canonicalize(values, kind: str, strict: bool = True) -> pd.Categorical:
+    """
+    Maps every alias to its canonical name in one categorical remap.
+    Category codes equal the registry codes. Raises on unknown names
+    instead of letting them one-hot encode to all zeros.
+    """
+    values = pd.Series(values)
+    codes = encode(values, kind)
+
+    unknown = (codes == UNKNOWN) & values.notna().to_numpy()
+    if strict and unknown.any():
+        missing = sorted(values[unknown].astype(str).unique())
+        raise ValueError(
+            f"Unknown {kind} name(s) {missing} – add them to entities.py"
+        )
+
+    return pd.Categorical.from_codes(codes, categories=names(kind))
+
+
+def canonicalize_frame(df: pd.DataFrame, strict: bool = True) -> pd.DataFrame:
+    """
+    Canonicalizes every team / venue / city column present in `df`.
+    """
+    columns = {
+        col: canonicalize(df[col].to_numpy(), kind, strict)
+        for col, kind in COLUMN_KINDS.items()
+        if col in df.columns
+    }
+
+    return df.assign(**columns)
+
+
+# ======================================================
+# OLDER MODELS TRAINED ON RAW NAMES
+# ======================================================
+def model_aliases(known, kind: str) -> dict:
+    """
+    Canonical name -> the spelling a fitted encoder actually knows
+    (for pickles trained before the registry existed).
+    """
+    known = set(known)
+    aliases = {}
+
+    for name, others in REGISTRY[kind].items():
+        for spelling in [name, *others]:
+            if spelling in known:
+                aliases[name] = spelling
+                break
+
+    return aliases
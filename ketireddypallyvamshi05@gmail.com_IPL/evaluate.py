@@ -0,0 +1,401 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.metrics import brier_score_loss, log_loss
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import KBinsDiscretizer, OneHotEncoder, OrdinalEncoder
+from threadpoolctl import threadpool_limits
+
+from utils import (
+    FEATURE_VERSION,
+    load_match_data,
+    build_chase_features,
+    compute_team_strength,
+    compute_venue_chase_bias
+)
+
+warnings.filterwarnings("ignore")
+
+
+# ======================================================
+# SETTINGS
+# ======================================================
+CACHE_DIR = "eval_cache"
+RESULTS_FILE = "eval_results.jsonl"
+TABLE_FILE = "eval_results.csv"
+RELIABILITY_FILE = "eval_reliability.csv"
+
+CAT_COLS = ["batting_team", "bowling_team", "venue", "phase"]
+
+BASE_FEATURES = [
+    "batting_team", "bowling_team", "venue", "phase",
+    "current_score", "balls_remaining", "wickets_remaining",
+    "runs_remaining", "current_run_rate", "required_run_rate",
+    "pressure", "runs_last_6", "runs_last_12",
+    "wkts_last_6", "wkts_last_12"
+]
+
+XGB_FEATURES = BASE_FEATURES[:11] + ["strength_diff", "venue_chase_bias"] + BASE_FEATURES[11:]
+
+CALIBRATION_BINS = 10
+
+
+# ======================================================
+# MODELS (SAME SETTINGS AS THE TRAINING SCRIPTS)
+# ======================================================
+def _pipeline(model, features):
+    num_cols = [c for c in features if c not in CAT_COLS]
+    preprocessor = ColumnTransformer(
+        [
+            ("cat", OneHotEncoder(handle_unknown="ignore"), CAT_COLS),
+            ("num", "passthrough", num_cols)
+        ]
+    )
+    return Pipeline([("prep", preprocessor), ("model", model)])
+
+
+def build_model(name: str):
+    """
+    (pipeline, feature list) for one model type. Every model runs
+    single-threaded: the process pool provides the parallelism.
+    """
+    if name == "xgboost":
+        from xgboost import XGBClassifier
+        model = XGBClassifier(
+            n_estimators=350,
+            max_depth=6,
+            learning_rate=0.05,
+            subsample=0.85,
+            colsample_bytree=0.85,
+            eval_metric="logloss",
+            random_state=42,
+            n_jobs=1
+        )
+        return _pipeline(model, XGB_FEATURES), XGB_FEATURES
+
+    if name == "hist_gbm":
+        num_cols = [c for c in BASE_FEATURES if c not in CAT_COLS]
+        binner = ColumnTransformer(
+            [
+                ("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=np.nan), CAT_COLS),
+                ("num", KBinsDiscretizer(
+                    n_bins=255, encode="ordinal", strategy="quantile",
+                    subsample=200_000, random_state=42
+                ), num_cols)
+            ]
+        )
+        model = HistGradientBoostingClassifier(
+            max_iter=200,
+            learning_rate=0.05,
+            max_leaf_nodes=15,
+            min_samples_leaf=200,
+            l2_regularization=1.0,
+            categorical_features=list(range(len(CAT_COLS))),
+            early_stopping=False,
+            random_state=42
+        )
+        return Pipeline([("prep", binner), ("model", model)]), BASE_FEATURES
+
+    if name == "logistic":
+        model = LogisticRegression(max_iter=1000)
+    elif name == "linear":
+        model = LinearRegression()
+    else:
+        raise ValueError(f"unknown model type {name!r}")
+
+    return _pipeline(model, BASE_FEATURES), BASE_FEATURES
+
+
+MODELS = ["xgboost", "hist_gbm", "logistic", "linear"]
+
+
+# ======================================================
+# FEATURE CACHE (BUILT ONCE, SHARED BY EVERY FOLD)
+# ======================================================
+def data_fingerprint(paths) -> str:
+    """
+    Cache key for files derived from `paths`: their sizes and mtimes
+    plus FEATURE_VERSION, so a change to the feature code is a miss.
+    """
+    h = hashlib.sha1(f"features-v{FEATURE_VERSION}".encode())
+    for path in paths:
+        stat = os.stat(path)
+        h.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return h.hexdigest()[:12]
+
+
+def season_of(matches: pd.DataFrame) -> pd.Series:
+    """
+    Season year per match ("IPL-2017" and 2017 both give 2017).
+    """
+    column = "Season" if "Season" in matches.columns else "season"
+    return matches[column].astype(str).str[-4:].astype(int)
+
+
+def cached_features(matches_path: str, deliveries_path: str) -> str:
+    """
+    Path of the cached feature frame for these csv files, building it
+    on the first call. Team strength and venue bias are left out: each
+    fold recomputes them from its own training seasons.
+    """
+    key = data_fingerprint([matches_path, deliveries_path])
+    path = os.path.join(CACHE_DIR, f"features_{key}.pkl")
+    if os.path.exists(path):
+        return path
+
+    matches, deliveries = load_match_data(matches_path, deliveries_path)
+    features = build_chase_features(matches, deliveries, {}, {})
+
+    seasons = season_of(matches).set_axis(matches["id"])
+    features["season"] = features["match_id"].map(seasons).to_numpy()
+
+    keep = ["match_id", "season", "win"] + [
+        c for c in XGB_FEATURES if c not in ("strength_diff", "venue_chase_bias")
+    ]
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    features[keep].to_pickle(path + ".tmp")
+    matches.to_pickle(os.path.join(CACHE_DIR, f"matches_{key}.pkl"))
+    os.replace(path + ".tmp", path)
+
+    return path
+
+
+# ======================================================
+# ONE FOLD (RUNS IN A WORKER PROCESS)
+# ======================================================
+_FRAMES = {}
+
+
+def _load(path: str) -> pd.DataFrame:
+    # each worker reads a cached frame once and keeps it
+    if path not in _FRAMES:
+        _FRAMES[path] = pd.read_pickle(path)
+    return _FRAMES[path]
+
+
+def calibration_error(y: np.ndarray, p: np.ndarray, bins: int = CALIBRATION_BINS) -> float:
+    """
+    Expected calibration error over equal-width probability bins.
+    """
+    which = np.minimum((p * bins).astype(int), bins - 1)
+    count = np.bincount(which, minlength=bins)
+    gap = np.abs(
+        np.bincount(which, weights=p, minlength=bins)
+        - np.bincount(which, weights=y, minlength=bins)
+    )
+    return float(gap.sum() / count.sum())
+
+
+def reliability_bins(y: np.ndarray, p: np.ndarray, bins: int = CALIBRATION_BINS) -> dict:
+    """
+    Rows, summed predictions and summed outcomes per equal-width
+    probability bin: the reliability diagram of one fold. Sums (not
+    means) so folds can be added up.
+    """
+    which = np.minimum((p * bins).astype(int), bins - 1)
+    return {
+        "rows": np.bincount(which, minlength=bins).tolist(),
+        "predicted": np.bincount(which, weights=p, minlength=bins).tolist(),
+        "observed": np.bincount(which, weights=y, minlength=bins).tolist(),
+    }
+
+
+def reliability_table(rows: list) -> pd.DataFrame:
+    """
+    Reliability diagram per model over all folds: for every
+    probability bin the rows, mean prediction and observed win rate.
+    """
+    parts = []
+    for model, group in pd.DataFrame(rows).groupby("model"):
+        bins = [r for r in group["reliability"] if isinstance(r, dict)]
+        if not bins:
+            continue
+        total = {key: np.sum([b[key] for b in bins], axis=0) for key in bins[0]}
+        n = np.maximum(total["rows"], 1)
+        parts.append(pd.DataFrame({
+            "model": model,
+            "bin": [f"{i / len(n):.1f}-{(i + 1) / len(n):.1f}" for i in range(len(n))],
+            "rows": total["rows"],
+            "predicted": total["predicted"] / n,
+            "observed": total["observed"] / n,
+        }))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def run_fold(model_name: str, test_season: int, features_path: str, matches_path: str) -> dict:
+    """
+    Trains `model_name` on every season before `test_season` and
+    scores `test_season`.
+    """
+    frame = _load(features_path)
+    matches = _load(matches_path)
+
+    train_matches = matches[season_of(matches) < test_season]
+    team_strength = compute_team_strength(train_matches)
+    venue_bias = compute_venue_chase_bias(train_matches)
+
+    frame = frame[frame["season"] <= test_season].copy()
+
+    # unseen teams / venues get the neutral 0.5, as in the app
+    frame["strength_diff"] = (
+        frame["batting_team"].map(team_strength).astype(float).fillna(0.5)
+        - frame["bowling_team"].map(team_strength).astype(float).fillna(0.5)
+    )
+    frame["venue_chase_bias"] = frame["venue"].map(venue_bias).astype(float).fillna(0.5)
+
+    pipe, features = build_model(model_name)
+    frame = frame[features + ["season", "win"]].dropna()
+
+    train = frame[frame["season"] < test_season]
+    test = frame[frame["season"] == test_season]
+
+    # hist_gbm has no n_jobs; cap its OpenMP threads the same way
+    start = time.perf_counter()
+    with threadpool_limits(1):
+        pipe.fit(train[features], train["win"])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if hasattr(pipe, "predict_proba"):
+        p = pipe.predict_proba(test[features])[:, 1]
+    else:
+        p = np.clip(pipe.predict(test[features]), 0, 1)
+    predict_seconds = time.perf_counter() - start
+
+    y = test["win"].to_numpy()
+    p_safe = np.clip(p, 1e-6, 1 - 1e-6)
+
+    return {
+        "model": model_name,
+        "test_season": int(test_season),
+        "train_rows": len(train),
+        "test_rows": len(test),
+        "brier": float(brier_score_loss(y, p)),
+        "log_loss": float(log_loss(y, p_safe, labels=[0, 1])),
+        "calibration_error": calibration_error(y, p),
+        "reliability": reliability_bins(y, p),
+        "accuracy": float(((p > 0.5) == y).mean()),
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+    }
+
+
+# ======================================================
+# RESUMABLE SWEEP
+# ======================================================
+def completed_runs(results_path: str, key: str) -> list:
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [r for r in rows if r.get("data") == key]
+
+
+def comparison_table(rows: list) -> pd.DataFrame:
+    """
+    Per model: test-row weighted Brier, log-loss, calibration error
+    and accuracy over all folds, plus total fit / predict time.
+    """
+    df = pd.DataFrame(rows)
+    weight = df["test_rows"]
+
+    table = pd.DataFrame({
+        metric: (df[metric] * weight).groupby(df["model"]).sum()
+        / weight.groupby(df["model"]).sum()
+        for metric in ["brier", "log_loss", "calibration_error", "accuracy"]
+    })
+    table["folds"] = df.groupby("model").size()
+    table["fit_seconds"] = df.groupby("model")["fit_seconds"].sum()
+    table["predict_seconds"] = df.groupby("model")["predict_seconds"].sum()
+
+    return table.sort_values("brier")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Season-forward walk evaluation of every model type."
+    )
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--models", nargs="+", default=MODELS, choices=MODELS)
+    parser.add_argument("--min-train-seasons", type=int, default=3,
+                        help="seasons always kept for training before the first test season")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--fresh", action="store_true",
+                        help="delete the results of earlier runs first")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    features_path = cached_features(args.matches, args.deliveries)
+    key = os.path.basename(features_path)[len("features_"):-len(".pkl")]
+    matches_path = os.path.join(CACHE_DIR, f"matches_{key}.pkl")
+    print(f"Features      : {features_path} ({time.perf_counter() - start:.1f}s)")
+
+    seasons = sorted(pd.read_pickle(features_path)["season"].unique())
+    test_seasons = seasons[args.min_train_seasons:]
+
+    if args.fresh and os.path.exists(RESULTS_FILE):
+        os.remove(RESULTS_FILE)
+
+    done = completed_runs(RESULTS_FILE, key)
+    finished = {
+        (r["model"], r["test_season"]) for r in done if r["model"] in args.models
+    }
+
+    jobs = [
+        (model, season)
+        for model in args.models
+        for season in test_seasons
+        if (model, season) not in finished
+    ]
+    print(f"Folds         : {len(test_seasons)} seasons x {len(args.models)} models "
+          f"({len(finished)} already done, {len(jobs)} to run)")
+
+    rows = list(done)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(run_fold, model, season, features_path, matches_path): (model, season)
+            for model, season in jobs
+        }
+        # every finished fold is appended at once, so an interrupted
+        # sweep resumes from the folds still missing
+        with open(RESULTS_FILE, "a") as f:
+            for future in as_completed(futures):
+                row = {**future.result(), "data": key}
+                f.write(json.dumps(row) + "\n")
+                f.flush()
+                rows.append(row)
+                print(f"  {row['model']:<14}{row['test_season']}  brier {row['brier']:.4f}  "
+                      f"fit {row['fit_seconds']:.1f}s")
+
+    rows = [r for r in rows if r["model"] in args.models]
+    table = comparison_table(rows)
+    table.to_csv(TABLE_FILE)
+
+    # folds from before reliability bins were recorded are left out
+    reliability = reliability_table([r for r in rows if "reliability" in r])
+    if not reliability.empty:
+        reliability.to_csv(RELIABILITY_FILE, index=False)
+
+    print()
+    print(table.round(4).to_string())
+    if not reliability.empty:
+        print("\nReliability (observed win rate per predicted-probability bin):")
+        print(reliability.pivot(index="bin", columns="model", values="observed").round(3).to_string())
+    print(f"\n✅ {TABLE_FILE}" + (f" and {RELIABILITY_FILE}" if not reliability.empty else "") + " written")
+
+
+if __name__ == "__main__":
+    main()
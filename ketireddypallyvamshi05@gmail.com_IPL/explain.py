@@ -0,0 +1,220 @@
+import argparse
+import pickle
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import OneHotEncoder
+
+from utils import (
+    MODEL_FILES,
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features,
+    model_features,
+    predict_win_prob
+)
+
+
+# ======================================================
+# FEATURE GROUPS (WHY DID THE PROBABILITY MOVE?)
+# ======================================================
+FEATURE_GROUPS = {
+    "match state": ["current_score", "balls_remaining", "wickets_remaining", "runs_remaining"],
+    "pressure": ["current_run_rate", "required_run_rate", "pressure"],
+    "momentum": ["runs_last_6", "runs_last_12", "wkts_last_6", "wkts_last_12"],
+    "venue": ["venue", "venue_chase_bias"],
+    "teams": ["batting_team", "bowling_team", "strength_diff"],
+    "phase": ["phase"],
+}
+
+
+# ======================================================
+# ONE-HOT COLUMNS -> ORIGINAL FEATURES
+# ======================================================
+def column_map(prep) -> tuple:
+    """
+    (features, matrix) where matrix[j, i] = 1 when transformed
+    column j came from input feature i. Multiplying per-column
+    contributions by it sums the one-hot columns back per feature.
+    """
+    features, owner = [], []
+
+    for _, transformer, cols in prep.transformers_:
+        if transformer == "drop":
+            continue
+        for i, col in enumerate(cols):
+            features.append(col)
+            if isinstance(transformer, OneHotEncoder):
+                width = len(transformer.categories_[i])
+                drop = getattr(transformer, "drop_idx_", None)
+                if drop is not None and drop[i] is not None:
+                    width -= 1
+            else:
+                width = 1
+            owner.extend([len(features) - 1] * width)
+
+    owner = np.asarray(owner)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(owner)), (np.arange(len(owner)), owner)),
+        shape=(len(owner), len(features))
+    )
+    return features, matrix
+
+
+# ======================================================
+# EXPLAINER
+# ======================================================
+class Explainer:
+    """
+    Per-feature contributions for a whole batch, in the model's
+    margin units (log-odds for XGBoost / logistic, probability for
+    linear). bias + sum(contributions) is the margin of every row.
+
+    XGBoost uses the booster's native contributions: the per-path
+    (Saabas) split by default, which costs about one prediction, or
+    exact TreeSHAP with exact=True (roughly 100x slower). Linear
+    pipelines use exact coefficient x value terms. Rows seen before
+    are answered from an LRU cache.
+    """
+
+    def __init__(self, pipe, exact: bool = False, max_entries: int = 100_000):
+        self.prep, self.model = pipe.steps[0][1], pipe.steps[-1][1]
+        self.inputs = model_features(pipe)
+        self.features, self.matrix = column_map(self.prep)
+
+        if hasattr(self.model, "get_booster"):
+            self.kind = "xgboost"
+        elif hasattr(self.model, "coef_"):
+            self.kind = "linear"
+        else:
+            raise ValueError(f"no explanation for {type(self.model).__name__} models")
+
+        self.units = "log-odds" if hasattr(self.model, "predict_proba") else "probability"
+        self.exact = exact
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+
+    def _contributions(self, X: pd.DataFrame) -> np.ndarray:
+        Xt = self.prep.transform(X)
+
+        if self.kind == "xgboost":
+            import xgboost as xgb
+            contribs = self.model.get_booster().predict(
+                xgb.DMatrix(Xt), pred_contribs=True, approx_contribs=not self.exact
+            )
+            columns, bias = contribs[:, :-1], contribs[:, -1]
+        else:
+            coef = np.ravel(self.model.coef_)
+            if sparse.issparse(Xt):
+                columns = Xt.multiply(coef).tocsr()
+            else:
+                columns = Xt * coef
+            bias = np.full(len(X), float(np.ravel(self.model.intercept_)[0]))
+
+        per_feature = columns @ self.matrix
+        per_feature = per_feature.toarray() if sparse.issparse(per_feature) else per_feature
+
+        return np.column_stack([per_feature, bias])
+
+    def explain(self, X: pd.DataFrame) -> pd.DataFrame:
+        """
+        One row per input row: a column per original feature plus
+        "bias". Only rows missing from the cache are computed, in
+        one batch.
+        """
+        X = X[self.inputs]
+        keys = pd.util.hash_pandas_object(X, index=False).to_numpy()
+
+        out = np.empty((len(X), len(self.features) + 1))
+        missing = []
+        for row, key in enumerate(keys):
+            hit = self.cache.get(key)
+            if hit is None:
+                missing.append(row)
+            else:
+                self.cache.move_to_end(key)
+                out[row] = hit
+
+        if missing:
+            computed = self._contributions(X.iloc[missing])
+            out[missing] = computed
+            for key, values in zip(keys[missing], computed):
+                self.cache[key] = values
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+        return pd.DataFrame(out, columns=self.features + ["bias"], index=X.index)
+
+
+def group_contributions(contributions: pd.DataFrame, groups: dict = FEATURE_GROUPS) -> pd.DataFrame:
+    """
+    Sums feature contributions into the FEATURE_GROUPS buckets
+    (features a model does not use are skipped).
+    """
+    return pd.DataFrame({
+        group: contributions[[f for f in features if f in contributions]].sum(axis=1)
+        for group, features in groups.items()
+    })
+
+
+# ======================================================
+# BENCHMARK (1,000-STATE TIMELINE)
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time batched explanations against plain scoring."
+    )
+    parser.add_argument("--model", default=MODEL_FILES["XGBoost (Advanced)"])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--exact", action="store_true",
+                        help="exact TreeSHAP for XGBoost instead of per-path contributions")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        pipe = pickle.load(f)
+
+    matches, deliveries = load_match_data()
+    deliveries = build_chase_features(
+        matches,
+        deliveries,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches)
+    )
+    X = deliveries[model_features(pipe)].dropna().iloc[:args.rows]
+
+    explainer = Explainer(pipe, exact=args.exact)
+
+    start = time.perf_counter()
+    # the contributions rebuild the model's own output, before calibration
+    p = predict_win_prob(pipe, X, calibrated=False)
+    score_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    contributions = explainer.explain(X)
+    explain_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    explainer.explain(X)
+    cached_ms = (time.perf_counter() - start) * 1000
+
+    margin = contributions.sum(axis=1).to_numpy()
+    if hasattr(pipe, "predict_proba"):
+        rebuilt = 1 / (1 + np.exp(-margin))
+    else:
+        rebuilt = np.clip(margin, 0, 1)
+
+    print(f"Rows              : {len(X)}")
+    print(f"Score             : {score_ms:.1f} ms")
+    print(f"Explain           : {explain_ms:.1f} ms")
+    print(f"Explain (cached)  : {cached_ms:.1f} ms")
+    print(f"max |p - Σ contr.|: {np.abs(rebuilt - p).max():.2e}")
+    print()
+    print(group_contributions(contributions).iloc[-5:].round(3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.isotonic import IsotonicRegression
+
+from entities import UNKNOWN, encode, names
+from utils import load_match_data
+
+
+# ======================================================
+# INDEX LAYOUT
+# ======================================================
+INDEX_FILE = "first_innings_index.npz"
+
+MAX_BALLS = 120
+MAX_WICKETS = 10
+MAX_SCORE = 400
+
+# runs-still-to-come quantiles stored per state
+QUANTILES = np.array([0.1, 0.25, 0.5, 0.75, 0.9])
+
+# states seen fewer times than this at a venue use the all-venue row
+MIN_VENUE_SAMPLES = 20
+
+
+# ======================================================
+# FIRST INNINGS STATES (ONE GROUPED PASS)
+# ======================================================
+def first_innings_states(matches: pd.DataFrame, deliveries: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per first innings delivery with the state after that ball
+    (legal balls bowled, wickets, score) and the innings' final total.
+    """
+    first = deliveries[
+        (deliveries["inning"] == 1)
+        & deliveries["match_id"].isin(matches["id"])
+    ]
+
+    legal = (first["wide_runs"] == 0) & (first["noball_runs"] == 0)
+    grouped = first.assign(
+        legal=legal.astype(int),
+        is_wicket=first["player_dismissed"].notna().astype(int)
+    ).groupby("match_id")
+
+    states = pd.DataFrame({
+        "match_id": first["match_id"],
+        "bowling_team": first["bowling_team"],
+        "balls": grouped["legal"].cumsum().clip(upper=MAX_BALLS),
+        "wickets": grouped["is_wicket"].cumsum().clip(upper=MAX_WICKETS),
+        "score": grouped["total_runs"].cumsum(),
+    })
+
+    # the state before the first ball of each innings
+    start = states.drop_duplicates("match_id").assign(balls=0, wickets=0, score=0)
+    states = pd.concat([start, states], ignore_index=True)
+
+    states["final"] = states.groupby("match_id")["score"].transform("max")
+
+    return states
+
+
+def chase_curve(matches: pd.DataFrame, states: pd.DataFrame) -> np.ndarray:
+    """
+    P(chasing side wins | target) for every target 0..MAX_SCORE,
+    fitted as a decreasing isotonic curve.
+    """
+    innings = states.groupby("match_id").agg(
+        final=("final", "max"), chasing=("bowling_team", "first")
+    )
+    winner = matches.set_index("id")["winner"].reindex(innings.index)
+
+    totals = innings["final"]
+    chase_win = (winner == innings["chasing"]).astype(float)
+
+    curve = IsotonicRegression(increasing=False, out_of_bounds="clip")
+    curve.fit(totals.to_numpy() + 1, chase_win.to_numpy())
+
+    return curve.predict(np.arange(MAX_SCORE + 1)).astype(np.float32)
+
+
+def cell_quantiles(cell: np.ndarray, values: np.ndarray, n_cells: int) -> tuple:
+    """
+    Sample count and QUANTILES of `values` for every cell id, using a
+    single sort instead of a groupby per cell.
+    """
+    order = np.lexsort((values, cell))
+    sorted_values = values[order]
+
+    counts = np.bincount(cell, minlength=n_cells)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    offsets = np.floor(QUANTILES[None, :] * (counts[:, None] - 1).clip(min=0))
+    positions = (starts[:, None] + offsets.astype(np.int64)).clip(max=len(values) - 1)
+
+    out = sorted_values[positions].astype(np.float32)
+    out[counts == 0] = np.nan
+
+    return counts, out
+
+
+def fill_sparse(table: np.ndarray):
+    """
+    Fills empty (balls, wickets) cells from the neighbour with one
+    wicket fewer, then from the previous ball.
+    """
+    for w in range(1, MAX_WICKETS + 1):
+        empty = np.isnan(table[:, w, 0])
+        table[empty, w] = table[empty, w - 1]
+
+    for b in range(1, MAX_BALLS + 1):
+        empty = np.isnan(table[b, :, 0])
+        table[b, empty] = table[b - 1, empty]
+
+
+# ======================================================
+# BUILD / SAVE / LOAD
+# ======================================================
+def build_first_innings_index(matches: pd.DataFrame, deliveries: pd.DataFrame) -> dict:
+    """
+    Precomputes projected-total quantiles, par scores and the chase
+    curve as compact arrays indexed by (balls, wickets, venue).
+    """
+    states = first_innings_states(matches, deliveries)
+
+    venues = np.array(names("venue"))
+    n_venues = len(venues)
+
+    venue_of = matches.set_index("id")["venue"]
+    venue_code = encode(states["match_id"].map(venue_of), "venue").astype(np.int64)
+    # the extra last venue slot pools every ground
+    venue_code[venue_code == UNKNOWN] = n_venues
+
+    balls = states["balls"].to_numpy(np.int64)
+    wickets = states["wickets"].to_numpy(np.int64)
+    remaining = (states["final"] - states["score"]).to_numpy(np.float64)
+
+    n_slots = n_venues + 1
+    n_cells = (MAX_BALLS + 1) * (MAX_WICKETS + 1) * n_slots
+    base = (balls * (MAX_WICKETS + 1) + wickets) * n_slots
+
+    # every row counts once for its venue and once for the pooled slot
+    cell = np.concatenate((base + venue_code, base + n_venues))
+    counts, remaining_q = cell_quantiles(
+        cell, np.concatenate((remaining, remaining)), n_cells
+    )
+
+    shape = (MAX_BALLS + 1, MAX_WICKETS + 1, n_slots)
+    counts = counts.reshape(shape)
+    remaining_q = remaining_q.reshape(shape + (len(QUANTILES),))
+
+    pooled = remaining_q[:, :, n_venues]
+    fill_sparse(pooled)
+
+    sparse = counts < MIN_VENUE_SAMPLES
+    remaining_q[sparse] = np.broadcast_to(
+        pooled[:, :, None, :], remaining_q.shape
+    )[sparse]
+
+    # par score: mean score at (balls, wickets), per venue, over the
+    # same cells and with the same fallbacks as the projection
+    par_sum = np.bincount(
+        cell,
+        weights=np.concatenate((states["score"], states["score"])),
+        minlength=n_cells
+    ).reshape(shape)
+    par = par_sum / np.maximum(counts, 1)
+    par[counts == 0] = np.nan
+
+    fill_sparse(par[:, :, n_venues, None])
+    par[sparse] = np.broadcast_to(par[:, :, n_venues:], par.shape)[sparse]
+
+    return {
+        "venues": venues,
+        "quantiles": QUANTILES.astype(np.float32),
+        "remaining": remaining_q.astype(np.float32),
+        "counts": counts.astype(np.int32),
+        "par": par.astype(np.float32),
+        "chase_win": chase_curve(matches, states),
+    }
+
+
+def save_first_innings_index(index: dict, path: str = INDEX_FILE):
+    np.savez_compressed(path, **index)
+
+
+def load_first_innings_index(path: str = INDEX_FILE) -> dict:
+    with np.load(path, allow_pickle=False) as data:
+        return {key: data[key] for key in data.files}
+
+
+# ======================================================
+# O(1) LOOKUP (SCALARS OR WHOLE BATCHES)
+# ======================================================
+def project_first_innings(index: dict, balls, wickets, score, venue) -> pd.DataFrame:
+    """
+    Projected final total, par score and win probability of the side
+    batting first, for any first innings state(s).
+    Venues may be any alias; unknown ones use the all-venue row.
+    """
+    balls = np.clip(np.atleast_1d(np.asarray(balls, dtype=np.int64)), 0, MAX_BALLS)
+    wickets = np.clip(np.atleast_1d(np.asarray(wickets, dtype=np.int64)), 0, MAX_WICKETS)
+    score = np.atleast_1d(np.asarray(score, dtype=np.float64))
+
+    # venue slots are registry codes; the last slot pools every ground
+    n_venues = len(index["venues"])
+    slot = encode(np.atleast_1d(venue), "venue").astype(np.int64)
+    slot = np.where((slot >= 0) & (slot < n_venues), slot, n_venues)
+
+    balls, wickets, score, slot = np.broadcast_arrays(balls, wickets, score, slot)
+
+    remaining = index["remaining"][balls, wickets, slot]
+    totals = score[:, None] + remaining
+
+    # all out or overs done: nothing left to add
+    finished = (balls >= MAX_BALLS) | (wickets >= MAX_WICKETS)
+    totals[finished] = score[finished, None]
+
+    chase_win = index["chase_win"]
+    targets = np.clip(totals + 1, 0, len(chase_win) - 1).astype(np.int64)
+    win_prob = 1.0 - chase_win[targets].mean(axis=1)
+
+    quantiles = index["quantiles"]
+    median = int(np.argmin(np.abs(quantiles - 0.5)))
+
+    return pd.DataFrame({
+        "projected_total": totals[:, median],
+        "projected_low": totals[:, 0],
+        "projected_high": totals[:, -1],
+        "par_score": index["par"][balls, wickets, slot],
+        "win_prob": win_prob,
+    })
+
+
+# ======================================================
+# MAIN
+# ======================================================
+if __name__ == "__main__":
+    start = time.perf_counter()
+    matches, deliveries = load_match_data()
+
+    index = build_first_innings_index(matches, deliveries)
+    save_first_innings_index(index)
+
+    size = sum(a.nbytes for a in index.values())
+    print(f"Venues indexed : {len(index['venues'])}")
+    print(f"Index size     : {size / 1e6:.2f} MB in memory")
+    print(f"Build time     : {time.perf_counter() - start:.1f}s")
+    print(f"✅ {INDEX_FILE} saved successfully")
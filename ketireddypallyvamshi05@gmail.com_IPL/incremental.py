@@ -0,0 +1,292 @@
+import argparse
+import os
+import pickle
+import time
+import warnings
+warnings.filterwarnings("ignore")
+
+import numpy as np
+from sklearn.base import clone
+
+from utils import (
+    load_match_data,
+    compute_team_record,
+    compute_venue_record,
+    team_strength_from_record,
+    venue_bias_from_record,
+    build_chase_features,
+    model_features
+)
+
+
+# ======================================================
+# FILES
+# ======================================================
+STATE_FILE = "incremental_state.pkl"
+XGB_FILE = "model.pkl"
+LOGISTIC_FILE = "logistic_model.pkl"
+
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_pickle(obj, path):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f)
+
+
+# ======================================================
+# TRAINING STATE (SEEN MATCHES + RAW COUNTS)
+# ======================================================
+def init_state(matches) -> dict:
+    """
+    Snapshot of the data the current models were trained on.
+    Counts are kept raw so new matches can be added in place.
+    """
+    team_matches, team_wins = compute_team_record(matches)
+    venue_games, venue_chase_wins = compute_venue_record(matches)
+
+    return {
+        "match_ids": set(matches["id"]),
+        "team_matches": team_matches,
+        "team_wins": team_wins,
+        "venue_games": venue_games,
+        "venue_chase_wins": venue_chase_wins,
+    }
+
+
+def add_to_counts(counts: dict, new_counts: dict):
+    for key, value in new_counts.items():
+        counts[key] = counts.get(key, 0) + value
+
+
+def update_state(state: dict, new_matches):
+    """
+    Folds the new matches into team strength and venue bias counts.
+    """
+    team_matches, team_wins = compute_team_record(new_matches)
+    venue_games, venue_chase_wins = compute_venue_record(new_matches)
+
+    add_to_counts(state["team_matches"], team_matches)
+    add_to_counts(state["team_wins"], team_wins)
+    add_to_counts(state["venue_games"], venue_games)
+    add_to_counts(state["venue_chase_wins"], venue_chase_wins)
+
+    state["match_ids"].update(new_matches["id"])
+
+
+def state_maps(state: dict) -> tuple:
+    team_strength = team_strength_from_record(
+        state["team_matches"], state["team_wins"]
+    )
+    venue_bias = venue_bias_from_record(
+        state["venue_games"], state["venue_chase_wins"]
+    )
+    return team_strength, venue_bias
+
+
+# ======================================================
+# INCREMENTAL UPDATES
+# ======================================================
+def continue_boosting(pipe, X, y, rounds: int):
+    """
+    Adds `rounds` trees to the fitted XGBoost booster using only
+    the new rows. The one-hot encoder is reused as fitted.
+    """
+    model = pipe.named_steps["model"]
+    booster = model.get_booster()
+    total_rounds = booster.num_boosted_rounds() + rounds
+
+    Xt = pipe.named_steps["prep"].transform(X)
+    model.set_params(n_estimators=rounds)
+    model.fit(Xt, y, xgb_model=booster)
+    model.set_params(n_estimators=total_rounds)
+
+    return pipe
+
+
+def warm_start_logistic(pipe, X, y, max_iter: int, sample_weight=None):
+    """
+    Refits the logistic model on every row seen so far, starting
+    from the current coefficients. The loss is convex, so a fit on
+    the new rows alone would forget the earlier seasons; the warm
+    start only makes the refit converge in fewer iterations.
+    """
+    model = pipe.named_steps["model"]
+    Xt = pipe.named_steps["prep"].transform(X)
+
+    model.set_params(warm_start=True, max_iter=max_iter)
+    model.fit(Xt, y, sample_weight=sample_weight)
+
+    return pipe
+
+
+def unknown_categories(pipe, X) -> dict:
+    """
+    Values in the new rows that the fitted encoder has never seen
+    (they one-hot to all zeros).
+    """
+    prep = pipe.named_steps["prep"]
+    unknown = {}
+
+    for _, transformer, cols in prep.transformers_:
+        if not hasattr(transformer, "categories_"):
+            continue
+        for col, known in zip(cols, transformer.categories_):
+            missing = sorted(set(X[col].dropna()) - set(known))
+            if missing:
+                unknown[col] = missing
+
+    return unknown
+
+
+# ======================================================
+# DRIFT CHECK AGAINST A FULL RETRAIN
+# ======================================================
+def drift_report(name, pipe, matches, deliveries, state, new_ids):
+    """
+    Retrains a copy of `pipe` from scratch on all history and
+    compares its probabilities with the incremental model.
+    """
+    team_strength, venue_bias = state_maps(state)
+    full = build_chase_features(matches, deliveries, team_strength, venue_bias)
+
+    features = model_features(pipe)
+    full = full[features + ["win", "match_id"]].dropna()
+    X, y = full[features], full["win"]
+
+    fresh = clone(pipe)
+    if name == "xgboost":
+        total = pipe.named_steps["model"].get_booster().num_boosted_rounds()
+        fresh.set_params(model__n_estimators=total)
+    else:
+        fresh.set_params(model__warm_start=False, model__max_iter=1000)
+
+    start = time.perf_counter()
+    fresh.fit(X, y)
+    fit_time = time.perf_counter() - start
+
+    p_inc = pipe.predict_proba(X)[:, 1]
+    p_full = fresh.predict_proba(X)[:, 1]
+    diff = np.abs(p_inc - p_full)
+    is_new = full["match_id"].isin(new_ids).to_numpy()
+
+    print(f"  [{name}] full retrain took {fit_time:.1f}s")
+    print(f"  [{name}] mean |Δp| all rows : {diff.mean():.4f}")
+    print(f"  [{name}] mean |Δp| new rows : {diff[is_new].mean():.4f}")
+    print(f"  [{name}] max  |Δp|          : {diff.max():.4f}")
+    print(f"  [{name}] Brier incremental  : {np.mean((p_inc - y) ** 2):.4f}")
+    print(f"  [{name}] Brier full retrain : {np.mean((p_full - y) ** 2):.4f}")
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Update model.pkl and logistic_model.pkl with new matches only."
+    )
+    parser.add_argument(
+        "--init", action="store_true",
+        help="record the current matches as already trained and exit"
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=50,
+        help="extra boosting rounds for the XGBoost model"
+    )
+    parser.add_argument(
+        "--logit-iters", type=int, default=100,
+        help="max warm-start iterations for the logistic model"
+    )
+    parser.add_argument(
+        "--old-weight", type=float, default=1.0,
+        help="sample weight of already-trained matches in the logistic refit"
+    )
+    parser.add_argument(
+        "--check-drift", action="store_true",
+        help="also retrain from scratch and report the difference"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matches, deliveries = load_match_data()
+
+    if args.init:
+        save_pickle(init_state(matches), STATE_FILE)
+        print(f"✅ {STATE_FILE} initialised with {matches['id'].nunique()} matches")
+        return
+
+    if not os.path.exists(STATE_FILE):
+        parser.error(
+            f"{STATE_FILE} not found – run with --init right after training, "
+            "before new matches are added to the csv files"
+        )
+
+    state = load_pickle(STATE_FILE)
+
+    new_ids = set(deliveries["match_id"]) - state["match_ids"]
+    new_matches = matches[matches["id"].isin(new_ids)]
+
+    if new_matches.empty:
+        print("No new matches – models are up to date.")
+        return
+
+    print(f"New matches found: {len(new_matches)}")
+
+    update_state(state, new_matches)
+    team_strength, venue_bias = state_maps(state)
+
+    new_rows = build_chase_features(
+        new_matches,
+        deliveries[deliveries["match_id"].isin(new_matches["id"])],
+        team_strength,
+        venue_bias
+    )
+    # the logistic refit needs every match, old ones at --old-weight
+    all_rows = build_chase_features(matches, deliveries, team_strength, venue_bias)
+    print(f"Features: {time.perf_counter() - start:.1f}s")
+
+    updates = [
+        ("xgboost", XGB_FILE, new_rows),
+        ("logistic", LOGISTIC_FILE, all_rows),
+    ]
+
+    uncalibrated = []
+    for name, path, rows in updates:
+        pipe = load_pickle(path)
+        features = model_features(pipe)
+        df = rows[features + ["win", "match_id"]].dropna()
+
+        unknown = unknown_categories(pipe, df)
+        if unknown:
+            print(f"  [{name}] unseen categories (encoded as zeros): {unknown}")
+
+        step = time.perf_counter()
+        if name == "xgboost":
+            continue_boosting(pipe, df[features], df["win"], args.rounds)
+        else:
+            weight = np.where(df["match_id"].isin(new_ids), 1.0, args.old_weight)
+            warm_start_logistic(pipe, df[features], df["win"], args.logit_iters, weight)
+        print(f"  [{name}] updated on {len(df)} rows in {time.perf_counter() - step:.1f}s")
+
+        # the map was fitted to the previous model's outputs
+        if getattr(pipe, "calibration_", None) is not None:
+            pipe.calibration_ = None
+            uncalibrated.append(path)
+
+        if args.check_drift:
+            drift_report(name, pipe, matches, deliveries, state, new_ids)
+
+        save_pickle(pipe, path)
+
+    save_pickle(state, STATE_FILE)
+
+    print(f"✅ Incremental update finished in {time.perf_counter() - start:.1f}s")
+    if uncalibrated:
+        print(f"⚠️  calibration maps removed from {', '.join(uncalibrated)} – re-run calibrate.py")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from compact_trees import load_any
+from entities import CORE_TEAMS, UNKNOWN, encode, names
+from utils import (
+    MODEL_FILES,
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_state_frame,
+    predict_win_prob
+)
+
+
+# ======================================================
+# MATCH BOOK (ONE ROW OF NUMPY COLUMNS PER CHASE)
+# ======================================================
+# Per-match storage (bytes):
+#   batting, bowling, venue, target, score,
+#   balls, deliveries                        7 x int16   14
+#   wickets                                  int8         1
+#   recent_runs, recent_wkts  (12-ball ring) 2 x 12 int8 24
+#   win_prob                                 float32      4
+#   scored_tick                              uint32       4
+#   dirty, active                            2 x bool     2
+#                                                        --
+#                                                        49
+# plus one dict entry and one list slot for the match id (~100 bytes).
+# Columns grow by doubling, so there is no per-match Python object.
+WINDOW = 12
+
+COLUMNS = {
+    "batting": np.int16,
+    "bowling": np.int16,
+    "venue": np.int16,
+    "target": np.int16,
+    "score": np.int16,
+    "balls": np.int16,
+    "deliveries": np.int16,
+    "wickets": np.int8,
+    "win_prob": np.float32,
+    "scored_tick": np.uint32,
+    "dirty": bool,
+    "active": bool,
+}
+
+RINGS = {
+    "recent_runs": np.int8,
+    "recent_wkts": np.int8,
+}
+
+
+class MatchBook:
+    """
+    Live (or replayed) chases, all scored together. Ball events only
+    update the columns and mark the match dirty; tick() scores every
+    dirty match in one batch and notifies subscribers.
+    """
+
+    def __init__(self, model, team_strength: dict, venue_bias: dict, capacity: int = 1024):
+        self.model = model
+        self.team_strength = team_strength
+        self.venue_bias = venue_bias
+
+        self.team_names = np.array(names("team"), dtype=object)
+        self.venue_names = np.array(names("venue"), dtype=object)
+
+        self.ticks = 0
+        self.last_features = None
+        self.slots = {}
+        self.ids = []
+        self.free = []
+        self.subscribers = {}
+        self._next_token = 0
+
+        self.capacity = 0
+        self._grow(capacity)
+
+    # --------------------------------------------------
+    # STORAGE
+    # --------------------------------------------------
+    def _grow(self, capacity: int):
+        for name, dtype in COLUMNS.items():
+            column = np.zeros(capacity, dtype=dtype)
+            column[:self.capacity] = getattr(self, name, column)[:self.capacity]
+            setattr(self, name, column)
+
+        for name, dtype in RINGS.items():
+            ring = np.zeros((capacity, WINDOW), dtype=dtype)
+            ring[:self.capacity] = getattr(self, name, ring)[:self.capacity]
+            setattr(self, name, ring)
+
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def bytes_per_match(self) -> int:
+        """
+        Array storage per match (excludes the match id index).
+        """
+        return (
+            sum(np.dtype(dtype).itemsize for dtype in COLUMNS.values())
+            + sum(np.dtype(dtype).itemsize * WINDOW for dtype in RINGS.values())
+        )
+
+    def _slots(self, match_ids) -> np.ndarray:
+        try:
+            return np.fromiter((self.slots[m] for m in match_ids), dtype=np.int64)
+        except KeyError as exc:
+            raise KeyError(f"match {exc.args[0]!r} is not tracked") from None
+
+    # --------------------------------------------------
+    # MATCHES
+    # --------------------------------------------------
+    def add_match(self, match_id, batting_team: str, bowling_team: str, venue: str, target: int):
+        """
+        Starts tracking a chase at 0/0 after 0 balls.
+        """
+        if match_id in self.slots:
+            raise ValueError(f"match {match_id!r} is already tracked")
+
+        teams = encode([batting_team, bowling_team], "team")
+        venue_code = encode([venue], "venue")[0]
+        if (teams == UNKNOWN).any() or venue_code == UNKNOWN:
+            raise ValueError(
+                f"Unknown team / venue in {batting_team!r}, {bowling_team!r}, {venue!r} "
+                "– add them to entities.py"
+            )
+
+        if self.free:
+            slot = self.free.pop()
+            self.ids[slot] = match_id
+        else:
+            slot = len(self.ids)
+            if slot == self.capacity:
+                self._grow(2 * self.capacity)
+            self.ids.append(match_id)
+
+        self.slots[match_id] = slot
+
+        for name in COLUMNS:
+            getattr(self, name)[slot] = 0
+        for name in RINGS:
+            getattr(self, name)[slot] = 0
+
+        self.batting[slot], self.bowling[slot] = teams
+        self.venue[slot] = venue_code
+        self.target[slot] = target
+        self.active[slot] = True
+        self.dirty[slot] = True
+
+        return slot
+
+    def remove_match(self, match_id):
+        slot = self.slots.pop(match_id)
+        self.active[slot] = False
+        self.dirty[slot] = False
+        self.ids[slot] = None
+        self.free.append(slot)
+
+        for _, watched, on_remove in self.subscribers.values():
+            if on_remove is not None and (watched is None or match_id in watched):
+                on_remove(match_id)
+
+    def set_state(self, match_id, score: int, balls: int, wickets: int):
+        """
+        Jumps a match to a given state (replays, corrections).
+        The recent-ball window is cleared.
+        """
+        slot = self.slots[match_id]
+        self.score[slot] = score
+        self.balls[slot] = balls
+        self.wickets[slot] = wickets
+        self.deliveries[slot] = 0
+        self.recent_runs[slot] = 0
+        self.recent_wkts[slot] = 0
+        self.dirty[slot] = True
+
+    # --------------------------------------------------
+    # BALL EVENTS
+    # --------------------------------------------------
+    def record_balls(self, match_ids, runs, wickets=0, legal=True):
+        """
+        Applies a batch of deliveries, in order. A match may appear
+        several times in one batch.
+        """
+        slots = self._slots(match_ids)
+        runs = np.broadcast_to(np.asarray(runs, dtype=np.int16), slots.shape)
+        wickets = np.broadcast_to(np.asarray(wickets, dtype=np.int8), slots.shape)
+        legal = np.broadcast_to(np.asarray(legal, dtype=np.int16), slots.shape)
+
+        # position of each event among the batch's events for its match
+        order = np.argsort(slots, kind="stable")
+        sorted_slots = slots[order]
+        starts = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]])
+        group_size = np.diff(np.r_[starts, len(slots)])
+        rank = np.empty(len(slots), dtype=np.int64)
+        rank[order] = np.arange(len(slots)) - np.repeat(starts, group_size)
+
+        ring = (self.deliveries[slots] + rank) % WINDOW
+        self.recent_runs[slots, ring] = runs
+        self.recent_wkts[slots, ring] = wickets
+
+        np.add.at(self.deliveries, slots, 1)
+        np.add.at(self.score, slots, runs)
+        np.add.at(self.wickets, slots, wickets)
+        np.add.at(self.balls, slots, legal)
+
+        self.dirty[slots] = True
+
+    def record_ball(self, match_id, runs: int, wicket: bool = False, legal: bool = True):
+        self.record_balls([match_id], runs, int(wicket), legal)
+
+    # --------------------------------------------------
+    # SCORING
+    # --------------------------------------------------
+    def _features(self, slots: np.ndarray) -> pd.DataFrame:
+        # newest delivery first: the last 6 ring positions before the cursor
+        latest = (self.deliveries[slots, None] - 1 - np.arange(6)) % WINDOW
+        rows = slots[:, None]
+
+        return build_state_frame(
+            self.team_names[self.batting[slots]],
+            self.team_names[self.bowling[slots]],
+            self.venue_names[self.venue[slots]],
+            self.balls[slots],
+            self.score[slots],
+            self.wickets[slots],
+            self.target[slots],
+            self.team_strength,
+            self.venue_bias,
+            runs_last_6=self.recent_runs[rows, latest].sum(axis=1),
+            runs_last_12=self.recent_runs[slots].sum(axis=1),
+            wkts_last_6=self.recent_wkts[rows, latest].sum(axis=1),
+            wkts_last_12=self.recent_wkts[slots].sum(axis=1),
+        )
+
+    def tick(self) -> tuple:
+        """
+        Scores every match that changed since the last tick in one
+        batch. Returns (match_ids, win_probs) of the scored matches.
+        """
+        slots = np.flatnonzero(self.dirty & self.active)
+        if not len(slots):
+            return [], np.empty(0, dtype=np.float32)
+
+        self.ticks += 1
+
+        # kept for subscribers that need more than the probability
+        # (swings.py); row i belongs to the i-th scored match
+        self.last_features = self._features(slots)
+        p = predict_win_prob(self.model, self.last_features)
+
+        self.win_prob[slots] = p
+        self.scored_tick[slots] = self.ticks
+        self.dirty[slots] = False
+
+        match_ids = [self.ids[s] for s in slots]
+        for callback, watched, _ in self.subscribers.values():
+            if watched is None:
+                callback(match_ids, self.win_prob[slots])
+                continue
+            keep = np.fromiter((m in watched for m in match_ids), dtype=bool, count=len(match_ids))
+            if keep.any():
+                callback([m for m, k in zip(match_ids, keep) if k], self.win_prob[slots[keep]])
+
+        return match_ids, self.win_prob[slots]
+
+    # --------------------------------------------------
+    # READERS
+    # --------------------------------------------------
+    def subscribe(self, callback, match_ids=None, on_remove=None) -> int:
+        """
+        callback(match_ids, win_probs) runs after every tick that scored
+        any of `match_ids` (all matches when None), and on_remove(match_id)
+        when one of them is removed. Returns a token for unsubscribe().
+
+        Matches are watched by id, not slot: a removed match's slot is
+        reused by the next add_match.
+        """
+        watched = None if match_ids is None else set(match_ids)
+        token = self._next_token
+        self._next_token += 1
+        self.subscribers[token] = (callback, watched, on_remove)
+        return token
+
+    def unsubscribe(self, token: int):
+        self.subscribers.pop(token, None)
+
+    def poll(self, cursor: int = 0) -> tuple:
+        """
+        Matches scored after tick `cursor`. Returns (new cursor,
+        match_ids, win_probs); pass the new cursor to the next poll.
+        """
+        slots = np.flatnonzero(self.active & (self.scored_tick > cursor))
+        return self.ticks, [self.ids[s] for s in slots], self.win_prob[slots]
+
+    def win_probability(self, match_id) -> float:
+        return float(self.win_prob[self.slots[match_id]])
+
+
+# ======================================================
+# BENCHMARK
+# ======================================================
+def benchmark(model, team_strength, venue_bias, n_matches, ticks, changed, seed=0):
+    rng = np.random.default_rng(seed)
+    venues = sorted(venue_bias)
+
+    tracemalloc.start()
+    book = MatchBook(model, team_strength, venue_bias)
+    for i in range(n_matches):
+        batting, bowling = rng.choice(CORE_TEAMS, 2, replace=False)
+        book.add_match(i, batting, bowling, venues[i % len(venues)], int(rng.integers(120, 230)))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    book.tick()
+
+    per_tick = []
+    batch = max(1, int(n_matches * changed))
+    for _ in range(ticks):
+        ids = rng.choice(n_matches, batch, replace=False)
+        book.record_balls(
+            ids,
+            rng.choice([0, 1, 1, 2, 4, 6], batch),
+            (rng.random(batch) < 0.05).astype(np.int8)
+        )
+        start = time.perf_counter()
+        book.tick()
+        per_tick.append(time.perf_counter() - start)
+
+    per_tick = np.array(per_tick) * 1000
+
+    print(f"Matches tracked   : {n_matches}")
+    print(f"Array storage     : {book.bytes_per_match()} bytes / match")
+    print(f"Total (traced)    : {memory / n_matches:.0f} bytes / match")
+    print(f"Changed per tick  : {batch}")
+    print(f"Tick (median)     : {np.median(per_tick):.1f} ms")
+    print(f"Per changed match : {np.median(per_tick) / batch * 1000:.1f} µs")
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark batched scoring of many live matches."
+    )
+    parser.add_argument("--model", default=MODEL_FILES["XGBoost (Advanced)"])
+    parser.add_argument("--matches", type=int, default=5000)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--changed", type=float, default=0.25,
+                        help="share of matches with a new ball per tick")
+    args = parser.parse_args()
+
+    matches, _ = load_match_data()
+
+    benchmark(
+        load_any(args.model),
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches),
+        args.matches,
+        args.ticks,
+        args.changed
+    )
+
+
+if __name__ == "__main__":
+    main()
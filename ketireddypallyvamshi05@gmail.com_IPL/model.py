@@ -1,4 +1,4 @@
-import pandas as pd
+import argparse
 import numpy as np
 import pickle
 import warnings
@@ -12,166 +12,47 @@ from sklearn.metrics import accuracy_score, brier_score_loss
 
 from xgboost import XGBClassifier
 
-
-# ======================================================
-# 1. LOAD DATA (CONFIRMED COLUMNS)
-# ======================================================
-matches = pd.read_csv("data/matches.csv")
-deliveries = pd.read_csv("data/deliveries.csv")
-
-# Only normal results
-matches = matches[matches["result"] == "normal"]
-
-
-# ======================================================
-# 2. CREATE WICKET FLAG (FROM player_dismissed)
-# ======================================================
-deliveries["is_wicket"] = deliveries["player_dismissed"].notna().astype(int)
-
-
-# ======================================================
-# 3. MERGE MATCH INFO INTO DELIVERIES
-# ======================================================
-deliveries = deliveries.merge(
-    matches[["id", "venue", "team1", "team2", "winner"]],
-    left_on="match_id",
-    right_on="id",
-    how="inner"
+from player_form import PLAYER_FEATURES, add_player_form, load_or_build_index
+from utils import (
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features
 )
 
+parser = argparse.ArgumentParser(description="Train model.pkl (XGBoost).")
+parser.add_argument("--player-form", action="store_true",
+                    help="add the striker's and bowler's as-of form; saved as model_form.pkl")
+args = parser.parse_args()
 
-# ======================================================
-# 4. BALL & SCORE STATE (USING total_runs)
-# ======================================================
-deliveries["ball_number"] = deliveries["over"] * 6 + deliveries["ball"]
-
-deliveries["current_score"] = (
-    deliveries.groupby("match_id")["total_runs"].cumsum()
-)
-
-deliveries["wickets_fallen"] = (
-    deliveries.groupby("match_id")["is_wicket"].cumsum()
-)
-
-deliveries["balls_remaining"] = 120 - deliveries["ball_number"]
-deliveries["wickets_remaining"] = 10 - deliveries["wickets_fallen"]
+OUT_FILE = "model_form.pkl" if args.player_form else "model.pkl"
 
 
 # ======================================================
-# 5. TARGET (SAFE, NO LEAKAGE)
-# ======================================================
-first_innings_score = (
-    deliveries[deliveries["inning"] == 1]
-    .groupby("match_id")["current_score"]
-    .max()
-)
-
-deliveries = deliveries.merge(
-    first_innings_score.rename("first_innings_score"),
-    on="match_id",
-    how="left"
-)
-
-# Only second innings for win probability
-deliveries = deliveries[deliveries["inning"] == 2]
-
-deliveries["target"] = deliveries["first_innings_score"] + 1
-deliveries["runs_remaining"] = deliveries["target"] - deliveries["current_score"]
-
-
-# ======================================================
-# 6. RUN RATES & PRESSURE (CORE SIGNAL)
-# ======================================================
-deliveries["current_run_rate"] = (
-    deliveries["current_score"] * 6 / deliveries["ball_number"].clip(lower=1)
-)
-
-deliveries["required_run_rate"] = (
-    deliveries["runs_remaining"] * 6 / deliveries["balls_remaining"].clip(lower=1)
-)
-
-deliveries["pressure"] = (
-    deliveries["required_run_rate"] - deliveries["current_run_rate"]
-)
-
-
-# ======================================================
-# 7. MOMENTUM FEATURES (ROBUST, SAFE WINDOWS)
-# ======================================================
-for w in [6, 12]:
-    deliveries[f"runs_last_{w}"] = (
-        deliveries.groupby("match_id")["total_runs"]
-        .rolling(w)
-        .sum()
-        .reset_index(0, drop=True)
-    )
-
-    deliveries[f"wkts_last_{w}"] = (
-        deliveries.groupby("match_id")["is_wicket"]
-        .rolling(w)
-        .sum()
-        .reset_index(0, drop=True)
-    )
-
-
-# ======================================================
-# 8. MATCH PHASE
+# 1. LOAD DATA (CONFIRMED COLUMNS)
 # ======================================================
-def match_phase(over):
-    if over < 6:
-        return "powerplay"
-    elif over < 15:
-        return "middle"
-    else:
-        return "death"
-
-deliveries["phase"] = deliveries["over"].apply(match_phase)
+matches, deliveries = load_match_data()
 
 
 # ======================================================
-# 9. TEAM STRENGTH (FROM matches.csv ONLY)
+# 2. FEATURES (SHARED WITH incremental.py)
 # ======================================================
-team_matches = {}
-team_wins = {}
-
-for _, row in matches.iterrows():
-    for team in [row["team1"], row["team2"]]:
-        team_matches[team] = team_matches.get(team, 0) + 1
-    team_wins[row["winner"]] = team_wins.get(row["winner"], 0) + 1
-
-team_strength = {
-    team: team_wins.get(team, 0) / team_matches[team]
-    for team in team_matches
-}
-
-deliveries["strength_diff"] = (
-    deliveries["batting_team"].map(team_strength)
-    - deliveries["bowling_team"].map(team_strength)
-)
+team_strength = compute_team_strength(matches)
+venue_bias = compute_venue_chase_bias(matches)
 
+player_index = load_or_build_index(matches, deliveries) if args.player_form else None
 
-# ======================================================
-# 10. VENUE CHASE BIAS
-# ======================================================
-venue_bias = (
-    matches.assign(chase_win=matches["winner"] == matches["team2"])
-    .groupby("venue")["chase_win"]
-    .mean()
+deliveries = build_chase_features(
+    matches, deliveries, team_strength, venue_bias
 )
 
-deliveries["venue_chase_bias"] = deliveries["venue"].map(venue_bias)
-
-
-# ======================================================
-# 11. TARGET LABEL
-# ======================================================
-deliveries["win"] = (
-    deliveries["batting_team"] == deliveries["winner"]
-).astype(int)
+# optional: striker / bowler form from matches before this one only
+if args.player_form:
+    deliveries = add_player_form(deliveries, matches, player_index)
 
 
 # ======================================================
-# 12. FINAL FEATURE SET (STABLE & MEANINGFUL)
+# 3. FINAL FEATURE SET (STABLE & MEANINGFUL)
 # ======================================================
 FEATURES = [
     "batting_team",
@@ -192,6 +73,8 @@ FEATURES = [
     "wkts_last_6",
     "wkts_last_12"
 ]
+if args.player_form:
+    FEATURES += PLAYER_FEATURES
 
 df = deliveries[FEATURES + ["win"]].dropna()
 
@@ -203,7 +86,7 @@ y = df["win"]
 
 
 # ======================================================
-# 13. PREPROCESSING
+# 4. PREPROCESSING
 # ======================================================
 cat_cols = ["batting_team", "bowling_team", "venue", "phase"]
 num_cols = [c for c in X.columns if c not in cat_cols]
@@ -217,7 +100,7 @@ preprocessor = ColumnTransformer(
 
 
 # ======================================================
-# 14. MODEL (OPTIMAL FOR TABULAR DATA)
+# 5. MODEL (OPTIMAL FOR TABULAR DATA)
 # ======================================================
 model = XGBClassifier(
     n_estimators=350,
@@ -238,7 +121,7 @@ pipe = Pipeline(
 
 
 # ======================================================
-# 15. TRAIN / TEST
+# 6. TRAIN / TEST
 # ======================================================
 X_train, X_test, y_train, y_test = train_test_split(
     X, y,
@@ -257,9 +140,9 @@ print("BrierScore :", round(brier_score_loss(y_test, probs), 4))
 
 
 # ======================================================
-# 16. SAVE MODEL
+# 7. SAVE MODEL
 # ======================================================
-with open("model.pkl", "wb") as f:
+with open(OUT_FILE, "wb") as f:
     pickle.dump(pipe, f)
 
-print("✅ model.pkl saved successfully")
+print(f"✅ {OUT_FILE} saved successfully")
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import pickle
 import warnings
@@ -11,62 +10,24 @@ from sklearn.pipeline import Pipeline
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error
 
-# ---------------- LOAD DATA ----------------
-matches = pd.read_csv("data/matches.csv")
-deliveries = pd.read_csv("data/deliveries.csv")
-
-matches = matches[matches["result"] == "normal"]
-
-deliveries["is_wicket"] = deliveries["player_dismissed"].notna().astype(int)
-
-deliveries = deliveries.merge(
-    matches[["id", "venue", "team1", "team2", "winner"]],
-    left_on="match_id",
-    right_on="id",
-    how="inner"
+from utils import (
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features
 )
 
-# ---------------- FEATURE ENGINEERING ----------------
-deliveries["ball_number"] = deliveries["over"] * 6 + deliveries["ball"]
-deliveries["current_score"] = deliveries.groupby("match_id")["total_runs"].cumsum()
-deliveries["wickets_fallen"] = deliveries.groupby("match_id")["is_wicket"].cumsum()
-
-deliveries["balls_remaining"] = 120 - deliveries["ball_number"]
-deliveries["wickets_remaining"] = 10 - deliveries["wickets_fallen"]
-
-first_innings = (
-    deliveries[deliveries["inning"] == 1]
-    .groupby("match_id")["current_score"]
-    .max()
-)
+# ---------------- LOAD DATA ----------------
+matches, deliveries = load_match_data()
 
-deliveries = deliveries.merge(
-    first_innings.rename("first_innings_score"),
-    on="match_id",
-    how="left"
+# ---------------- FEATURE ENGINEERING ----------------
+deliveries = build_chase_features(
+    matches,
+    deliveries,
+    compute_team_strength(matches),
+    compute_venue_chase_bias(matches)
 )
 
-deliveries = deliveries[deliveries["inning"] == 2]
-deliveries["target"] = deliveries["first_innings_score"] + 1
-deliveries["runs_remaining"] = deliveries["target"] - deliveries["current_score"]
-
-deliveries["current_run_rate"] = deliveries["current_score"] * 6 / deliveries["ball_number"].clip(lower=1)
-deliveries["required_run_rate"] = deliveries["runs_remaining"] * 6 / deliveries["balls_remaining"].clip(lower=1)
-deliveries["pressure"] = deliveries["required_run_rate"] - deliveries["current_run_rate"]
-
-for w in [6, 12]:
-    deliveries[f"runs_last_{w}"] = deliveries.groupby("match_id")["total_runs"].rolling(w).sum().reset_index(0, drop=True)
-    deliveries[f"wkts_last_{w}"] = deliveries.groupby("match_id")["is_wicket"].rolling(w).sum().reset_index(0, drop=True)
-
-def phase(over):
-    if over < 6: return "powerplay"
-    elif over < 15: return "middle"
-    return "death"
-
-deliveries["phase"] = deliveries["over"].apply(phase)
-
-deliveries["win"] = (deliveries["batting_team"] == deliveries["winner"]).astype(int)
-
 FEATURES = [
     "batting_team","bowling_team","venue","phase",
     "current_score","balls_remaining","wickets_remaining",
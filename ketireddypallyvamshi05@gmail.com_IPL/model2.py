@@ -1,4 +1,4 @@
-import pandas as pd
+import argparse
 import numpy as np
 import pickle
 import warnings
@@ -11,86 +11,42 @@ from sklearn.pipeline import Pipeline
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, log_loss, brier_score_loss
 
+from player_form import PLAYER_FEATURES, add_player_form, load_or_build_index
+from utils import (
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features
+)
+
+parser = argparse.ArgumentParser(description="Train logistic_model.pkl.")
+parser.add_argument("--player-form", action="store_true",
+                    help="add the striker's and bowler's as-of form; saved as logistic_model_form.pkl")
+args = parser.parse_args()
+
+OUT_FILE = "logistic_model_form.pkl" if args.player_form else "logistic_model.pkl"
+
 
 # ======================================================
 # LOAD DATA
 # ======================================================
-matches = pd.read_csv("data/matches.csv")
-deliveries = pd.read_csv("data/deliveries.csv")
-
-matches = matches[matches["result"] == "normal"]
+matches, deliveries = load_match_data()
 
-# derive wicket flag
-deliveries["is_wicket"] = deliveries["player_dismissed"].notna().astype(int)
-
-# merge match info
-deliveries = deliveries.merge(
-    matches[["id", "venue", "team1", "team2", "winner"]],
-    left_on="match_id",
-    right_on="id",
-    how="inner"
-)
+player_index = load_or_build_index(matches, deliveries) if args.player_form else None
 
 
 # ======================================================
 # FEATURE ENGINEERING (SAME AS MAIN MODEL)
 # ======================================================
-deliveries["ball_number"] = deliveries["over"] * 6 + deliveries["ball"]
-deliveries["current_score"] = deliveries.groupby("match_id")["total_runs"].cumsum()
-deliveries["wickets_fallen"] = deliveries.groupby("match_id")["is_wicket"].cumsum()
-
-deliveries["balls_remaining"] = 120 - deliveries["ball_number"]
-deliveries["wickets_remaining"] = 10 - deliveries["wickets_fallen"]
-
-first_innings = (
-    deliveries[deliveries["inning"] == 1]
-    .groupby("match_id")["current_score"]
-    .max()
-)
-
-deliveries = deliveries.merge(
-    first_innings.rename("first_innings_score"),
-    on="match_id",
-    how="left"
+deliveries = build_chase_features(
+    matches,
+    deliveries,
+    compute_team_strength(matches),
+    compute_venue_chase_bias(matches)
 )
 
-deliveries = deliveries[deliveries["inning"] == 2]
-
-deliveries["target"] = deliveries["first_innings_score"] + 1
-deliveries["runs_remaining"] = deliveries["target"] - deliveries["current_score"]
-
-deliveries["current_run_rate"] = (
-    deliveries["current_score"] * 6 / deliveries["ball_number"].clip(lower=1)
-)
-
-deliveries["required_run_rate"] = (
-    deliveries["runs_remaining"] * 6 / deliveries["balls_remaining"].clip(lower=1)
-)
-
-deliveries["pressure"] = deliveries["required_run_rate"] - deliveries["current_run_rate"]
-
-for w in [6, 12]:
-    deliveries[f"runs_last_{w}"] = (
-        deliveries.groupby("match_id")["total_runs"]
-        .rolling(w).sum().reset_index(0, drop=True)
-    )
-
-    deliveries[f"wkts_last_{w}"] = (
-        deliveries.groupby("match_id")["is_wicket"]
-        .rolling(w).sum().reset_index(0, drop=True)
-    )
-
-def phase(over):
-    if over < 6:
-        return "powerplay"
-    elif over < 15:
-        return "middle"
-    return "death"
-
-deliveries["phase"] = deliveries["over"].apply(phase)
-
-# target
-deliveries["win"] = (deliveries["batting_team"] == deliveries["winner"]).astype(int)
+if args.player_form:
+    deliveries = add_player_form(deliveries, matches, player_index)
 
 
 # ======================================================
@@ -103,6 +59,8 @@ FEATURES = [
     "pressure", "runs_last_6", "runs_last_12",
     "wkts_last_6", "wkts_last_12"
 ]
+if args.player_form:
+    FEATURES += PLAYER_FEATURES
 
 df = deliveries[FEATURES + ["win"]].dropna()
 
@@ -152,7 +110,7 @@ print("BrierScore :", round(brier_score_loss(y_test, probs), 4))
 # ======================================================
 # SAVE MODEL
 # ======================================================
-with open("logistic_model.pkl", "wb") as f:
+with open(OUT_FILE, "wb") as f:
     pickle.dump(pipe, f)
 
-print("✅ logistic_model.pkl saved successfully")
+print(f"✅ {OUT_FILE} saved successfully")
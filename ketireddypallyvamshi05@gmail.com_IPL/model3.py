@@ -1,101 +1,41 @@
-import pandas as pd
-import numpy as np
+import argparse
+import os
 import pickle
+import time
 import warnings
 warnings.filterwarnings("ignore")
 
+import numpy as np
+import pandas as pd
+
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import KBinsDiscretizer, OneHotEncoder, OrdinalEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
 from sklearn.metrics import accuracy_score, log_loss, brier_score_loss
 
-
-# ======================================================
-# 1. LOAD DATA
-# ======================================================
-matches = pd.read_csv("data/matches.csv")
-deliveries = pd.read_csv("data/deliveries.csv")
-
-matches = matches[matches["result"] == "normal"]
-
-# derive wicket flag
-deliveries["is_wicket"] = deliveries["player_dismissed"].notna().astype(int)
-
-# merge match info
-deliveries = deliveries.merge(
-    matches[["id", "venue", "team1", "team2", "winner"]],
-    left_on="match_id",
-    right_on="id",
-    how="inner"
-)
-
-
-# ======================================================
-# 2. FEATURE ENGINEERING (SAME AS OTHER MODELS)
-# ======================================================
-deliveries["ball_number"] = deliveries["over"] * 6 + deliveries["ball"]
-deliveries["current_score"] = deliveries.groupby("match_id")["total_runs"].cumsum()
-deliveries["wickets_fallen"] = deliveries.groupby("match_id")["is_wicket"].cumsum()
-
-deliveries["balls_remaining"] = 120 - deliveries["ball_number"]
-deliveries["wickets_remaining"] = 10 - deliveries["wickets_fallen"]
-
-first_innings = (
-    deliveries[deliveries["inning"] == 1]
-    .groupby("match_id")["current_score"]
-    .max()
-)
-
-deliveries = deliveries.merge(
-    first_innings.rename("first_innings_score"),
-    on="match_id",
-    how="left"
-)
-
-deliveries = deliveries[deliveries["inning"] == 2]
-
-deliveries["target"] = deliveries["first_innings_score"] + 1
-deliveries["runs_remaining"] = deliveries["target"] - deliveries["current_score"]
-
-deliveries["current_run_rate"] = (
-    deliveries["current_score"] * 6 / deliveries["ball_number"].clip(lower=1)
+from evaluate import data_fingerprint
+from utils import (
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features
 )
 
-deliveries["required_run_rate"] = (
-    deliveries["runs_remaining"] * 6 / deliveries["balls_remaining"].clip(lower=1)
+parser = argparse.ArgumentParser(
+    description="Train rf_model.pkl (histogram-binned gradient boosting)."
 )
+parser.add_argument("--rebuild", action="store_true",
+                    help="recompute the cached features and bin edges")
+parser.add_argument("--baseline", action="store_true",
+                    help="also fit the old RandomForest on the same split and compare")
+args = parser.parse_args()
 
-deliveries["pressure"] = deliveries["required_run_rate"] - deliveries["current_run_rate"]
-
-for w in [6, 12]:
-    deliveries[f"runs_last_{w}"] = (
-        deliveries.groupby("match_id")["total_runs"]
-        .rolling(w).sum().reset_index(0, drop=True)
-    )
-
-    deliveries[f"wkts_last_{w}"] = (
-        deliveries.groupby("match_id")["is_wicket"]
-        .rolling(w).sum().reset_index(0, drop=True)
-    )
-
-def phase(over):
-    if over < 6:
-        return "powerplay"
-    elif over < 15:
-        return "middle"
-    return "death"
-
-deliveries["phase"] = deliveries["over"].apply(phase)
-
-# target label
-deliveries["win"] = (deliveries["batting_team"] == deliveries["winner"]).astype(int)
-
+DATA_FILES = ["data/matches.csv", "data/deliveries.csv"]
+CACHE_FILE = "hist_cache.pkl"
+CACHE_VERSION = 2  # 2: float32 binned matrix, unseen categories stay NaN
 
-# ======================================================
-# 3. FINAL DATASET
-# ======================================================
 FEATURES = [
     "batting_team", "bowling_team", "venue", "phase",
     "current_score", "balls_remaining", "wickets_remaining",
@@ -104,64 +44,171 @@ FEATURES = [
     "wkts_last_6", "wkts_last_12"
 ]
 
-df = deliveries[FEATURES + ["win"]].dropna()
-
-X = df.drop("win", axis=1)
-y = df["win"]
+cat_cols = ["batting_team", "bowling_team", "venue", "phase"]
+num_cols = [c for c in FEATURES if c not in cat_cols]
 
 
 # ======================================================
-# 4. PREPROCESSING PIPELINE
+# 1. FEATURES + BIN EDGES (CACHED, REUSED BY EVERY RETRAIN)
 # ======================================================
-cat_cols = ["batting_team", "bowling_team", "venue", "phase"]
-num_cols = [c for c in X.columns if c not in cat_cols]
+# Categories become ordinal codes and every numeric feature is cut
+# into at most 255 quantile bins, fitted once on the training split.
+# The cache keeps the fitted edges next to the binned matrix, so a
+# retrain or tuning run goes straight to fitting.
+key = data_fingerprint(DATA_FILES)
+cache = None
+if os.path.exists(CACHE_FILE) and not args.rebuild:
+    with open(CACHE_FILE, "rb") as f:
+        cache = pickle.load(f)
+    if cache["data"] != key or cache.get("version") != CACHE_VERSION:
+        cache = None
+
+if cache is None:
+    start = time.perf_counter()
+    matches, deliveries = load_match_data(*DATA_FILES)
+    deliveries = build_chase_features(
+        matches,
+        deliveries,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches)
+    )
+    df = deliveries[FEATURES + ["win"]].dropna().reset_index(drop=True)
 
-preprocessor = ColumnTransformer(
-    [
-        ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
-        ("num", "passthrough", num_cols)
-    ]
-)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=0.2, stratify=df["win"], random_state=42
+    )
+
+    binner = ColumnTransformer(
+        [
+            ("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=np.nan), cat_cols),
+            ("num", KBinsDiscretizer(
+                n_bins=255, encode="ordinal", strategy="quantile",
+                subsample=200_000, random_state=42
+            ), num_cols)
+        ]
+    )
+    binner.fit(df.loc[train_idx, FEATURES])
+
+    cache = {
+        "data": key,
+        "version": CACHE_VERSION,
+        "df": df,
+        "train_idx": train_idx,
+        "test_idx": test_idx,
+        "binner": binner,
+        # float, not uint8: categories the encoder has not seen are NaN
+        # (missing to the model) and must not turn into a real code
+        "binned": binner.transform(df[FEATURES]).astype(np.float32),
+    }
+    with open(CACHE_FILE, "wb") as f:
+        pickle.dump(cache, f)
+
+    print(f"Features + bin edges built in {time.perf_counter() - start:.1f}s ({CACHE_FILE})")
+else:
+    print(f"Features + bin edges loaded from {CACHE_FILE}")
+
+df, binner, binned = cache["df"], cache["binner"], cache["binned"]
+train_idx, test_idx = cache["train_idx"], cache["test_idx"]
+
+y_train = df.loc[train_idx, "win"].to_numpy()
+y_test = df.loc[test_idx, "win"].to_numpy()
+X_test = df.loc[test_idx, FEATURES]
 
 
 # ======================================================
-# 5. RANDOM FOREST MODEL
+# 2. HISTOGRAM GRADIENT BOOSTING
 # ======================================================
-model = RandomForestClassifier(
-    n_estimators=300,
-    max_depth=12,
-    min_samples_leaf=50,
-    random_state=42,
-    n_jobs=-1
+model = HistGradientBoostingClassifier(
+    max_iter=200,
+    learning_rate=0.05,
+    max_leaf_nodes=15,
+    min_samples_leaf=200,
+    l2_regularization=1.0,
+    categorical_features=list(range(len(cat_cols))),
+    early_stopping=False,
+    random_state=42
 )
 
+start = time.perf_counter()
+model.fit(binned[train_idx], y_train)
+fit_seconds = time.perf_counter() - start
+
+# served on raw features: the fitted binner is the preprocessing step
 pipe = Pipeline(
     [
-        ("prep", preprocessor),
+        ("prep", binner),
         ("model", model)
     ]
 )
 
 
 # ======================================================
-# 6. TRAIN / EVALUATE
+# 3. EVALUATE
 # ======================================================
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, stratify=y, random_state=42
-)
+def measure(pipe, fit_seconds):
+    probs = pipe.predict_proba(X_test)[:, 1]
+
+    single = []
+    for i in range(min(200, len(X_test))):
+        row = X_test.iloc[[i]]
+        start = time.perf_counter()
+        pipe.predict_proba(row)
+        single.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    pipe.predict_proba(X_test.iloc[:1000])
+    batch = time.perf_counter() - start
+
+    return {
+        "accuracy": accuracy_score(y_test, (probs > 0.5).astype(int)),
+        "log_loss": log_loss(y_test, probs),
+        "brier": brier_score_loss(y_test, probs),
+        "fit_s": fit_seconds,
+        "size_mb": len(pickle.dumps(pipe)) / 2**20,
+        "row_ms": np.median(single) * 1000,
+        "1k_rows_ms": batch * 1000,
+    }
 
-pipe.fit(X_train, y_train)
 
-probs = pipe.predict_proba(X_test)[:, 1]
-preds = (probs > 0.5).astype(int)
+scores = {"hist_gbm": measure(pipe, fit_seconds)}
+
+print("Accuracy   :", round(scores["hist_gbm"]["accuracy"], 4))
+print("Log Loss   :", round(scores["hist_gbm"]["log_loss"], 4))
+print("BrierScore :", round(scores["hist_gbm"]["brier"], 4))
+
+
+# ======================================================
+# 4. RANDOM FOREST BASELINE (OPTIONAL)
+# ======================================================
+if args.baseline:
+    rf = Pipeline(
+        [
+            ("prep", ColumnTransformer(
+                [
+                    ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
+                    ("num", "passthrough", num_cols)
+                ]
+            )),
+            ("model", RandomForestClassifier(
+                n_estimators=300,
+                max_depth=12,
+                min_samples_leaf=50,
+                random_state=42,
+                n_jobs=-1
+            ))
+        ]
+    )
+
+    start = time.perf_counter()
+    rf.fit(df.loc[train_idx, FEATURES], y_train)
+    scores["random_forest"] = measure(rf, time.perf_counter() - start)
 
-print("Accuracy   :", round(accuracy_score(y_test, preds), 4))
-print("Log Loss   :", round(log_loss(y_test, probs), 4))
-print("BrierScore :", round(brier_score_loss(y_test, probs), 4))
+    print()
+    print(pd.DataFrame(scores).T.round(4).to_string())
 
 
 # ======================================================
-# 7. SAVE MODEL
+# 5. SAVE MODEL (SAME APP SLOT AS THE OLD RANDOM FOREST)
 # ======================================================
 with open("rf_model.pkl", "wb") as f:
     pickle.dump(pipe, f)
@@ -0,0 +1,386 @@
+import argparse
+import errno
+import os
+import pickle
+import resource
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from compact_trees import compact_path, load_any
+from serving import LEGACY_PIPES, build_core
+from shadow import SHADOW_LOG, ShadowScorer
+from utils import MODEL_FILES, predict_win_prob
+
+
+# ======================================================
+# WIRE FORMAT (LENGTH-PREFIXED PICKLE OVER A UNIX SOCKET)
+# ======================================================
+# The socket is created with 0600 permissions: only the user running
+# the host can connect, so unpickling requests is not exposed. Replies
+# are unpickled too, so clients only talk to a socket (and a peer)
+# owned by their own user, and the default path is in a private 0700
+# directory rather than in /tmp itself.
+def _default_socket() -> str:
+    private = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(
+        tempfile.gettempdir(), f"ipl-model-host-{os.getuid()}"
+    )
+    return os.path.join(private, "ipl_model_host.sock")
+
+
+HOST_SOCKET = os.environ.get("IPL_MODEL_HOST") or _default_socket()
+
+HEADER = struct.Struct("!I")
+
+
+def _check_owner(path: str):
+    if os.stat(path).st_uid != os.getuid():
+        raise PermissionError(f"{path} is not owned by this user – not connecting")
+
+
+def _check_peer(sock):
+    # the process at the other end, not only the socket file (Linux)
+    if hasattr(socket, "SO_PEERCRED"):
+        creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        if struct.unpack("3i", creds)[1] != os.getuid():
+            raise PermissionError("model host runs as another user – not connecting")
+
+
+def send_msg(sock, obj):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_exact(sock, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    while n:
+        got = sock.recv_into(view, n)
+        if not got:
+            raise ConnectionError("model host connection closed")
+        view = view[got:]
+        n -= got
+    return bytes(buf)
+
+
+def recv_msg(sock):
+    (size,) = HEADER.unpack(recv_exact(sock, HEADER.size))
+    return pickle.loads(recv_exact(sock, size))
+
+
+# ======================================================
+# SERVER (ONE COPY OF EVERY MODEL FOR ALL APP PROCESSES)
+# ======================================================
+class ModelHostHandler(socketserver.BaseRequestHandler):
+    """
+    Serves requests on one persistent client connection until the
+    client disconnects. A request is (model file, feature frame),
+    ("state", model names, canonical state frame) or ("stats",); the
+    reply is ("ok", win probabilities / shadow counters) or
+    ("error", message). Shadow work is queued after the reply is sent.
+    """
+
+    def handle(self):
+        models = self.server.models
+        shadow = self.server.shadow
+        while True:
+            try:
+                request = recv_msg(self.request)
+            except (ConnectionError, EOFError):
+                return
+
+            if request[0] == "stats":
+                send_msg(self.request, ("ok", shadow.stats() if shadow else {}))
+                continue
+
+            start = time.perf_counter()
+            if len(request) == 3:
+                names, X = request[1:]
+                reply = self.score_state(names, X)
+            else:
+                name, X = request
+                reply = self.score_frame(models, name, X)
+            seconds = time.perf_counter() - start
+
+            send_msg(self.request, reply)
+
+            if shadow is not None and reply[0] == "ok":
+                if len(request) == 3:
+                    shadow.submit_state(names, X, reply[1], seconds)
+                else:
+                    shadow.submit(name, X, reply[1], seconds)
+
+    def score_frame(self, models, name, X):
+        if name not in models:
+            return ("error", f"{name} is not loaded on the model host")
+        try:
+            return ("ok", predict_win_prob(models[name], X))
+        except Exception as exc:
+            return ("error", f"{type(exc).__name__}: {exc}")
+
+    def score_state(self, names, state):
+        # every schema is projected from the one state (serving.py)
+        try:
+            return ("ok", self.server.core.score(state, names).to_dict("list"))
+        except Exception as exc:
+            return ("error", f"{type(exc).__name__}: {exc}")
+
+
+class ModelHost(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, models: dict, core=None, shadow: ShadowScorer = None):
+        self.models = models
+        self.core = core
+        self.shadow = shadow
+
+        # the default path's private directory; one created by another
+        # user is refused
+        directory = os.path.dirname(path) or "."
+        if not os.path.isdir(directory):
+            os.makedirs(directory, mode=0o700)
+        if path == _default_socket():
+            _check_owner(directory)
+
+        # only a stale socket file is removed, never a live host's
+        if host_available(path):
+            raise OSError(errno.EADDRINUSE, f"a model host is already listening on {path}")
+        if os.path.exists(path):
+            os.unlink(path)
+
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, ModelHostHandler)
+        finally:
+            os.umask(old_umask)
+
+
+def load_models(files) -> dict:
+    """
+    {serving name: model}. `files` is a list of paths (served by file
+    name) or a {serving name: path} dict.
+    """
+    if not isinstance(files, dict):
+        files = {os.path.basename(path): path for path in files}
+
+    models = {}
+    for name, path in files.items():
+        if not (os.path.exists(path) or os.path.isdir(compact_path(path))):
+            print(f"⚠️  {path} not found – skipped")
+            continue
+        models[name] = load_any(path)
+    return models
+
+
+# ======================================================
+# CLIENT (USED BY THE STREAMLIT APPS)
+# ======================================================
+class ModelClient:
+    """
+    Thin client for the model host. Each thread keeps its own
+    connection, so concurrent Streamlit sessions never share a socket.
+    """
+
+    def __init__(self, path: str = HOST_SOCKET):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            _check_owner(self.path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+                _check_peer(sock)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _request(self, request):
+        sock = self._connection()
+        try:
+            send_msg(sock, request)
+            status, payload = recv_msg(sock)
+        except (ConnectionError, OSError):
+            sock.close()
+            self._local.sock = None
+            raise
+
+        if status != "ok":
+            raise RuntimeError(payload)
+        return payload
+
+    def win_prob(self, name: str, X) -> np.ndarray:
+        return self._request((name, X))
+
+    def score_state(self, names, state) -> dict:
+        """
+        {model name: win probabilities} for a canonical state frame
+        (serving.match_state); names=None scores every hosted model.
+        """
+        return self._request(("state", names, state))
+
+    def shadow_stats(self) -> dict:
+        """
+        Shadow scoring counters of the host: submitted, dropped (queue
+        full), scored, errors and the current queue depth.
+        """
+        return self._request(("stats",))
+
+
+class RemoteModel:
+    """
+    Stands in for an unpickled model: predict_proba is answered by
+    the model host, so the app keeps no copy of the model.
+
+    When the host cannot be reached, `fallback()` loads the model
+    locally (once) and answers instead. The host is tried again on
+    every call, so a restarted host takes over without an app restart.
+    """
+
+    __slots__ = ("client", "name", "fallback", "_local")
+
+    def __init__(self, client: ModelClient, name: str, fallback=None):
+        self.client = client
+        self.name = os.path.basename(name)
+        self.fallback = fallback
+        self._local = None
+
+    def local(self):
+        if self._local is None:
+            self._local = self.fallback()
+        return self._local
+
+    def predict_proba(self, X) -> np.ndarray:
+        try:
+            p = self.client.win_prob(self.name, X)
+        except (ConnectionError, OSError):
+            if self.fallback is None:
+                raise
+            p = predict_win_prob(self.local(), X)
+        return np.column_stack([1 - p, p])
+
+
+class RemoteCore:
+    """
+    Stands in for a local ServingCore: score() runs in the model
+    host, against the models it already holds. Falls back to the
+    ServingCore built by `fallback()` like RemoteModel.
+    """
+
+    def __init__(self, client: ModelClient, fallback=None):
+        self.client = client
+        self.fallback = fallback
+        self._local = None
+
+    def local(self):
+        if self._local is None:
+            self._local = self.fallback()
+        return self._local
+
+    def score(self, state, names=None) -> pd.DataFrame:
+        try:
+            scores = self.client.score_state(names, state)
+        except (ConnectionError, OSError):
+            if self.fallback is None:
+                raise
+            return self.local().score(state, names)
+        return pd.DataFrame(scores, index=state.index)
+
+
+def host_available(path: str = HOST_SOCKET) -> bool:
+    """
+    True when a model host of this user is listening on `path` (a
+    stale socket file left by a dead host does not count, nor does a
+    socket of another user).
+    """
+    if not os.path.exists(path):
+        return False
+    try:
+        _check_owner(path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            _check_peer(sock)
+        return True
+    except OSError:
+        return False
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load every model once and serve predictions over a Unix socket."
+    )
+    parser.add_argument("--socket", default=HOST_SOCKET)
+    parser.add_argument(
+        "files", nargs="*", default=list(MODEL_FILES.values()),
+        help="model pickles to host (default: every app model)"
+    )
+    parser.add_argument("--no-legacy", action="store_true",
+                        help="do not host the root and Banasmita pipe.pkl models")
+    parser.add_argument("--matches", default="data/matches.csv",
+                        help="team strength / venue bias for match-state requests")
+    parser.add_argument("--shadow", action="append", default=[], metavar="MODEL=CANDIDATE",
+                        help="also score MODEL's requests with the CANDIDATE pickle, off the "
+                             "request path (repeatable)")
+    parser.add_argument("--shadow-log", default=SHADOW_LOG)
+    parser.add_argument("--shadow-queue", type=int, default=1000,
+                        help="queued shadow requests before new ones are dropped")
+    args = parser.parse_args()
+
+    if host_available(args.socket):
+        print(f"⚠️  a model host is already listening on {args.socket} – not starting another")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    models = load_models(args.files)
+    if not args.no_legacy:
+        models.update(load_models(LEGACY_PIPES))
+    core = build_core(models, args.matches)
+
+    shadow = None
+    if args.shadow:
+        candidates = {}
+        for spec in args.shadow:
+            name, path = spec.split("=", 1)
+            candidates.setdefault(name, {})[path] = path
+        shadow = ShadowScorer(candidates, args.shadow_log, args.shadow_queue, core)
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"Models loaded : {', '.join(models) or 'none'}")
+    print(f"Load time     : {time.perf_counter() - start:.1f}s")
+    print(f"Host RSS      : {rss_mb:.0f} MB (shared by every app process)")
+    if shadow:
+        print(f"Shadowing     : {', '.join(args.shadow)} -> {args.shadow_log}")
+
+    # let `kill` clean up the socket file like Ctrl+C does
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    with ModelHost(args.socket, models, core, shadow) as server:
+        print(f"✅ Model host listening on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(args.socket)
+            if shadow:
+                print(f"Shadow        : {shadow.stats()}")
+                shadow.close(wait=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import load_match_data
+
+
+# ======================================================
+# INDEX LAYOUT (ONE ROW PER PLAYER PER MATCH)
+# ======================================================
+# Rows are sorted by key = player code << 32 | match day, so one
+# player's matches are contiguous and in date order. `cum` holds the
+# running totals up to and including each row; the form of a player
+# before a date is the row just below that key (one searchsorted).
+INDEX_FILE = "player_form_index.npz"
+
+STATS = ["bat_runs", "bat_balls", "bat_outs", "bowl_balls", "bowl_runs", "bowl_wkts"]
+
+# optional model inputs: the striker's and the bowler's form so far
+PLAYER_FEATURES = [
+    "batter_average", "batter_strike_rate",
+    "bowler_economy", "bowler_strike_rate"
+]
+
+# players with little history are pulled towards the league rates,
+# as if they had this many balls at exactly the league average
+PRIOR_BALLS = 30
+
+# dismissals not credited to the bowler
+NOT_BOWLER_WICKETS = ["run out", "retired hurt", "retired out", "obstructing the field"]
+
+
+def match_days(matches: pd.DataFrame) -> pd.Series:
+    """
+    match id -> match date as days since 1970 (dd-mm-yyyy dates).
+    """
+    dates = pd.to_datetime(matches["date"], dayfirst=True, format="mixed")
+    days = (dates - pd.Timestamp("1970-01-01")).dt.days
+    return pd.Series(days.to_numpy(np.int64), index=matches["id"].to_numpy())
+
+
+# ======================================================
+# PLAYER-MATCH TOTALS (ONE GROUPED PASS)
+# ======================================================
+def player_match_stats(matches: pd.DataFrame, deliveries: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (match, player) with every STATS total. The batting,
+    dismissal and bowling views of each ball are stacked into one
+    long frame and summed in a single groupby.
+    """
+    d = deliveries[deliveries["match_id"].isin(matches["id"])]
+    if "is_super_over" in d.columns:
+        d = d[d["is_super_over"] == 0]
+
+    zeros = np.zeros(len(d), dtype=np.int64)
+    dismissed = d["player_dismissed"].notna().to_numpy()
+    bowler_wicket = dismissed & ~d["dismissal_kind"].isin(NOT_BOWLER_WICKETS).to_numpy()
+    legal = ((d["wide_runs"] == 0) & (d["noball_runs"] == 0)).to_numpy()
+    conceded = (d["total_runs"] - d["bye_runs"] - d["legbye_runs"] - d["penalty_runs"]).to_numpy()
+
+    views = [
+        # batsman: runs off the bat, balls faced (wides are not)
+        (d["batsman"], d["batsman_runs"].to_numpy(), (d["wide_runs"] == 0).to_numpy(),
+         zeros, zeros, zeros, zeros),
+        # dismissed player (striker or non-striker)
+        (d["player_dismissed"], zeros, zeros, dismissed, zeros, zeros, zeros),
+        # bowler
+        (d["bowler"], zeros, zeros, zeros, legal, conceded, bowler_wicket),
+    ]
+
+    long = pd.concat(
+        [
+            pd.DataFrame({
+                "match_id": d["match_id"].to_numpy(),
+                "player": player.to_numpy(),
+                **{stat: np.asarray(values, dtype=np.int64) for stat, values in zip(STATS, columns)}
+            })
+            for player, *columns in views
+        ],
+        ignore_index=True
+    ).dropna(subset=["player"])
+
+    stats = long.groupby(["match_id", "player"], sort=False)[STATS].sum().reset_index()
+    stats["day"] = stats["match_id"].map(match_days(matches)).to_numpy(np.int64)
+
+    return stats
+
+
+# ======================================================
+# BUILD / UPDATE / SAVE / LOAD
+# ======================================================
+def index_from_stats(stats: pd.DataFrame) -> dict:
+    players = np.sort(stats["player"].astype(str).unique()).astype(str)
+    code = np.searchsorted(players, stats["player"].astype(str).to_numpy()).astype(np.int64)
+    key = (code << 32) | stats["day"].to_numpy(np.int64)
+
+    order = np.lexsort((stats["match_id"].to_numpy(), key))
+    key = key[order]
+    values = stats[STATS].to_numpy(np.int64)[order]
+
+    # running totals that restart at every player's first row
+    cum = np.cumsum(values, axis=0)
+    first = np.flatnonzero(np.r_[True, np.diff(key >> 32) != 0])
+    before = np.vstack([np.zeros((1, len(STATS)), np.int64), cum[first[1:] - 1]])
+    cum -= np.repeat(before, np.diff(np.r_[first, len(key)]), axis=0)
+
+    totals = values.sum(axis=0).astype(float)
+    return {
+        "players": players,
+        "key": key,
+        "match_id": stats["match_id"].to_numpy(np.int64)[order],
+        "stats": values.astype(np.int32),
+        "cum": cum.astype(np.int32),
+        # league rates per ball: runs, outs (batting); runs, wickets (bowling)
+        "prior": np.array([
+            totals[0] / max(totals[1], 1), totals[2] / max(totals[1], 1),
+            totals[4] / max(totals[3], 1), totals[5] / max(totals[3], 1)
+        ]),
+    }
+
+
+def stats_of(index: dict) -> pd.DataFrame:
+    # the per-match rows an index was built from
+    return pd.DataFrame({
+        "match_id": index["match_id"],
+        "player": index["players"][index["key"] >> 32],
+        **dict(zip(STATS, index["stats"].T)),
+        "day": index["key"] & 0xFFFFFFFF,
+    })
+
+
+def build_player_index(matches: pd.DataFrame, deliveries: pd.DataFrame) -> dict:
+    return index_from_stats(player_match_stats(matches, deliveries))
+
+
+def update_player_index(index: dict, matches: pd.DataFrame, deliveries: pd.DataFrame) -> dict:
+    """
+    Adds the matches the index has not seen. Only their deliveries
+    are aggregated; the merge is one sort of the per-match rows.
+    """
+    new = matches[~matches["id"].isin(index["match_id"])]
+    if new.empty:
+        return index
+
+    stats = player_match_stats(new, deliveries[deliveries["match_id"].isin(new["id"])])
+    return index_from_stats(pd.concat([stats_of(index), stats], ignore_index=True))
+
+
+def save_player_index(index: dict, path: str = INDEX_FILE):
+    np.savez_compressed(path, **index)
+
+
+def load_player_index(path: str = INDEX_FILE) -> dict:
+    with np.load(path, allow_pickle=False) as data:
+        return {key: data[key] for key in data.files}
+
+
+def load_or_build_index(matches: pd.DataFrame, deliveries: pd.DataFrame, path: str = INDEX_FILE) -> dict:
+    """
+    The saved index, first brought up to date with any new matches.
+    """
+    if os.path.exists(path):
+        index = load_player_index(path)
+        updated = update_player_index(index, matches, deliveries)
+    else:
+        index = updated = build_player_index(matches, deliveries)
+
+    if updated is not index or not os.path.exists(path):
+        save_player_index(updated, path)
+    return updated
+
+
+# ======================================================
+# AS-OF LOOKUP (O(log n) PER PLAYER, WHOLE BATCHES)
+# ======================================================
+def totals_before(index: dict, players, days) -> np.ndarray:
+    """
+    STATS totals of every player over the matches strictly before
+    `days` (one row per lookup, zeros for unknown players).
+    """
+    players = np.atleast_1d(np.asarray(players, dtype=object)).astype(str)
+    players, days = np.broadcast_arrays(players, np.atleast_1d(days))
+
+    known = index["players"]
+    code = np.searchsorted(known, players)
+    found = code < len(known)
+    found[found] = known[code[found]] == players[found]
+
+    query = (code.astype(np.int64) << 32) | days.astype(np.int64)
+    pos = np.searchsorted(index["key"], query, side="left") - 1
+
+    hit = found & (pos >= 0)
+    hit[hit] = (index["key"][pos[hit]] >> 32) == code[hit]
+
+    out = np.zeros((len(players), len(STATS)), dtype=np.float64)
+    out[hit] = index["cum"][pos[hit]]
+    return out
+
+
+def form_before(index: dict, batter, bowler, days) -> pd.DataFrame:
+    """
+    PLAYER_FEATURES for every (striker, bowler, day), using only the
+    matches played before that day.
+    """
+    bat = totals_before(index, batter, days)
+    bowl = totals_before(index, bowler, days)
+    runs, outs, conceded, wickets = index["prior"] * PRIOR_BALLS
+
+    return pd.DataFrame({
+        "batter_average": (bat[:, 0] + runs) / (bat[:, 2] + outs),
+        "batter_strike_rate": 100 * (bat[:, 0] + runs) / (bat[:, 1] + PRIOR_BALLS),
+        "bowler_economy": 6 * (bowl[:, 4] + conceded) / (bowl[:, 3] + PRIOR_BALLS),
+        "bowler_strike_rate": (bowl[:, 3] + PRIOR_BALLS) / (bowl[:, 5] + wickets),
+    })
+
+
+def player_form(index: dict, batter, bowler, date=None) -> pd.DataFrame:
+    """
+    form_before for any date(s); date=None (or a missing date) means
+    after every indexed match, i.e. current form.
+    """
+    latest = int(index["key"][-1] & 0xFFFFFFFF) + 1 if len(index["key"]) else 0
+    if date is None:
+        return form_before(index, batter, bowler, latest)
+
+    dates = pd.to_datetime(pd.Series(np.atleast_1d(date)), dayfirst=True, format="mixed")
+    days = (dates - pd.Timestamp("1970-01-01")).dt.days.fillna(latest)
+    return form_before(index, batter, bowler, days.to_numpy(np.int64))
+
+
+def add_player_form(frame: pd.DataFrame, matches: pd.DataFrame, index: dict) -> pd.DataFrame:
+    """
+    Adds PLAYER_FEATURES to ball-by-ball rows (match_id, batsman,
+    bowler), each as of the day of its match, so a training row
+    never sees its own match or any later one.
+    """
+    days = frame["match_id"].map(match_days(matches)).to_numpy(np.int64)
+    form = form_before(index, frame["batsman"].to_numpy(), frame["bowler"].to_numpy(), days)
+
+    return frame.assign(**form.set_axis(frame.index).to_dict("series"))
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or update the as-of player form index."
+    )
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--out", default=INDEX_FILE)
+    parser.add_argument("--rebuild", action="store_true",
+                        help="build from scratch instead of adding new matches")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matches, deliveries = load_match_data(args.matches, args.deliveries)
+
+    if args.rebuild and os.path.exists(args.out):
+        os.remove(args.out)
+    seen = len(np.unique(load_player_index(args.out)["match_id"])) if os.path.exists(args.out) else 0
+
+    index = load_or_build_index(matches, deliveries, args.out)
+    built = time.perf_counter() - start
+
+    # lookup cost: 100k random (batter, bowler, date) queries
+    rng = np.random.default_rng(42)
+    players = index["players"]
+    days = index["key"] & 0xFFFFFFFF
+    n = 100_000
+    start = time.perf_counter()
+    form_before(index, rng.choice(players, n), rng.choice(players, n), rng.choice(days, n))
+    lookup = time.perf_counter() - start
+
+    size = sum(a.nbytes for a in index.values())
+    print(f"Players        : {len(players):,}")
+    print(f"Player-matches : {len(index['key']):,} ({len(np.unique(index['match_id'])) - seen} new matches)")
+    print(f"Index size     : {size / 1e6:.2f} MB in memory")
+    print(f"Build time     : {built:.1f}s (including csv load)")
+    print(f"Lookup         : {lookup / n * 1e6:.2f} µs per (batter, bowler, date)")
+    print(f"✅ {args.out} saved successfully")
+
+
+if __name__ == "__main__":
+    main()
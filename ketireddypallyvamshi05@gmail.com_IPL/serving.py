@@ -0,0 +1,298 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from entities import COLUMN_KINDS, canonicalize, model_aliases
+from utils import (
+    load_matches,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_state_frame,
+    model_features,
+    predict_win_prob
+)
+
+
+# ======================================================
+# CANONICAL MATCH STATE (BUILT ONCE PER BATCH)
+# ======================================================
+# One row per chase state, canonical names, raw counts. Every model
+# schema is derived from these columns; nothing model specific here.
+STATE_COLUMNS = [
+    "batting_team", "bowling_team", "venue", "city",
+    "target", "current_score", "balls_bowled", "wickets_fallen",
+    "runs_last_6", "runs_last_12", "wkts_last_6", "wkts_last_12"
+]
+
+
+def match_state(
+    batting_team,
+    bowling_team,
+    target,
+    current_score,
+    balls_bowled,
+    wickets_fallen,
+    venue=None,
+    city=None,
+    runs_last_6=0,
+    runs_last_12=0,
+    wkts_last_6=0,
+    wkts_last_12=0,
+    venue_city: dict = None,
+) -> pd.DataFrame:
+    """
+    Canonical state frame: every argument an array or a scalar.
+    Names go through the registry once. A missing city is looked up
+    from the venue in `venue_city` (see venue_cities).
+    """
+    columns = {
+        "batting_team": batting_team,
+        "bowling_team": bowling_team,
+        "target": target,
+        "current_score": current_score,
+        "balls_bowled": balls_bowled,
+        "wickets_fallen": wickets_fallen,
+        "runs_last_6": runs_last_6,
+        "runs_last_12": runs_last_12,
+        "wkts_last_6": wkts_last_6,
+        "wkts_last_12": wkts_last_12,
+    }
+    rows = max(np.size(v) for v in [*columns.values(), venue, city])
+
+    state = pd.DataFrame({
+        col: np.broadcast_to(np.asarray(value), rows)
+        for col, value in columns.items()
+    })
+
+    for col, value in (("batting_team", batting_team), ("bowling_team", bowling_team),
+                       ("venue", venue), ("city", city)):
+        values = np.broadcast_to(np.asarray(value, dtype=object), rows)
+        state[col] = canonicalize(values, COLUMN_KINDS[col])
+
+    if city is None and venue is not None and venue_city:
+        state["city"] = canonicalize(state["venue"].map(venue_city).to_numpy(), "city")
+
+    return state[STATE_COLUMNS]
+
+
+def venue_cities(matches: pd.DataFrame) -> dict:
+    """
+    Venue -> the city most of its matches list.
+    """
+    return (
+        matches.dropna(subset=["city"])
+        .groupby("venue", observed=True)["city"]
+        .agg(lambda cities: cities.value_counts().index[0])
+        .to_dict()
+    )
+
+
+# ======================================================
+# SCHEMA ADAPTERS (CANONICAL STATE -> ONE MODEL SCHEMA)
+# ======================================================
+ADAPTERS = {}
+
+
+def register_adapter(name: str, columns: list):
+    """
+    Registers fn(state, core) -> feature frame for every model whose
+    inputs are a subset of `columns`. Adapters return canonical names;
+    the core respells them per model.
+    """
+    def wrap(fn):
+        ADAPTERS[name] = (list(columns), fn)
+        return fn
+    return wrap
+
+
+@register_adapter("chase", [
+    "batting_team", "bowling_team", "venue", "phase",
+    "current_score", "balls_remaining", "wickets_remaining",
+    "runs_remaining", "current_run_rate", "required_run_rate",
+    "pressure", "strength_diff", "venue_chase_bias",
+    "runs_last_6", "runs_last_12", "wkts_last_6", "wkts_last_12"
+])
+def chase_frame(state: pd.DataFrame, core) -> pd.DataFrame:
+    # model.py / model1-3.py: the prepare_streamlit_input features
+    return build_state_frame(
+        state["batting_team"].to_numpy(),
+        state["bowling_team"].to_numpy(),
+        state["venue"].to_numpy(),
+        state["balls_bowled"].to_numpy(),
+        state["current_score"].to_numpy(),
+        state["wickets_fallen"].to_numpy(),
+        state["target"].to_numpy(),
+        core.team_strength,
+        core.venue_bias,
+        runs_last_6=state["runs_last_6"].to_numpy(),
+        runs_last_12=state["runs_last_12"].to_numpy(),
+        wkts_last_6=state["wkts_last_6"].to_numpy(),
+        wkts_last_12=state["wkts_last_12"].to_numpy(),
+    )
+
+
+@register_adapter("legacy", [
+    "batting_team", "bowling_team", "city", "runs_left", "balls_left",
+    "wickets", "total_runs_x", "cur_run_rate", "req_run_rate"
+])
+def legacy_frame(state: pd.DataFrame, core) -> pd.DataFrame:
+    # pipe.pkl (root app, train_pipe.py) and Banasmita-Assignment/pipe.pkl
+    balls = state["balls_bowled"].to_numpy(dtype=float)
+    balls_left = np.maximum(120 - balls, 0)
+    runs_left = state["target"].to_numpy(dtype=float) - state["current_score"].to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cur_rr = np.where(balls > 0, state["current_score"].to_numpy() * 6 / balls, 0)
+        req_rr = np.where(balls_left > 0, runs_left * 6 / balls_left, 0)
+
+    return pd.DataFrame({
+        "batting_team": state["batting_team"].to_numpy(),
+        "bowling_team": state["bowling_team"].to_numpy(),
+        "city": state["city"].to_numpy(),
+        "runs_left": runs_left,
+        "balls_left": balls_left,
+        "wickets": 10 - state["wickets_fallen"].to_numpy(),
+        "total_runs_x": state["target"].to_numpy(),
+        "cur_run_rate": cur_rr,
+        "req_run_rate": req_rr,
+    })
+
+
+def model_inputs(model) -> list:
+    prep = model.steps[0][1]
+    names = getattr(prep, "feature_names_in_", None)
+    return list(names) if names is not None else model_features(model)
+
+
+def adapter_for(model) -> str:
+    """
+    The first registered adapter that produces every input column
+    the fitted pipeline expects.
+    """
+    inputs = set(model_inputs(model))
+    for name, (columns, _) in ADAPTERS.items():
+        if inputs <= set(columns):
+            return name
+    raise ValueError(f"no schema adapter covers the inputs {sorted(inputs)}")
+
+
+def model_spellings(model) -> dict:
+    """
+    {column: canonical -> trained spelling} for every name column whose
+    fitted encoder knows some names only by an older alias.
+    """
+    spellings = {}
+    for _, transformer, cols in model.steps[0][1].transformers_:
+        for col, known in zip(cols, getattr(transformer, "categories_", [])):
+            kind = COLUMN_KINDS.get(col)
+            if kind is None:
+                continue
+            aliases = model_aliases(known, kind)
+            renamed = {name: spelling for name, spelling in aliases.items() if name != spelling}
+            if renamed:
+                spellings[col] = renamed
+    return spellings
+
+
+# ======================================================
+# SERVING CORE
+# ======================================================
+class ServingCore:
+    """
+    Every model generation behind one score() call. Each adapter
+    runs once per batch, however many models share it, and the
+    respelled frames are shared by models with the same aliases.
+    """
+
+    def __init__(self, team_strength: dict = None, venue_bias: dict = None, venue_city: dict = None):
+        self.team_strength = team_strength or {}
+        self.venue_bias = venue_bias or {}
+        self.venue_city = venue_city or {}
+        self.models = {}
+
+    def add_model(self, name: str, model, adapter: str = None):
+        adapter = adapter or adapter_for(model)
+        if adapter not in ADAPTERS:
+            raise ValueError(f"unknown schema adapter {adapter!r}")
+        self.models[name] = (model, adapter, model_spellings(model))
+
+    def state(self, **kwargs) -> pd.DataFrame:
+        return match_state(**kwargs, venue_city=self.venue_city)
+
+    def features(self, state: pd.DataFrame, names=None) -> dict:
+        """
+        {model name: its feature frame} for one batch of states.
+        """
+        names = list(self.models) if names is None else list(names)
+        projected, respelled, out = {}, {}, {}
+
+        for name in names:
+            if name not in self.models:
+                raise KeyError(f"{name!r} is not served (have {sorted(self.models)})")
+            _, adapter, spellings = self.models[name]
+
+            if adapter not in projected:
+                projected[adapter] = ADAPTERS[adapter][1](state, self)
+
+            key = (adapter, repr(sorted((c, sorted(s.items())) for c, s in spellings.items())))
+            if key not in respelled:
+                frame = projected[adapter]
+                if spellings:
+                    frame = frame.assign(**{
+                        col: frame[col].map(renamed).fillna(frame[col]).to_numpy()
+                        for col, renamed in spellings.items()
+                    })
+                respelled[key] = frame
+            out[name] = respelled[key]
+
+        return out
+
+    def score(self, state: pd.DataFrame, names=None) -> pd.DataFrame:
+        """
+        Batting-side win probability of every state under every named
+        model (default: all), one column per model.
+        """
+        frames = self.features(state, names)
+        return pd.DataFrame(
+            {name: predict_win_prob(self.models[name][0], X) for name, X in frames.items()},
+            index=state.index
+        )
+
+
+# ======================================================
+# EVERY MODEL GENERATION IN THIS REPO
+# ======================================================
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# older pickles served next to the MODEL_FILES; their file names
+# clash, so each gets its own serving name
+LEGACY_PIPES = {
+    "pipe.pkl": os.path.join(_ROOT, "pipe.pkl"),
+    "banasmita_pipe.pkl": os.path.join(_ROOT, "Banasmita-Assignment", "pipe.pkl"),
+}
+
+
+def build_core(models: dict, matches_path: str = "data/matches.csv") -> ServingCore:
+    """
+    A core serving every model in {name: fitted pipeline} that some
+    adapter covers. Team strength, venue bias and venue cities come
+    from matches_path when it exists.
+    """
+    if os.path.exists(matches_path):
+        matches = load_matches(matches_path)
+        core = ServingCore(
+            compute_team_strength(matches),
+            compute_venue_chase_bias(matches),
+            venue_cities(matches)
+        )
+    else:
+        core = ServingCore()
+
+    for name, model in models.items():
+        try:
+            core.add_model(name, model)
+        except (AttributeError, ValueError) as exc:
+            print(f"⚠️  {name} not served from match states: {exc}")
+
+    return core
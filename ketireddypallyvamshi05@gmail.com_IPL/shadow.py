@@ -0,0 +1,231 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from compact_trees import load_any
+from serving import ServingCore
+from utils import predict_win_prob
+
+
+# ======================================================
+# SHADOW SCORING (CANDIDATES SEE LIVE TRAFFIC, OFF THE REQUEST PATH)
+# ======================================================
+SHADOW_LOG = "shadow_log.jsonl"
+
+
+def _score_item(item, candidates: dict, core) -> list:
+    """
+    One log record per candidate of every production model in a
+    queued request.
+    """
+    kind, names, X, prod, seconds, queued = item
+    waited = time.time() - queued
+    if kind == "frame":
+        names, prod = [names], {names: prod}
+
+    records = []
+    for name in names:
+        for candidate, model in candidates[name].items():
+            if kind == "state" and candidate not in core.models:
+                continue
+            start, cpu = time.perf_counter(), time.process_time()
+            if kind == "frame":
+                p = predict_win_prob(model, X)
+            else:
+                p = core.score(X, [candidate])[candidate].to_numpy()
+            took, cpu = time.perf_counter() - start, time.process_time() - cpu
+
+            diff = np.abs(p - np.asarray(prod[name]))
+            records.append({
+                "time": round(time.time(), 3),
+                "model": name,
+                "candidate": candidate,
+                "rows": int(len(diff)),
+                "mean_abs_diff": round(float(diff.mean()), 6),
+                "max_abs_diff": round(float(diff.max()), 6),
+                "production_ms": round(seconds * 1000, 3),
+                "candidate_ms": round(took * 1000, 3),
+                "candidate_cpu_ms": round(cpu * 1000, 3),
+                "queue_ms": round(waited * 1000, 3),
+            })
+    return records
+
+
+def _shadow_worker(paths: dict, maps, log_path: str, requests, scored, errors):
+    # lowest CPU priority: the host's request threads always go first
+    try:
+        os.nice(19)
+    except OSError:
+        pass
+
+    candidates = {
+        name: {candidate: load_any(path) for candidate, path in models.items()}
+        for name, models in paths.items()
+    }
+
+    # state requests are projected per candidate by a core of their own
+    core = None
+    if maps is not None:
+        core = ServingCore(*maps)
+        for models in candidates.values():
+            for candidate, model in models.items():
+                try:
+                    core.add_model(candidate, model)
+                except (AttributeError, ValueError) as exc:
+                    print(f"⚠️  {candidate} not shadowed on match states: {exc}")
+
+    with open(log_path, "a", buffering=1) as log:
+        while True:
+            item = requests.get()
+            if item is None:
+                return
+            try:
+                for record in _score_item(item, candidates, core):
+                    log.write(json.dumps(record) + "\n")
+                    with scored.get_lock():
+                        scored.value += 1
+            except Exception as exc:
+                log.write(json.dumps({"error": f"{type(exc).__name__}: {exc}"}) + "\n")
+                with errors.get_lock():
+                    errors.value += 1
+
+
+class ShadowScorer:
+    """
+    Re-scores production requests with candidate models in a
+    background process (niced, with its own GIL). submit() never
+    blocks: when the bounded queue is full the request is dropped and
+    counted, so a slow candidate can only lose shadow samples, not
+    delay production replies.
+
+    candidates is {production name: {candidate name: pickle path}}.
+    Every shadow score is appended to `log_path` as one JSON line with
+    the probability divergence and both latencies. Pass the serving
+    core to also shadow match-state requests.
+    """
+
+    def __init__(self, candidates: dict, log_path: str = SHADOW_LOG, maxsize: int = 1000, core=None):
+        self.candidates = candidates
+        self.shadows_states = core is not None
+        self.counts = {"submitted": 0, "dropped": 0}
+        self._lock = threading.Lock()
+
+        ctx = mp.get_context("spawn")
+        self.queue = ctx.Queue(maxsize=maxsize)
+        self._scored = ctx.Value("q", 0)
+        self._errors = ctx.Value("q", 0)
+
+        maps = None if core is None else (core.team_strength, core.venue_bias, core.venue_city)
+        self._process = ctx.Process(
+            target=_shadow_worker,
+            args=(candidates, maps, log_path, self.queue, self._scored, self._errors),
+            name="shadow-scorer",
+            daemon=True
+        )
+        self._process.start()
+
+    def watches(self, name: str) -> bool:
+        return name in self.candidates
+
+    def _put(self, item):
+        with self._lock:
+            self.counts["submitted"] += 1
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.counts["dropped"] += 1
+
+    def submit(self, name: str, X, p, seconds: float):
+        """
+        Queues a feature-frame request that production answered with
+        `p` in `seconds`.
+        """
+        if self.watches(name):
+            self._put(("frame", name, X, p, seconds, time.time()))
+
+    def submit_state(self, names, state, scores: dict, seconds: float):
+        """
+        Queues a match-state request (serving.py) that production
+        answered with {model name: p} in `seconds`.
+        """
+        if not self.shadows_states:
+            return
+        watched = {name: p for name, p in scores.items() if self.watches(name)}
+        if watched:
+            self._put(("state", list(watched), state, watched, seconds, time.time()))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            **counts,
+            "scored": self._scored.value,
+            "errors": self._errors.value,
+            "queued": self.queue.qsize(),
+        }
+
+    def close(self, wait: bool = True, timeout: float = 30):
+        """
+        Stops the worker; with wait=True the queued requests are
+        scored first (up to `timeout` seconds).
+        """
+        if wait:
+            self.queue.put(None, timeout=timeout)
+            self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self.queue.cancel_join_thread()
+
+
+# ======================================================
+# LOG SUMMARY
+# ======================================================
+def summarize(log_path: str = SHADOW_LOG) -> pd.DataFrame:
+    """
+    Per (production model, candidate): requests, rows, mean and max
+    probability divergence and median / p95 latency of both models
+    (candidate_ms is wall time in the niced worker, so it also counts
+    waiting for the CPU; candidate_cpu_ms is the compute alone).
+    """
+    log = pd.read_json(log_path, lines=True)
+    if "candidate" not in log.columns:
+        return pd.DataFrame()
+    log = log.dropna(subset=["candidate"])
+
+    return log.groupby(["model", "candidate"]).agg(
+        requests=("rows", "size"),
+        rows=("rows", "sum"),
+        mean_abs_diff=("mean_abs_diff", "mean"),
+        max_abs_diff=("max_abs_diff", "max"),
+        production_ms_p50=("production_ms", "median"),
+        production_ms_p95=("production_ms", lambda s: s.quantile(0.95)),
+        candidate_ms_p50=("candidate_ms", "median"),
+        candidate_ms_p95=("candidate_ms", lambda s: s.quantile(0.95)),
+        candidate_cpu_ms_p50=("candidate_cpu_ms", "median"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarise a shadow scoring log (see model_host.py --shadow)."
+    )
+    parser.add_argument("log", nargs="?", default=SHADOW_LOG)
+    args = parser.parse_args()
+
+    summary = summarize(args.log)
+    if summary.empty:
+        print(f"⚠️  no shadow scores in {args.log}")
+        return
+    print(summary.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import json
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from compact_trees import load_any
+from live_matches import MatchBook
+from utils import (
+    MODEL_FILES,
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias
+)
+
+
+# ======================================================
+# SETTINGS
+# ======================================================
+SWING_LOG = "swings.jsonl"
+
+WINDOW = 6          # deliveries: a swing has to happen within an over
+THRESHOLD = 0.15    # probability change that counts as a swing
+
+# prepare_streamlit_input / build_state_frame columns reported as
+# "what changed" between the window's extreme and the triggering ball
+DELTA_FEATURES = [
+    "current_score",
+    "wickets_remaining",
+    "runs_remaining",
+    "balls_remaining",
+    "current_run_rate",
+    "required_run_rate",
+    "pressure",
+    "runs_last_6",
+    "runs_last_12",
+    "wkts_last_6",
+    "wkts_last_12",
+]
+
+
+# ======================================================
+# ALERT FEED (BOUNDED MEMORY + APPEND-ONLY FILE)
+# ======================================================
+class SwingFeed:
+    """
+    The latest `maxlen` swing events in memory, every event in a JSON
+    Lines file. Readers poll with a cursor like MatchBook.poll().
+    """
+
+    def __init__(self, maxlen: int = 1000, log_path: str = SWING_LOG):
+        self.events = deque(maxlen=maxlen)
+        self.published = 0
+        self.log = open(log_path, "a", buffering=1) if log_path else None
+
+    def publish(self, events: list):
+        for event in events:
+            self.published += 1
+            event["seq"] = self.published
+            self.events.append(event)
+            if self.log is not None:
+                self.log.write(json.dumps(event) + "\n")
+
+    def since(self, cursor: int = 0) -> tuple:
+        """
+        (new cursor, events published after `cursor`). Events that
+        have already left the in-memory window are only in the file.
+        """
+        return self.published, [e for e in self.events if e["seq"] > cursor]
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+
+# ======================================================
+# SWING DETECTOR (FIXED WINDOW PER MATCH, NUMPY COLUMNS)
+# ======================================================
+class SwingDetector:
+    """
+    Consumes successive win probabilities per match and emits a swing
+    event when the probability moved by `threshold` or more against
+    the highest (drop) or lowest (rise) of the last `window`
+    predictions. Each match keeps a ring of its last `window`
+    probabilities and feature rows. A ball scans that ring, so it
+    costs O(window), not O(1): with a window of one over this is 6
+    comparisons, independent of how long the match has run, and it
+    keeps a whole batch of matches to one set of numpy steps, which
+    per-match monotonic deques would not.
+
+    After a swing the match's window restarts at the new level, so
+    one collapse raises one event, not one per following ball.
+    """
+
+    def __init__(self, feed: SwingFeed, window: int = WINDOW, threshold: float = THRESHOLD,
+                 capacity: int = 1024):
+        self.feed = feed
+        self.window = window
+        self.threshold = threshold
+
+        self.slots = {}
+        self.free = []
+        self.capacity = 0
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        def grown(name, shape, dtype, fill):
+            column = np.full((capacity,) + shape, fill, dtype=dtype)
+            column[:self.capacity] = getattr(self, name, column)[:self.capacity]
+            setattr(self, name, column)
+
+        grown("prob", (self.window,), np.float32, np.nan)
+        grown("features", (self.window, len(DELTA_FEATURES)), np.float32, np.nan)
+        grown("cursor", (), np.int16, 0)
+        self.capacity = capacity
+
+    def _slots(self, match_ids) -> np.ndarray:
+        out = np.empty(len(match_ids), dtype=np.int64)
+        for i, match_id in enumerate(match_ids):
+            slot = self.slots.get(match_id)
+            if slot is None:
+                slot = self.free.pop() if self.free else len(self.slots)
+                if slot >= self.capacity:
+                    self._grow(2 * self.capacity)
+                self.slots[match_id] = slot
+            out[i] = slot
+        return out
+
+    def forget(self, match_id):
+        slot = self.slots.pop(match_id, None)
+        if slot is not None:
+            self._reset(np.array([slot]))
+            self.free.append(slot)
+
+    def _reset(self, slots: np.ndarray):
+        self.prob[slots] = np.nan
+        self.features[slots] = np.nan
+        self.cursor[slots] = 0
+
+    def update(self, match_ids, win_probs, X: pd.DataFrame) -> list:
+        """
+        One new prediction per match (ids unique within a call) with
+        its feature rows. Returns the swing events, also published to
+        the feed.
+        """
+        slots = self._slots(match_ids)
+        p = np.asarray(win_probs, dtype=np.float32)
+        f = X[DELTA_FEATURES].to_numpy(np.float32)
+
+        # window extremes; empty positions never win
+        ring = self.prob[slots]
+        empty = np.isnan(ring)
+        hi_at = np.where(empty, -np.inf, ring).argmax(axis=1)
+        lo_at = np.where(empty, np.inf, ring).argmin(axis=1)
+        rows = np.arange(len(slots))
+        hi, lo = ring[rows, hi_at], ring[rows, lo_at]
+
+        drop = np.where(np.isnan(hi), 0, p - hi)
+        rise = np.where(np.isnan(lo), 0, p - lo)
+        is_drop = -drop >= rise
+        swing = np.where(is_drop, drop, rise)
+        fired = np.abs(swing) >= self.threshold
+
+        events = []
+        if fired.any():
+            ref_at = np.where(is_drop, hi_at, lo_at)
+            deltas = f - self.features[slots, ref_at]
+            # deliveries between the reference ball and this one
+            span = (self.cursor[slots] - 1 - ref_at) % self.window + 1
+
+            ids = list(match_ids)
+            for i in np.flatnonzero(fired):
+                balls = int(120 - f[i, DELTA_FEATURES.index("balls_remaining")])
+                events.append({
+                    "time": round(time.time(), 3),
+                    "match_id": ids[i].item() if hasattr(ids[i], "item") else ids[i],
+                    "direction": "drop" if is_drop[i] else "rise",
+                    "swing": round(float(swing[i]), 4),
+                    "from": round(float(p[i] - swing[i]), 4),
+                    "to": round(float(p[i]), 4),
+                    "over": f"{balls // 6}.{balls % 6}",
+                    "score": int(f[i, DELTA_FEATURES.index("current_score")]),
+                    "wickets": int(10 - f[i, DELTA_FEATURES.index("wickets_remaining")]),
+                    "within_deliveries": int(span[i]),
+                    "deltas": {
+                        name: round(float(d), 3)
+                        for name, d in zip(DELTA_FEATURES, deltas[i]) if d != 0
+                    },
+                })
+            self._reset(slots[fired])
+
+        at = self.cursor[slots]
+        self.prob[slots, at] = p
+        self.features[slots, at] = f
+        self.cursor[slots] = (at + 1) % self.window
+
+        if events:
+            self.feed.publish(events)
+        return events
+
+    def attach(self, book: MatchBook) -> int:
+        """
+        Follows every match scored by a MatchBook, and forgets a match
+        when the book removes it, so a re-added id starts a fresh
+        window. Returns the subscription token.
+        """
+        def on_tick(match_ids, win_probs):
+            self.update(match_ids, win_probs, book.last_features)
+
+        return book.subscribe(on_tick, on_remove=self.forget)
+
+
+# ======================================================
+# REPLAY (deliveries.csv THROUGH A MATCH BOOK)
+# ======================================================
+def replay_chases(matches: pd.DataFrame, deliveries: pd.DataFrame) -> tuple:
+    """
+    (chases, balls): one row per chase (batting / bowling team, venue,
+    target) and its second-innings deliveries in order, each with its
+    position `step` within the chase.
+    """
+    totals = deliveries[deliveries["inning"] == 1].groupby("match_id")["total_runs"].sum()
+
+    balls = deliveries[deliveries["inning"] == 2].copy()
+    balls = balls[balls["match_id"].isin(totals.index)]
+    balls["step"] = balls.groupby("match_id").cumcount()
+    balls["wicket"] = balls["player_dismissed"].notna().astype(np.int8)
+    balls["legal"] = ((balls["wide_runs"] == 0) & (balls["noball_runs"] == 0)).astype(np.int16)
+
+    chases = balls.groupby("match_id")[["batting_team", "bowling_team"]].first()
+    chases["venue"] = chases.index.map(matches.set_index("id")["venue"])
+    chases["target"] = totals.reindex(chases.index) + 1
+
+    return chases.dropna(), balls
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay deliveries.csv through the live swing detector."
+    )
+    parser.add_argument("--model", default=MODEL_FILES["XGBoost (Advanced)"])
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N chases")
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--log", default=SWING_LOG)
+    parser.add_argument("--feed-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    matches, deliveries = load_match_data(args.matches, args.deliveries)
+    chases, balls = replay_chases(matches, deliveries)
+    if args.limit:
+        chases = chases.iloc[:args.limit]
+
+    book = MatchBook(load_any(args.model), compute_team_strength(matches),
+                     compute_venue_chase_bias(matches), capacity=max(len(chases), 1))
+    for match_id, row in chases.iterrows():
+        try:
+            book.add_match(match_id, row["batting_team"], row["bowling_team"],
+                           row["venue"], int(row["target"]))
+        except ValueError as exc:
+            print(f"⚠️  skipped match {match_id}: {exc}")
+
+    feed = SwingFeed(args.feed_size, args.log)
+    detector = SwingDetector(feed, args.window, args.threshold, capacity=max(len(book), 1))
+    detector.attach(book)
+    book.tick()
+
+    # every chase advances one delivery per tick, all in one batch
+    balls = balls[balls["match_id"].isin(book.slots)]
+    start = time.perf_counter()
+    for _, step in balls.groupby("step", sort=True):
+        book.record_balls(step["match_id"].to_numpy(), step["total_runs"].to_numpy(),
+                          step["wicket"].to_numpy(), step["legal"].to_numpy())
+        book.tick()
+    seconds = time.perf_counter() - start
+    feed.close()
+
+    print(f"Chases        : {len(book)}")
+    print(f"Deliveries    : {len(balls):,} in {seconds:.1f}s ({len(balls) / seconds:,.0f} balls/s)")
+    print(f"Swings        : {feed.published} (>= {args.threshold:.0%} within {args.window} deliveries)")
+    for event in list(feed.events)[-5:]:
+        print(f"  match {event['match_id']} over {event['over']}: "
+              f"{event['from']:.0%} -> {event['to']:.0%} {event['deltas']}")
+    print(f"✅ events appended to {args.log}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# ======================================================
+# SCHEMA (SAME COLUMNS AS THE KAGGLE deliveries.csv)
+# ======================================================
+DELIVERY_COLUMNS = [
+    "match_id", "inning", "batting_team", "bowling_team", "over", "ball",
+    "batsman", "non_striker", "bowler", "is_super_over", "wide_runs",
+    "bye_runs", "legbye_runs", "noball_runs", "penalty_runs",
+    "batsman_runs", "extra_runs", "total_runs", "player_dismissed",
+    "dismissal_kind", "fielder"
+]
+
+# runs off a legal delivery and how often each happens, per phase
+RUN_LEVELS = np.array([0, 1, 2, 3, 4, 6])
+PHASE_PROBS = {
+    "powerplay": [0.42, 0.33, 0.06, 0.01, 0.13, 0.05],
+    "middle": [0.36, 0.43, 0.08, 0.01, 0.09, 0.03],
+    "death": [0.33, 0.34, 0.09, 0.01, 0.14, 0.09],
+}
+# share of an innings' runs scored per ball in each phase (relative)
+PHASE_RATE = np.array([1.0, 0.9, 1.35])
+
+DISMISSALS = ["caught", "bowled", "lbw", "run out", "caught and bowled", "stumped"]
+DISMISSAL_PROBS = [0.6, 0.18, 0.1, 0.07, 0.03, 0.02]
+WITH_FIELDER = {"caught", "run out", "stumped"}
+
+
+# ======================================================
+# RUN ALLOCATION
+# ======================================================
+def allocate_runs(rng, total: int, balls: int, probs) -> np.ndarray:
+    """
+    Runs for each of `balls` balls summing to exactly `total`.
+    Balls are drawn from the phase distribution, then nudged one run
+    level at a time (never overshooting) until the sum matches.
+    """
+    level = rng.choice(6, size=balls, p=probs)
+
+    for _ in range(500):
+        diff = total - RUN_LEVELS[level].sum()
+        if diff == 0:
+            return RUN_LEVELS[level]
+        if diff > 0:
+            movable = level < 5
+            # 4 -> 6 adds two runs, so only when two are missing
+            ok = (level < 4) | ((level == 4) & (diff >= 2))
+            step = 1
+        else:
+            movable = level > 0
+            ok = (level > 0) & ((level != 5) | (diff <= -2))
+            step = -1
+
+        # only sixes left to move: take the two-run step and correct after
+        candidates = np.flatnonzero(ok if ok.any() else movable)
+        if not len(candidates):
+            break
+        pick = rng.choice(candidates, size=min(len(candidates), max(1, abs(diff) // 2)), replace=False)
+        level[pick] += step
+
+    raise ValueError(f"cannot place {total} runs on {balls} balls")
+
+
+def _phase_of(legal_index: np.ndarray) -> np.ndarray:
+    return np.select([legal_index < 36, legal_index < 90], [0, 1], default=2)
+
+
+def innings(rng, runs: int, balls: int, wickets: int, winning_ball: int = 0) -> dict:
+    """
+    Ball-by-ball arrays for one innings with exactly `runs`, `balls`
+    legal deliveries and `wickets`. With winning_ball > 0 the last
+    legal ball scores that many runs and nothing before it falls
+    on a wicket (a completed chase).
+    """
+    # wides / no-balls: one extra run each, never after the last legal ball
+    n_extras = min(int(rng.poisson(4)), max(runs - winning_ball, 0))
+    is_wide = rng.random(n_extras) < 0.8
+    extra_before = np.sort(rng.integers(0, balls, n_extras))
+
+    # wicket balls: the last one when all out, the rest at random
+    wicket = np.zeros(balls, dtype=bool)
+    if wickets == 10:
+        wicket[balls - 1] = True
+        wicket[rng.choice(balls - 1, 9, replace=False)] = True
+    elif wickets:
+        pool = balls - 1 if winning_ball else balls
+        wicket[rng.choice(pool, wickets, replace=False)] = True
+
+    free = ~wicket
+    if winning_ball:
+        free[balls - 1] = False
+
+    legal_runs = np.zeros(balls, dtype=np.int64)
+    if winning_ball:
+        legal_runs[balls - 1] = winning_ball
+
+    # split the remaining runs across phases, then within each phase
+    to_place = runs - n_extras - winning_ball
+    phase = _phase_of(np.arange(balls))
+    free_per_phase = np.bincount(phase[free], minlength=3)
+    weight = free_per_phase * PHASE_RATE
+    share = np.floor(to_place * weight / max(weight.sum(), 1e-9)).astype(int)
+    share[np.argmax(free_per_phase)] += to_place - share.sum()
+
+    # a phase holds at most six an over; spill the rest where there is room
+    room = 6 * free_per_phase
+    share = np.minimum(share, room)
+    left = to_place - share.sum()
+    for ph in np.argsort(share - room):
+        extra = min(left, room[ph] - share[ph])
+        share[ph] += extra
+        left -= extra
+
+    for ph, name in enumerate(PHASE_PROBS):
+        idx = np.flatnonzero(free & (phase == ph))
+        legal_runs[idx] = allocate_runs(rng, share[ph], len(idx), PHASE_PROBS[name])
+
+    # interleave extras with legal balls
+    n = balls + n_extras
+    legal_pos = np.arange(balls) + np.searchsorted(extra_before, np.arange(balls), side="right")
+    extra_pos = extra_before + np.arange(n_extras)
+
+    total = np.zeros(n, dtype=np.int64)
+    batsman_runs = np.zeros(n, dtype=np.int64)
+    wide = np.zeros(n, dtype=np.int64)
+    noball = np.zeros(n, dtype=np.int64)
+    out = np.zeros(n, dtype=bool)
+    legal_index = np.zeros(n, dtype=np.int64)
+
+    batsman_runs[legal_pos] = legal_runs
+    total[legal_pos] = legal_runs
+    out[legal_pos] = wicket
+    legal_index[legal_pos] = np.arange(balls)
+
+    wide[extra_pos[is_wide]] = 1
+    noball[extra_pos[~is_wide]] = 1
+    total[extra_pos] = 1
+    legal_index[extra_pos] = extra_before
+
+    over = legal_index // 6 + 1
+    # ball counts every delivery of the over, extras included
+    first_of_over = np.r_[0, np.flatnonzero(np.diff(over)) + 1]
+    ball = np.arange(n) - np.repeat(first_of_over, np.diff(np.r_[first_of_over, n])) + 1
+
+    return {
+        "over": over,
+        "ball": ball,
+        "wickets_before": np.r_[0, np.cumsum(out)[:-1]],
+        "wide_runs": wide,
+        "noball_runs": noball,
+        "batsman_runs": batsman_runs,
+        "total_runs": total,
+        "out": out,
+    }
+
+
+# ======================================================
+# MATCH (CONSISTENT WITH ITS matches.csv ROW)
+# ======================================================
+def batting_order(match) -> tuple:
+    """
+    (team batting first, team batting second). The result decides
+    when it can (a win by runs means the winner batted first), else
+    the toss.
+    """
+    team1, team2 = match["team1"], match["team2"]
+    winner = match.get("winner")
+    if winner in (team1, team2):
+        loser = team2 if winner == team1 else team1
+        if _count(match.get("win_by_runs")):
+            return winner, loser
+        if _count(match.get("win_by_wickets")):
+            return loser, winner
+    if match.get("toss_winner") in (team1, team2):
+        other = team2 if match["toss_winner"] == team1 else team1
+        if match.get("toss_decision") == "bat":
+            return match["toss_winner"], other
+        return other, match["toss_winner"]
+    return team1, team2
+
+
+def _count(value) -> int:
+    return 0 if value is None or pd.isna(value) else int(value)
+
+
+def _short(team: str) -> str:
+    return "".join(word[0] for word in str(team).split())
+
+
+def match_innings(match, seed: int) -> list:
+    """
+    Both innings of one match. Scores, margins and wickets agree with
+    the match's winner, win_by_runs and win_by_wickets.
+    """
+    rng = np.random.default_rng([seed, int(match["id"])])
+    first, second = batting_order(match)
+
+    winner = match.get("winner")
+    by_runs = _count(match.get("win_by_runs"))
+    by_wickets = _count(match.get("win_by_wickets"))
+
+    # first innings
+    all_out = rng.random() < 0.12
+    w1 = 10 if all_out else min(int(rng.binomial(9, 0.6)), 9)
+    b1 = int(rng.integers(90, 120)) if all_out else 120
+    r1 = int(np.clip(rng.normal(165, 25), 100, 240))
+
+    if winner == second and by_wickets:
+        # chase completed with `by_wickets` in hand on the last legal ball
+        w2 = 10 - by_wickets
+        last = int(rng.choice([1, 2, 4, 6], p=[0.45, 0.15, 0.25, 0.15]))
+        r2 = r1 + int(rng.integers(1, last + 1))
+        b2 = int(rng.integers(max(w2 + 1, 66), 121))
+        chase = last
+    elif winner == first and by_runs:
+        # defended: the chase stops `by_runs` short
+        r1 = max(r1, by_runs + 50)
+        r2 = r1 - by_runs
+        if rng.random() < 0.4:
+            w2, b2 = 10, int(rng.integers(70, 120))
+        else:
+            w2, b2 = int(rng.integers(2, 10)), 120
+        chase = 0
+    else:
+        # tie / no result / unusual rows: both innings end level
+        w2, b2, r2, chase = int(rng.integers(2, 10)), 120, r1, 0
+
+    # enough balls to score the runs at no more than five a ball
+    b1 = min(max(b1, math.ceil(r1 / 5) + w1), 120)
+    b2 = min(max(b2, math.ceil(max(r2 - chase, 0) / 5) + w2 + 1), 120)
+
+    return [
+        (1, first, second, innings(rng, r1, b1, w1)),
+        (2, second, first, innings(rng, r2, b2, w2, winning_ball=chase)),
+    ]
+
+
+def match_deliveries(match, seed: int) -> pd.DataFrame:
+    frames = []
+    rng = np.random.default_rng([seed, int(match["id"]), 1])
+
+    for inning, batting, bowling, balls in match_innings(match, seed):
+        n = len(balls["over"])
+        bat, bowl = _short(batting), _short(bowling)
+
+        striker = np.char.add(f"{bat} Batter ", (balls["wickets_before"] + 1).astype(str))
+        partner = np.char.add(f"{bat} Batter ", (balls["wickets_before"] + 2).astype(str))
+        bowler = np.char.add(f"{bowl} Bowler ", ((balls["over"] - 1) % 5 + 1).astype(str))
+
+        kind = np.where(balls["out"], rng.choice(DISMISSALS, n, p=DISMISSAL_PROBS), None)
+        fielder = np.where(
+            np.isin(kind, list(WITH_FIELDER)),
+            np.char.add(f"{bowl} Fielder ", rng.integers(1, 12, n).astype(str)),
+            None
+        )
+
+        frames.append(pd.DataFrame({
+            "match_id": int(match["id"]),
+            "inning": inning,
+            "batting_team": batting,
+            "bowling_team": bowling,
+            "over": balls["over"],
+            "ball": balls["ball"],
+            "batsman": striker,
+            "non_striker": partner,
+            "bowler": bowler,
+            "is_super_over": 0,
+            "wide_runs": balls["wide_runs"],
+            "bye_runs": 0,
+            "legbye_runs": 0,
+            "noball_runs": balls["noball_runs"],
+            "penalty_runs": 0,
+            "batsman_runs": balls["batsman_runs"],
+            "extra_runs": balls["wide_runs"] + balls["noball_runs"],
+            "total_runs": balls["total_runs"],
+            "player_dismissed": np.where(balls["out"], striker, None),
+            "dismissal_kind": kind,
+            "fielder": fielder,
+        }))
+
+    return pd.concat(frames, ignore_index=True)[DELIVERY_COLUMNS]
+
+
+# ======================================================
+# SCALED MATCH LIST
+# ======================================================
+def scaled_matches(matches: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """
+    `scale` copies of matches.csv with fresh ids (copy k adds
+    k * 10**digits to every id), so 10x / 100x runs keep the real
+    fixture, venue and result mix.
+    """
+    offset = 10 ** len(str(int(matches["id"].max())))
+    copies = [matches.assign(id=matches["id"] + k * offset) for k in range(scale)]
+    return pd.concat(copies, ignore_index=True)
+
+
+# ======================================================
+# STREAMING WRITER
+# ======================================================
+def generate(matches: pd.DataFrame, out_path: str, seed: int = 0, chunk: int = 500) -> int:
+    """
+    Writes deliveries for every match to `out_path`, `chunk` matches
+    at a time. Each match has its own seed (seed, match id), so the
+    output does not depend on the chunk size. Returns rows written.
+    """
+    rows = 0
+    records = matches.to_dict("records")
+
+    with open(out_path, "w", newline="") as f:
+        for start in range(0, len(records), chunk):
+            frame = pd.concat(
+                [match_deliveries(m, seed) for m in records[start:start + chunk]],
+                ignore_index=True
+            )
+            frame.to_csv(f, header=start == 0, index=False)
+            rows += len(frame)
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic deliveries.csv consistent with matches.csv."
+    )
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--out", default="data/deliveries.csv")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="copies of every match (writes --matches-out as well)")
+    parser.add_argument("--matches-out", default=None,
+                        help="scaled matches file (default: data/matches_x<scale>.csv)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=500, help="matches per write")
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite --out (and --matches-out) if it exists")
+    args = parser.parse_args()
+
+    if os.path.exists(args.out) and os.path.samefile(args.matches, args.out):
+        parser.error("--out must differ from --matches")
+    if os.path.exists(args.out) and not args.force:
+        parser.error(f"{args.out} exists – pass --force to overwrite it or choose another --out")
+
+    matches = pd.read_csv(args.matches)
+
+    if args.scale > 1:
+        matches = scaled_matches(matches, args.scale)
+        matches_out = args.matches_out or os.path.join(
+            os.path.dirname(args.out), f"matches_x{args.scale}.csv"
+        )
+        if os.path.exists(matches_out) and not args.force:
+            parser.error(f"{matches_out} exists – pass --force to overwrite it")
+        matches.to_csv(matches_out, index=False)
+        print(f"Matches       : {matches_out} ({len(matches)} rows)")
+
+    start = time.perf_counter()
+    rows = generate(matches, args.out, args.seed, args.chunk)
+    seconds = time.perf_counter() - start
+
+    print(f"Deliveries    : {args.out} ({rows} rows)")
+    print(f"Time          : {seconds:.1f}s ({rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
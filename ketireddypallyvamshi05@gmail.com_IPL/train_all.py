@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import pickle
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from sklearn.metrics import accuracy_score, brier_score_loss, log_loss, mean_squared_error
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from threadpoolctl import threadpool_limits
+
+from evaluate import BASE_FEATURES, MODELS, XGB_FEATURES, build_model
+from utils import (
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features
+)
+
+warnings.filterwarnings("ignore")
+
+
+# ======================================================
+# SETTINGS
+# ======================================================
+OUT_FILES = {
+    "xgboost": "model.pkl",
+    "logistic": "logistic_model.pkl",
+    "linear": "linear_model.pkl",
+    "hist_gbm": "rf_model.pkl",
+}
+
+REPORT_FILE = "train_report.json"
+
+# cheap fits: one core each, the tree models share the rest
+LIGHT_MODELS = ("logistic", "linear")
+
+
+def thread_caps(names: list, cores: int) -> dict:
+    """
+    Threads per model so that all of them together use `cores`.
+    """
+    heavy = [n for n in names if n not in LIGHT_MODELS]
+    spare = max(cores - (len(names) - len(heavy)), len(heavy))
+
+    caps = {n: 1 for n in names if n in LIGHT_MODELS}
+    for i, name in enumerate(heavy):
+        caps[name] = spare // len(heavy) + (i < spare % len(heavy))
+    return caps
+
+
+# ======================================================
+# SHARED MEMORY (ONE COPY OF EVERY DESIGN MATRIX)
+# ======================================================
+def share_array(a: np.ndarray, blocks: list) -> dict:
+    shm = SharedMemory(create=True, size=max(a.nbytes, 1))
+    np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+    blocks.append(shm)
+    return {"name": shm.name, "shape": a.shape, "dtype": a.dtype.str}
+
+
+def share_matrix(X, blocks: list) -> dict:
+    """
+    Copies a dense or CSR matrix into shared memory and returns the
+    handle workers attach with. Sparse output stays sparse: XGBoost
+    treats absent entries as missing, and the saved pipelines send it
+    the same CSR at serving time.
+    """
+    if sparse.issparse(X):
+        X = X.tocsr()
+        return {
+            "shape": X.shape,
+            "csr": [share_array(a, blocks) for a in (X.data, X.indices, X.indptr)],
+        }
+    return {"shape": X.shape, "dense": share_array(np.ascontiguousarray(X), blocks)}
+
+
+_ATTACHED = []
+
+
+def _attach_array(handle: dict) -> np.ndarray:
+    shm = SharedMemory(name=handle["name"])
+    _ATTACHED.append(shm)  # the view is only valid while shm is open
+    return np.ndarray(handle["shape"], np.dtype(handle["dtype"]), buffer=shm.buf)
+
+
+def attach_matrix(handle: dict, n_train: int) -> tuple:
+    """
+    (train rows, test rows) views of a shared matrix whose first
+    n_train rows are the training split. Nothing is copied except
+    the test rows' CSR row pointers.
+    """
+    if "dense" in handle:
+        X = _attach_array(handle["dense"])
+        return X[:n_train], X[n_train:]
+
+    data, indices, indptr = (_attach_array(h) for h in handle["csr"])
+    cols = handle["shape"][1]
+    split = indptr[n_train]
+
+    train = sparse.csr_matrix(
+        (data[:split], indices[:split], indptr[:n_train + 1]),
+        shape=(n_train, cols), copy=False
+    )
+    test = sparse.csr_matrix(
+        (data[split:], indices[split:], indptr[n_train:] - split),
+        shape=(len(indptr) - 1 - n_train, cols), copy=False
+    )
+    return train, test
+
+
+# ======================================================
+# ONE MODEL (RUNS IN A WORKER PROCESS)
+# ======================================================
+def fit_model(name: str, handle: dict, columns, y_handle: dict, n_train: int, threads: int) -> dict:
+    """
+    Fits `name` on the shared training rows (only `columns` of the
+    matrix, when given) and scores the test rows. Returns the fitted
+    estimator and its metrics.
+    """
+    X_train, X_test = attach_matrix(handle, n_train)
+    if columns is not None:
+        X_train, X_test = X_train[:, columns], X_test[:, columns]
+    y = _attach_array(y_handle)
+    y_train, y_test = y[:n_train], y[n_train:]
+
+    model = build_model(name)[0].named_steps["model"]
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=threads)
+
+    # caps BLAS / OpenMP too (hist_gbm has no n_jobs)
+    start = time.perf_counter()
+    with threadpool_limits(threads):
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+
+        if hasattr(model, "predict_proba"):
+            p = model.predict_proba(X_test)[:, 1]
+        else:
+            p = np.clip(model.predict(X_test), 0, 1)
+
+    metrics = {
+        "accuracy": float(accuracy_score(y_test, (p > 0.5).astype(int))),
+        "log_loss": float(log_loss(y_test, np.clip(p, 1e-6, 1 - 1e-6), labels=[0, 1])),
+        "brier": float(brier_score_loss(y_test, p)),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, p))),
+        "threads": threads,
+        "fit_seconds": fit_seconds,
+    }
+    return {"model": model, "metrics": metrics}
+
+
+# ======================================================
+# DESIGN MATRICES (BUILT AND ENCODED ONCE)
+# ======================================================
+def design_matrices(df: pd.DataFrame, n_train: int, names: list) -> dict:
+    """
+    Fitted preprocessing per model plus the encoded matrices, built
+    once: the one-hot matrix over XGB_FEATURES serves every one-hot
+    model (BASE_FEATURES models get a column subset) and hist_gbm has
+    its own binned matrix.
+    """
+    train = df.iloc[:n_train]
+    plans, matrices = {}, {}
+
+    onehot = [n for n in names if n != "hist_gbm"]
+    if onehot:
+        prep = build_model("xgboost")[0].named_steps["prep"].fit(train[XGB_FEATURES])
+        matrices["onehot"] = prep.transform(df[XGB_FEATURES])
+        out = list(prep.get_feature_names_out())
+
+        base = build_model("logistic")[0].named_steps["prep"].fit(train[BASE_FEATURES])
+        columns = [out.index(c) for c in base.get_feature_names_out()]
+
+        # a subset must come out sparse / dense like its own prep would
+        base_key = "onehot"
+        if base.sparse_output_ != prep.sparse_output_:
+            matrices["base"] = base.transform(df[BASE_FEATURES])
+            base_key, columns = "base", None
+
+        for name in onehot:
+            if name == "xgboost":
+                plans[name] = (prep, "onehot", None)
+            else:
+                plans[name] = (base, base_key, columns)
+
+    if "hist_gbm" in names:
+        binner = build_model("hist_gbm")[0].named_steps["prep"].fit(train[BASE_FEATURES])
+        # float32, not uint8: the encoder's NaN for unseen categories
+        # (test rows) must stay missing instead of becoming a code
+        matrices["binned"] = binner.transform(df[BASE_FEATURES]).astype(np.float32)
+        plans["hist_gbm"] = (binner, "binned", None)
+
+    return plans, matrices
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train every app model at once from one shared design matrix."
+    )
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--models", nargs="+", default=MODELS, choices=MODELS)
+    parser.add_argument("--cores", type=int, default=os.cpu_count(),
+                        help="threads shared by all models together")
+    parser.add_argument("--report", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    # ---------------- FEATURES ----------------
+    matches, deliveries = load_match_data(args.matches, args.deliveries)
+    deliveries = build_chase_features(
+        matches,
+        deliveries,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches)
+    )
+    df = deliveries[XGB_FEATURES + ["win"]].dropna().reset_index(drop=True)
+
+    # one stratified split for every model; training rows first so
+    # each worker's training set is a zero-copy prefix
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=0.2, stratify=df["win"], random_state=42
+    )
+    df = df.iloc[np.concatenate([train_idx, test_idx])].reset_index(drop=True)
+    n_train = len(train_idx)
+
+    plans, matrices = design_matrices(df, n_train, args.models)
+    prep_seconds = time.perf_counter() - start
+    print(f"Design matrix : {len(df):,} rows ({n_train:,} train) in {prep_seconds:.1f}s")
+
+    # ---------------- PARALLEL FITS ----------------
+    caps = thread_caps(args.models, args.cores)
+    blocks = []
+    results = {}
+    try:
+        handles = {key: share_matrix(X, blocks) for key, X in matrices.items()}
+        y_handle = share_array(df["win"].to_numpy(np.int8), blocks)
+        del matrices
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=len(args.models), mp_context=get_context("spawn")) as pool:
+            futures = {
+                pool.submit(
+                    fit_model, name, handles[plans[name][1]], plans[name][2],
+                    y_handle, n_train, caps[name]
+                ): name
+                for name in args.models
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                results[name] = future.result()
+                print(f"  {name:<10} brier {results[name]['metrics']['brier']:.4f}  "
+                      f"fit {results[name]['metrics']['fit_seconds']:.1f}s "
+                      f"({caps[name]} threads)")
+        wall_seconds = time.perf_counter() - start
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    # ---------------- SAVE ----------------
+    for name, result in results.items():
+        path = OUT_FILES[name]
+        pipe = Pipeline([("prep", plans[name][0]), ("model", result["model"])])
+        with open(path, "wb") as f:
+            pickle.dump(pipe, f)
+
+    metrics = {name: results[name]["metrics"] for name in args.models}
+    report = {
+        "rows": len(df),
+        "train_rows": n_train,
+        "prep_seconds": prep_seconds,
+        "parallel_fit_seconds": wall_seconds,
+        "sum_fit_seconds": sum(m["fit_seconds"] for m in metrics.values()),
+        "models": {name: {**m, "file": OUT_FILES[name]} for name, m in metrics.items()},
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    print(pd.DataFrame(metrics).T.round(4).to_string())
+    print(f"\nParallel fit  : {wall_seconds:.1f}s (models alone: {report['sum_fit_seconds']:.1f}s)")
+    print(f"✅ {', '.join(OUT_FILES[n] for n in args.models)} and {args.report} saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+import argparse
+import json
+import os
+import pickle
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+warnings.filterwarnings("ignore")
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+from xgboost import XGBClassifier
+
+from entities import canonicalize_frame
+from evaluate import CAT_COLS, XGB_FEATURES, data_fingerprint
+from validate import quarantine_path, validate_deliveries
+from utils import (
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features
+)
+
+
+# ======================================================
+# SETTINGS (SAME MODEL AS model.py)
+# ======================================================
+CACHE_DIR = "ext_cache"
+
+PARAMS = {
+    "objective": "binary:logistic",
+    "eval_metric": "logloss",
+    "tree_method": "hist",
+    "max_depth": 6,
+    "learning_rate": 0.05,
+    "subsample": 0.85,
+    "colsample_bytree": 0.85,
+    "seed": 42,
+}
+ROUNDS = 350
+
+TEST_SIZE = 0.2
+
+
+# ======================================================
+# PASS 1: FEATURE SHARDS + VOCABULARIES
+# ======================================================
+def match_blocks(deliveries_path: str, rows: int):
+    """
+    deliveries.csv in blocks of about `rows` rows that only hold
+    whole matches. The last match of every read is held back until
+    its remaining balls arrive, which needs the file ordered by
+    match_id: a match split across the file raises ValueError.
+    """
+    carry = None
+    previous = None
+    for chunk in pd.read_csv(deliveries_path, chunksize=rows):
+        ids = chunk["match_id"].to_numpy()
+        if (np.diff(ids) < 0).any() or (previous is not None and ids[0] < previous):
+            raise ValueError(
+                f"{deliveries_path} is not ordered by match_id – sort it first, "
+                "e.g. df.sort_values(['match_id', 'inning', 'over', 'ball'], kind='stable')"
+            )
+        previous = ids[-1]
+
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        last = chunk["match_id"].iloc[-1]
+        complete = chunk["match_id"] != last
+        carry = chunk[~complete]
+
+        if complete.any():
+            yield canonicalize_frame(chunk[complete])
+
+    if carry is not None and len(carry):
+        yield canonicalize_frame(carry)
+
+
+def build_shards(matches_path: str, deliveries_path: str, rows: int, seed: int = 42) -> dict:
+    """
+    Featurises deliveries block by block into CACHE_DIR/<fingerprint>/
+    shard_*.pkl and records every category value seen. Rows are
+    assigned to the test split per shard with a seeded draw. A cache
+    built from the same csv files is reused.
+    """
+    key = data_fingerprint([matches_path, deliveries_path])
+    out_dir = os.path.join(CACHE_DIR, key)
+    meta_path = os.path.join(out_dir, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return json.load(f)
+
+    # validation checks deliveries against every match, not only normal results
+    all_matches = canonicalize_frame(pd.read_csv(matches_path))
+    matches = all_matches[all_matches["result"] == "normal"]
+    team_strength = compute_team_strength(matches)
+    venue_bias = compute_venue_chase_bias(matches)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+
+    # blocks hold whole matches, so validating block by block is the
+    # same as validating the whole file
+    quarantine = quarantine_path(deliveries_path)
+    if os.path.exists(quarantine):
+        os.remove(quarantine)
+
+    shards, vocab, total, bad_rows = [], {col: set() for col in CAT_COLS}, 0, 0
+    for i, block in enumerate(match_blocks(deliveries_path, rows)):
+        block, bad, _ = validate_deliveries(block, all_matches)
+        if len(bad):
+            bad.to_csv(quarantine, mode="a", header=not bad_rows, index=False)
+            bad_rows += len(bad)
+
+        features = build_chase_features(matches, block, team_strength, venue_bias)
+        features = features[XGB_FEATURES + ["win"]].dropna()
+        if features.empty:
+            continue
+
+        rng = np.random.default_rng([seed, i])
+        features["test"] = rng.random(len(features)) < TEST_SIZE
+
+        for col in CAT_COLS:
+            vocab[col].update(features[col].astype(str).unique())
+
+        path = os.path.join(out_dir, f"shard_{i:05d}.pkl")
+        features.to_pickle(path)
+        shards.append(path)
+        total += len(features)
+
+    meta = {
+        "data": key,
+        "shards": shards,
+        "rows": total,
+        "vocab": {col: sorted(values) for col, values in vocab.items()},
+    }
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=1)
+
+    if bad_rows:
+        print(f"⚠️  {bad_rows:,} deliveries quarantined -> {quarantine}")
+    return meta
+
+
+def fit_encoder(vocab: dict, sample: pd.DataFrame) -> ColumnTransformer:
+    """
+    The model.py preprocessor with its one-hot categories fixed to
+    the vocabularies of every shard, so no shard can add a column.
+    """
+    num_cols = [c for c in XGB_FEATURES if c not in CAT_COLS]
+    preprocessor = ColumnTransformer(
+        [
+            ("cat", OneHotEncoder(
+                categories=[vocab[col] for col in CAT_COLS],
+                handle_unknown="ignore"
+            ), CAT_COLS),
+            ("num", "passthrough", num_cols)
+        ]
+    )
+    return preprocessor.fit(sample[XGB_FEATURES].astype({c: str for c in CAT_COLS}))
+
+
+# ======================================================
+# PASS 2: SHARDS -> XGBOOST EXTERNAL MEMORY
+# ======================================================
+def shard_rows(path: str, test: bool) -> tuple:
+    """
+    (feature frame, labels) of one shard's train or test rows.
+    """
+    frame = pd.read_pickle(path)
+    frame = frame[frame["test"] == test]
+    return frame[XGB_FEATURES].astype({c: str for c in CAT_COLS}), frame["win"].to_numpy()
+
+
+class ShardIter(xgb.DataIter):
+    """
+    One encoded shard per batch, train or test rows only. With a
+    cache_prefix XGBoost pages the quantized batches to disk instead
+    of holding the whole matrix.
+    """
+
+    def __init__(self, shards: list, prep, test: bool, cache_prefix: str = None):
+        self.shards = shards
+        self.prep = prep
+        self.test = test
+        self.position = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def load(self, path: str) -> tuple:
+        X, y = shard_rows(path, self.test)
+        return self.prep.transform(X), y
+
+    def next(self, input_data) -> int:
+        if self.position == len(self.shards):
+            return 0
+        X, y = self.load(self.shards[self.position])
+        input_data(data=X, label=y)
+        self.position += 1
+        return 1
+
+    def reset(self):
+        self.position = 0
+
+
+def as_pipeline(booster, prep) -> Pipeline:
+    """
+    Wraps a trained booster as the same Pipeline model.py saves.
+    """
+    model = XGBClassifier(
+        n_estimators=booster.num_boosted_rounds(),
+        max_depth=PARAMS["max_depth"],
+        learning_rate=PARAMS["learning_rate"],
+        subsample=PARAMS["subsample"],
+        colsample_bytree=PARAMS["colsample_bytree"],
+        eval_metric="logloss",
+        random_state=42
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "booster.json")
+        booster.save_model(path)
+        model.load_model(path)
+
+    # load_model does not set these (xgboost 2.0), and predict_proba needs them
+    model.n_classes_ = 2
+    model.classes_ = np.array([0, 1])
+
+    return Pipeline([("prep", prep), ("model", model)])
+
+
+def evaluate_shards(pipe, meta: dict) -> dict:
+    """
+    Accuracy and Brier score over the test rows, one shard at a time,
+    through the saved pipeline's own predict_proba.
+    """
+    rows = correct = squared = 0.0
+
+    for path in meta["shards"]:
+        X, y = shard_rows(path, test=True)
+        p = pipe.predict_proba(X)[:, 1]
+        rows += len(y)
+        correct += ((p > 0.5) == y).sum()
+        squared += ((p - y) ** 2).sum()
+
+    return {"rows": int(rows), "accuracy": correct / rows, "brier": squared / rows}
+
+
+def train_external(meta: dict, rounds: int = ROUNDS) -> Pipeline:
+    first = pd.read_pickle(meta["shards"][0])
+    prep = fit_encoder(meta["vocab"], first)
+    del first
+
+    with tempfile.TemporaryDirectory(dir=CACHE_DIR) as tmp:
+        it = ShardIter(meta["shards"], prep, test=False, cache_prefix=os.path.join(tmp, "cache"))
+        dtrain = xgb.DMatrix(it)
+        booster = xgb.train(PARAMS, dtrain, num_boost_round=rounds)
+        del dtrain
+
+    return as_pipeline(booster, prep)
+
+
+# ======================================================
+# IN-MEMORY BASELINE (THE model.py STEPS, NOTHING SAVED)
+# ======================================================
+def _peak_rss_mb() -> float:
+    # VmHWM starts over at exec; ru_maxrss would carry the parent's peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _in_memory(matches_path: str, deliveries_path: str, rounds: int):
+    from sklearn.model_selection import train_test_split
+    from utils import load_match_data
+
+    start = time.perf_counter()
+    matches, deliveries = load_match_data(matches_path, deliveries_path)
+    deliveries = build_chase_features(
+        matches,
+        deliveries,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches)
+    )
+    df = deliveries[XGB_FEATURES + ["win"]].dropna()
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[XGB_FEATURES], df["win"], test_size=TEST_SIZE, stratify=df["win"], random_state=42
+    )
+
+    num_cols = [c for c in XGB_FEATURES if c not in CAT_COLS]
+    pipe = Pipeline([
+        ("prep", ColumnTransformer([
+            ("cat", OneHotEncoder(handle_unknown="ignore"), CAT_COLS),
+            ("num", "passthrough", num_cols)
+        ])),
+        ("model", XGBClassifier(
+            n_estimators=rounds,
+            max_depth=PARAMS["max_depth"],
+            learning_rate=PARAMS["learning_rate"],
+            subsample=PARAMS["subsample"],
+            colsample_bytree=PARAMS["colsample_bytree"],
+            eval_metric="logloss",
+            random_state=42
+        ))
+    ])
+    pipe.fit(X_train, y_train)
+    p = pipe.predict_proba(X_test)[:, 1]
+
+    print(json.dumps({
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": _peak_rss_mb(),
+        "accuracy": float(((p > 0.5) == y_test).mean()),
+        "brier": float(np.mean((p - y_test) ** 2)),
+    }))
+
+
+def measure_in_memory(matches_path: str, deliveries_path: str, rounds: int) -> dict:
+    # a fresh process, so the peak RSS is the in-memory path's own
+    out = subprocess.run(
+        [sys.executable, __file__, "--in-memory", "--rounds", str(rounds),
+         "--matches", matches_path, "--deliveries", deliveries_path],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train model.pkl from chunked feature files with XGBoost external memory."
+    )
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--rows", type=int, default=200_000,
+                        help="deliveries read per block (one feature shard each)")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--out", default="model.pkl")
+    parser.add_argument("--compare", action="store_true",
+                        help="also time the in-memory model.py path in a subprocess")
+    parser.add_argument("--in-memory", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.in_memory:
+        _in_memory(args.matches, args.deliveries, args.rounds)
+        return
+
+    start = time.perf_counter()
+    meta = build_shards(args.matches, args.deliveries, args.rows)
+    shard_seconds = time.perf_counter() - start
+    print(f"Shards        : {len(meta['shards'])} ({meta['rows']:,} rows, {shard_seconds:.1f}s)")
+
+    pipe = train_external(meta, args.rounds)
+    seconds = time.perf_counter() - start
+    peak = _peak_rss_mb()
+
+    scores = evaluate_shards(pipe, meta)
+    print(f"Accuracy      : {scores['accuracy']:.4f}")
+    print(f"BrierScore    : {scores['brier']:.4f}")
+
+    with open(args.out, "wb") as f:
+        pickle.dump(pipe, f)
+
+    if args.compare:
+        base = measure_in_memory(args.matches, args.deliveries, args.rounds)
+        print()
+        print(f"{'':<14}{'time':>9}{'peak RSS':>12}{'accuracy':>10}{'brier':>9}")
+        print(f"{'external':<14}{seconds:>8.1f}s{peak:>9.0f} MB"
+              f"{scores['accuracy']:>10.4f}{scores['brier']:>9.4f}")
+        print(f"{'in-memory':<14}{base['seconds']:>8.1f}s{base['peak_rss_mb']:>9.0f} MB"
+              f"{base['accuracy']:>10.4f}{base['brier']:>9.4f}")
+    else:
+        print(f"Time          : {seconds:.1f}s, peak RSS {peak:.0f} MB")
+
+    print(f"✅ {args.out} saved successfully")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import pickle
+import time
+import warnings
+warnings.filterwarnings("ignore")
+
+import numpy as np
+import pandas as pd
+
+from sklearn.model_selection import train_test_split
+
+from compact_trees import (
+    CompactTrees,
+    _max_depth,
+    _xgboost_trees,
+    flatten_trees,
+    load_compact,
+    save_compact
+)
+from evaluate import data_fingerprint
+from utils import (
+    load_match_data,
+    compute_team_strength,
+    compute_venue_chase_bias,
+    build_chase_features,
+    model_features,
+    apply_calibration
+)
+
+
+# ======================================================
+# SETTINGS
+# ======================================================
+MODEL_FILE = "model.pkl"
+BANDS_DIR = "model_bands.trees"
+
+# small members: all of them together hold about as many trees as
+# model.pkl, so scoring point + members costs about 2 predictions
+MEMBERS = 10
+MEMBER_TREES = 32
+MEMBER_PARAMS = dict(
+    max_depth=4,
+    learning_rate=0.2,
+    subsample=0.85,
+    colsample_bytree=0.85,
+    eval_metric="logloss"
+)
+
+
+# ======================================================
+# BOOTSTRAP ENSEMBLE (RESAMPLED MATCHES)
+# ======================================================
+def bootstrap_weights(match_ids: np.ndarray, members: int, seed: int = 0) -> np.ndarray:
+    """
+    (members, rows) sample weights: each member draws whole matches
+    with replacement, and a row weighs as often as its match was drawn.
+    Balls of one chase are not independent, so rows are not resampled
+    one by one.
+    """
+    codes = pd.factorize(match_ids)[0]
+    n_matches = codes.max() + 1
+    rng = np.random.default_rng(seed)
+
+    draws = rng.integers(0, n_matches, size=(members, n_matches))
+    counts = np.stack([np.bincount(d, minlength=n_matches) for d in draws])
+    return counts[:, codes].astype(np.float32)
+
+
+def build_bands(pipe, X: pd.DataFrame, y, match_ids, members: int = MEMBERS,
+                trees: int = MEMBER_TREES, seed: int = 0) -> dict:
+    """
+    Fits `members` bootstrap XGBoost members on pipe's preprocessing
+    and stacks pipe's own trees and every member's into one set of
+    compact arrays ({"meta", "prep", "arrays"}, see compact_trees.py).
+    """
+    from xgboost import XGBClassifier
+
+    prep, model = pipe.steps[0][1], pipe.steps[-1][1]
+    if not hasattr(model, "get_booster"):
+        raise ValueError(f"bands need an XGBoost model, not {type(model).__name__}")
+
+    Xt = prep.transform(X[model_features(pipe)])
+    weights = bootstrap_weights(np.asarray(match_ids), members, seed)
+
+    point, base = _xgboost_trees(model.get_booster())
+    all_trees, bases, counts = list(point), [base], [len(point)]
+
+    for k in range(members):
+        member = XGBClassifier(n_estimators=trees, random_state=seed + k, **MEMBER_PARAMS)
+        member.fit(Xt, y, sample_weight=weights[k])
+
+        member_trees, base = _xgboost_trees(member.get_booster())
+        all_trees += member_trees
+        bases.append(base)
+        counts.append(len(member_trees))
+
+    # float32 leaves: XGBoost's own precision, so the point is model.pkl's
+    arrays = flatten_trees(all_trees, "float32")
+    meta = {
+        "kind": "xgboost",
+        "n_trees": len(all_trees),
+        "n_features": int(model.n_features_in_),
+        "max_depth": _max_depth(arrays),
+        "base_margin": bases[0],
+        "thresholds": "float32",
+        "leaf_dtype": "float32",
+        "member_trees": counts,
+        "member_base_margins": bases,
+    }
+    if getattr(pipe, "calibration_", None) is not None:
+        meta["calibration"] = np.asarray(pipe.calibration_).tolist()
+    return {"meta": meta, "prep": prep, "arrays": arrays}
+
+
+# ======================================================
+# INTERVALS (ONE STACKED PASS OVER EVERY MEMBER)
+# ======================================================
+class WinProbabilityBands:
+    """
+    Point win probability of model.pkl with an interval from the
+    bootstrap members. All trees are walked together (CompactTrees),
+    and a (trees x models) 0/1 matrix sums every row's leaves into
+    one margin per model in a single matmul.
+
+    The members' spread around their mean margin is added to the
+    point margin, so the band always contains the point estimate.
+    """
+
+    def __init__(self, compact: CompactTrees):
+        meta = compact.meta
+        self.compact = compact
+        self.members = len(meta["member_trees"]) - 1
+
+        owner = np.repeat(np.arange(self.members + 1), meta["member_trees"])
+        self.membership = np.zeros((len(owner), self.members + 1))
+        self.membership[np.arange(len(owner)), owner] = 1
+        self.base = np.asarray(meta["member_base_margins"])
+
+    def margins(self, X) -> np.ndarray:
+        """
+        (rows, 1 + members) log-odds; column 0 is model.pkl.
+        """
+        out = np.empty((len(X), self.members + 1))
+        for chunk, leaves in self.compact.leaf_chunks(X):
+            out[chunk] = leaves @ self.membership + self.base
+        return out
+
+    def predict_interval(self, X, level: float = 0.9) -> pd.DataFrame:
+        """
+        win_prob, low and high for every row of X (model.pkl inputs).
+        """
+        m = self.margins(X)
+        point, members = m[:, 0], m[:, 1:]
+
+        spread = members - members.mean(axis=1, keepdims=True)
+        tails = np.quantile(spread, [(1 - level) / 2, (1 + level) / 2], axis=1)
+
+        index = X.index if isinstance(X, pd.DataFrame) else None
+        out = pd.DataFrame({
+            "win_prob": 1 / (1 + np.exp(-point)),
+            "low": 1 / (1 + np.exp(-(point + tails[0]))),
+            "high": 1 / (1 + np.exp(-(point + tails[1]))),
+        }, index=index)
+
+        # same map as model.pkl; it is monotone, so the band still holds the point
+        if self.compact.calibration_ is not None:
+            out[:] = apply_calibration(out.to_numpy(), self.compact.calibration_)
+        return out
+
+
+def load_bands(path: str = BANDS_DIR, model_path: str = MODEL_FILE):
+    """
+    The bands for model_path, or None when there are none or they
+    were built for an older model_path.
+    """
+    if not os.path.isdir(path):
+        return None
+    compact = load_compact(path)
+    if compact.meta.get("model") != data_fingerprint([model_path]):
+        return None
+    return WinProbabilityBands(compact)
+
+
+def restamp_bands(previous: str, path: str = BANDS_DIR, model_path: str = MODEL_FILE) -> bool:
+    """
+    Points the bands at a rewritten model_path whose trees did not
+    change (calibrate.py only sets calibration_), copying its current
+    calibration map. Only bands built for the `previous` fingerprint
+    are restamped. Returns whether they were.
+    """
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get("model") != previous:
+        return False
+
+    with open(model_path, "rb") as f:
+        pipe = pickle.load(f)
+    meta.pop("calibration", None)
+    if getattr(pipe, "calibration_", None) is not None:
+        meta["calibration"] = np.asarray(pipe.calibration_).tolist()
+    meta["model"] = data_fingerprint([model_path])
+
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+    return True
+
+
+# ======================================================
+# BUILD + REPORT
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train bootstrap members for model.pkl's uncertainty bands."
+    )
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--out", default=BANDS_DIR)
+    parser.add_argument("--members", type=int, default=MEMBERS)
+    parser.add_argument("--trees", type=int, default=MEMBER_TREES,
+                        help="trees per member")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        pipe = pickle.load(f)
+    features = model_features(pipe)
+
+    # the same rows and split as model.py
+    matches, deliveries = load_match_data()
+    deliveries = build_chase_features(
+        matches,
+        deliveries,
+        compute_team_strength(matches),
+        compute_venue_chase_bias(matches)
+    )
+    df = deliveries[features + ["win", "match_id"]].dropna()
+    train, test = train_test_split(df, test_size=0.2, stratify=df["win"], random_state=42)
+
+    start = time.perf_counter()
+    compact = build_bands(pipe, train[features], train["win"], train["match_id"],
+                          args.members, args.trees, args.seed)
+    compact["meta"]["model"] = data_fingerprint([args.model])
+    save_compact(compact, args.out)
+    print(f"Members       : {args.members} x {args.trees} trees in {time.perf_counter() - start:.1f}s")
+
+    bands = WinProbabilityBands(load_compact(args.out))
+    X = test[features].iloc[:10_000]
+
+    start = time.perf_counter()
+    p = pipe.predict_proba(X)[:, 1]
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    interval = bands.predict_interval(X)
+    banded = time.perf_counter() - start
+
+    width = (interval["high"] - interval["low"]).groupby(test["phase"].iloc[:10_000]).mean()
+
+    print(f"Point vs pipe : max |diff| {np.abs(interval['win_prob'] - p).max():.2e}")
+    print(f"{len(X):,} rows   : {single * 1000:.0f} ms model.pkl, {banded * 1000:.0f} ms with bands "
+          f"({banded / single:.1f}x)")
+    print("Mean 90% band width by phase:")
+    print(width.round(3).to_string())
+    print(f"✅ {args.out} saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,89 @@
 import pandas as pd
 import numpy as np
 
+from entities import canonicalize_frame
+from validate import legal_ball_counter, quarantine_path, summary, validate_deliveries
+
+
+# ======================================================
+# MODEL FILES (DO NOT CHANGE NAMES)
+# ======================================================
+MODEL_FILES = {
+    "XGBoost (Advanced)": "model.pkl",
+    "Logistic Regression": "logistic_model.pkl",
+    "Linear Regression": "linear_model.pkl",
+    "Histogram GBM": "rf_model.pkl"
+}
+
 
 # ======================================================
 # TEAM STRENGTH (FROM matches.csv ONLY)
 # ======================================================
+def compute_team_record(matches: pd.DataFrame) -> tuple:
+    """
+    Matches played and matches won per team, as two dicts.
+    Kept as raw counts so they can be updated incrementally.
+    """
+    played = pd.concat([matches["team1"], matches["team2"]]).value_counts()
+    won = matches["winner"].value_counts()
+
+    # categorical columns also list teams with no matches
+    team_matches = played[played > 0].to_dict()
+    team_wins = won[won > 0].to_dict()
+
+    return team_matches, team_wins
+
+
 def compute_team_strength(matches: pd.DataFrame) -> dict:
     """
     Computes historical win-rate for each IPL team.
     Uses only matches.csv (no leakage from deliveries).
     """
-    team_matches = {}
-    team_wins = {}
+    team_matches, team_wins = compute_team_record(matches)
 
-    for _, row in matches.iterrows():
-        t1, t2, winner = row["team1"], row["team2"], row["winner"]
+    return team_strength_from_record(team_matches, team_wins)
 
-        team_matches[t1] = team_matches.get(t1, 0) + 1
-        team_matches[t2] = team_matches.get(t2, 0) + 1
 
-        team_wins[winner] = team_wins.get(winner, 0) + 1
-
-    team_strength = {
+def team_strength_from_record(team_matches: dict, team_wins: dict) -> dict:
+    """
+    Turns played / won counts into win-rates.
+    """
+    return {
         team: team_wins.get(team, 0) / team_matches[team]
         for team in team_matches
     }
 
-    return team_strength
-
 
 # ======================================================
 # VENUE CHASE BIAS
 # ======================================================
+def compute_venue_record(matches: pd.DataFrame) -> tuple:
+    """
+    Games played and chasing wins per venue, as two dicts.
+    """
+    chase_win = (matches["winner"] == matches["team2"]).astype(int)
+    grouped = chase_win.groupby(matches["venue"], observed=True)
+
+    return grouped.count().to_dict(), grouped.sum().to_dict()
+
+
 def compute_venue_chase_bias(matches: pd.DataFrame) -> dict:
     """
     Probability of chasing team winning at each venue.
     """
-    venue_bias = (
-        matches.assign(chase_win=matches["winner"] == matches["team2"])
-        .groupby("venue")["chase_win"]
-        .mean()
-        .to_dict()
-    )
+    venue_games, venue_chase_wins = compute_venue_record(matches)
 
-    return venue_bias
+    return venue_bias_from_record(venue_games, venue_chase_wins)
+
+
+def venue_bias_from_record(venue_games: dict, venue_chase_wins: dict) -> dict:
+    """
+    Turns games / chasing-win counts into chase win-rates.
+    """
+    return {
+        venue: venue_chase_wins.get(venue, 0) / games
+        for venue, games in venue_games.items()
+    }
 
 
 # ======================================================
@@ -61,6 +101,43 @@ def get_match_phase(over: float) -> str:
         return "death"
 
 
+# ======================================================
+# DATA LOADING
+# ======================================================
+def load_matches(matches_path: str = "data/matches.csv") -> pd.DataFrame:
+    """
+    Reads matches with normal results, names canonicalized.
+    """
+    matches = canonicalize_frame(pd.read_csv(matches_path))
+
+    return matches[matches["result"] == "normal"]
+
+
+def load_match_data(
+    matches_path: str = "data/matches.csv",
+    deliveries_path: str = "data/deliveries.csv",
+    validate: bool = True,
+) -> tuple:
+    """
+    Reads matches and deliveries, keeping only normal results.
+    Team, venue and city names are canonicalized (see entities.py).
+    Deliveries go through validate.py: bad rows are written to
+    <deliveries>_quarantine.csv and the rest get a legal_ball column.
+    The quarantine file is rewritten on every load, header only when
+    nothing was quarantined, the same as validate.py does.
+    """
+    matches = canonicalize_frame(pd.read_csv(matches_path))
+    deliveries = canonicalize_frame(pd.read_csv(deliveries_path))
+
+    if validate:
+        deliveries, quarantined, report = validate_deliveries(deliveries, matches)
+        quarantined.to_csv(quarantine_path(deliveries_path), index=False)
+        if len(quarantined):
+            print(f"⚠️  {summary(report)} -> {quarantine_path(deliveries_path)}")
+
+    return matches[matches["result"] == "normal"], deliveries
+
+
 # ======================================================
 # MOMENTUM FEATURES (USED IN TRAINING)
 # ======================================================
@@ -106,6 +183,107 @@ def compute_rates(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# ======================================================
+# SECOND-INNINGS TRAINING FEATURES
+# ======================================================
+# part of every on-disk feature cache key (evaluate.data_fingerprint):
+# bump it whenever build_chase_features changes its output
+FEATURE_VERSION = 2  # 2: legal-ball ball_number, sanity_filter, validated input
+
+
+def build_chase_features(
+    matches: pd.DataFrame,
+    deliveries: pd.DataFrame,
+    team_strength: dict,
+    venue_bias: dict,
+) -> pd.DataFrame:
+    """
+    Ball-by-ball second innings rows with every training feature
+    and the "win" label. Works on any subset of matches, so new
+    seasons can be featurised on their own.
+    """
+    deliveries = deliveries.copy()
+    deliveries["is_wicket"] = deliveries["player_dismissed"].notna().astype(int)
+
+    deliveries = deliveries.merge(
+        matches[["id", "venue", "team1", "team2", "winner"]],
+        left_on="match_id",
+        right_on="id",
+        how="inner"
+    )
+
+    # legal balls bowled so far; over * 6 + ball ran on after extras
+    if "legal_ball" in deliveries.columns:
+        deliveries["ball_number"] = deliveries["legal_ball"]
+    else:
+        deliveries["ball_number"] = legal_ball_counter(deliveries)
+    deliveries["current_score"] = (
+        deliveries.groupby("match_id")["total_runs"].cumsum()
+    )
+    deliveries["wickets_fallen"] = (
+        deliveries.groupby("match_id")["is_wicket"].cumsum()
+    )
+    deliveries["balls_remaining"] = 120 - deliveries["ball_number"]
+    deliveries["wickets_remaining"] = 10 - deliveries["wickets_fallen"]
+
+    first_innings_score = (
+        deliveries[deliveries["inning"] == 1]
+        .groupby("match_id")["current_score"]
+        .max()
+    )
+    deliveries = deliveries.merge(
+        first_innings_score.rename("first_innings_score"),
+        on="match_id",
+        how="left"
+    )
+
+    # Only second innings for win probability
+    deliveries = deliveries[deliveries["inning"] == 2].copy()
+
+    deliveries["target"] = deliveries["first_innings_score"] + 1
+    deliveries["runs_remaining"] = (
+        deliveries["target"] - deliveries["current_score"]
+    )
+
+    deliveries = compute_rates(deliveries)
+    deliveries = add_momentum_features(deliveries, windows=(6, 12))
+
+    deliveries["phase"] = np.select(
+        [deliveries["over"] < 6, deliveries["over"] < 15],
+        ["powerplay", "middle"],
+        default="death"
+    )
+
+    # categorical columns map once per category, not once per ball
+    deliveries["strength_diff"] = (
+        deliveries["batting_team"].map(team_strength).astype(float)
+        - deliveries["bowling_team"].map(team_strength).astype(float)
+    )
+    deliveries["venue_chase_bias"] = (
+        deliveries["venue"].map(venue_bias).astype(float)
+    )
+
+    deliveries["win"] = (
+        deliveries["batting_team"] == deliveries["winner"]
+    ).astype(int)
+
+    return sanity_filter(deliveries)
+
+
+def model_features(pipe) -> list:
+    """
+    Input columns a fitted preprocessing pipeline expects, in order.
+    """
+    prep = pipe.steps[0][1]
+
+    return [
+        col
+        for _, transformer, cols in prep.transformers_
+        if transformer != "drop"
+        for col in cols
+    ]
+
+
 # ======================================================
 # STREAMLIT INPUT PREPARATION (CRITICAL)
 # ======================================================
@@ -166,6 +344,92 @@ def prepare_streamlit_input(
     return pd.DataFrame([data])
 
 
+def build_state_frame(
+    batting_team,
+    bowling_team,
+    venue,
+    balls_bowled,
+    current_score,
+    wickets_fallen,
+    target,
+    team_strength: dict,
+    venue_bias: dict,
+    runs_last_6=0,
+    runs_last_12=0,
+    wkts_last_6=0,
+    wkts_last_12=0,
+) -> pd.DataFrame:
+    """
+    Vectorized prepare_streamlit_input: one row per match state,
+    every argument an array (or scalar) of equal length.
+    """
+    batting_team = pd.Series(batting_team)
+    bowling_team = pd.Series(bowling_team)
+    venue = pd.Series(venue)
+
+    ball_number = np.asarray(balls_bowled, dtype=float)
+    balls_remaining = np.maximum(120 - ball_number, 1)
+    current_score = np.asarray(current_score, dtype=float)
+    runs_remaining = np.asarray(target, dtype=float) - current_score
+
+    crr = current_score * 6 / np.maximum(ball_number, 1)
+    rrr = runs_remaining * 6 / balls_remaining
+
+    over = ball_number / 6
+
+    return pd.DataFrame({
+        "batting_team": batting_team,
+        "bowling_team": bowling_team,
+        "venue": venue,
+        "phase": np.select([over < 6, over < 15], ["powerplay", "middle"], default="death"),
+        "current_score": current_score,
+        "balls_remaining": balls_remaining,
+        "wickets_remaining": 10 - np.asarray(wickets_fallen),
+        "runs_remaining": runs_remaining,
+        "current_run_rate": crr,
+        "required_run_rate": rrr,
+        "pressure": rrr - crr,
+        "strength_diff": (
+            batting_team.map(team_strength).astype(float).fillna(0.5)
+            - bowling_team.map(team_strength).astype(float).fillna(0.5)
+        ).to_numpy(),
+        "venue_chase_bias": venue.map(venue_bias).astype(float).fillna(0.5).to_numpy(),
+        "runs_last_6": runs_last_6,
+        "runs_last_12": runs_last_12,
+        "wkts_last_6": wkts_last_6,
+        "wkts_last_12": wkts_last_12,
+    })
+
+
+# ======================================================
+# PREDICTION (SAFE FOR ALL MODELS)
+# ======================================================
+def predict_win_prob(model, X: pd.DataFrame, calibrated: bool = True) -> np.ndarray:
+    """
+    Batting team win probability for every row. Regressors
+    (linear_model.pkl) are clipped into [0, 1]. Models carrying a
+    calibration map (calibrate.py) are mapped through it unless
+    calibrated=False.
+    """
+    if hasattr(model, "predict_proba"):
+        p = model.predict_proba(X)[:, 1]
+    else:
+        p = np.clip(model.predict(X), 0, 1)
+
+    calibration = getattr(model, "calibration_", None)
+    if calibrated and calibration is not None:
+        p = apply_calibration(p, calibration)
+    return p
+
+
+def apply_calibration(p: np.ndarray, calibration: np.ndarray) -> np.ndarray:
+    """
+    Piecewise-linear map through (2, k) breakpoints: row 0 raw
+    probabilities (increasing), row 1 calibrated ones.
+    """
+    return np.interp(p, calibration[0], calibration[1])
+
+
 # ======================================================
 # DATA SANITY CHECK (SAFETY)
 # ======================================================
@@ -0,0 +1,212 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from entities import canonicalize_frame, encode
+
+
+# ======================================================
+# REASON CODES (ONE BIT EACH, A ROW MAY HAVE SEVERAL)
+# ======================================================
+REASONS = {
+    "missing_field": 1 << 0,      # match / inning / over / ball / runs / teams empty
+    "bad_inning": 1 << 1,         # not 1 or 2 and not a super over
+    "bad_over_ball": 1 << 2,      # over outside the 20 overs, ball < 1
+    "bad_runs": 1 << 3,           # negative, or total != batsman + extras
+    "duplicate": 1 << 4,          # same match / inning / over / ball again
+    "unknown_match": 1 << 5,      # match_id not in matches.csv
+    "team_mismatch": 1 << 6,      # teams are not the match's team1 / team2
+    "missing_innings": 1 << 7,    # a normal result with only one innings
+    "excess_balls": 1 << 8,       # more than 120 legal balls in an innings
+    "excess_wickets": 1 << 9,     # more than 10 dismissals in an innings
+}
+
+REQUIRED = ["match_id", "inning", "over", "ball", "total_runs", "batting_team", "bowling_team"]
+
+MAX_OVERS = 20
+MAX_WICKETS = 10
+
+
+def quarantine_path(deliveries_path: str) -> str:
+    return os.path.splitext(deliveries_path)[0] + "_quarantine.csv"
+
+
+# ======================================================
+# LEGAL-BALL COUNTER
+# ======================================================
+def legal_ball_counter(deliveries: pd.DataFrame, keep=None) -> np.ndarray:
+    """
+    Legal balls bowled in the innings up to and including each
+    delivery. Wides and no-balls do not count, so unlike
+    over * 6 + ball this never runs past 6 balls an over. Rows
+    where `keep` is False are not counted.
+    """
+    legal = np.ones(len(deliveries), dtype=bool)
+    for col in ("wide_runs", "noball_runs"):
+        if col in deliveries.columns:
+            legal &= deliveries[col].fillna(0).to_numpy() == 0
+    if keep is not None:
+        legal &= keep
+
+    counter = (
+        pd.Series(legal.astype(np.int16), index=deliveries.index)
+        .groupby([deliveries["match_id"], deliveries["inning"]])
+        .cumsum()
+    )
+    return counter.reindex(deliveries.index).fillna(0).to_numpy(np.int16)
+
+
+def _team_codes(values) -> np.ndarray:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy()
+    return encode(values, "team")
+
+
+def _in_order(df: pd.DataFrame) -> bool:
+    keys = [df[c].to_numpy() for c in ("match_id", "inning", "over", "ball")]
+    order = np.lexsort(keys[::-1])
+    return bool((order == np.arange(len(order))).all())
+
+
+# ======================================================
+# VALIDATION (ONE COLUMNAR PASS)
+# ======================================================
+def validate_deliveries(deliveries: pd.DataFrame, matches: pd.DataFrame) -> tuple:
+    """
+    Runs every check as a vectorized mask over the whole frame.
+    Returns (clean deliveries with a legal_ball column, quarantined
+    rows with a "reasons" column, report). `matches` should be the
+    full matches.csv, not only the normal results.
+    """
+    start = time.perf_counter()
+    df = deliveries
+    if len(df) and not _in_order(df):
+        df = df.sort_values(["match_id", "inning", "over", "ball"], kind="stable")
+
+    n = len(df)
+    flags = np.zeros(n, dtype=np.uint16)
+
+    def flag(reason, mask):
+        flags[np.asarray(mask, dtype=bool)] |= REASONS[reason]
+
+    match = df["match_id"].to_numpy()
+    inning = df["inning"].to_numpy()
+    over, ball = df["over"].to_numpy(), df["ball"].to_numpy()
+    runs = df["total_runs"].to_numpy()
+
+    flag("missing_field", df[[c for c in REQUIRED if c in df.columns]].isna().any(axis=1))
+
+    super_over = inning > 2
+    if "is_super_over" in df.columns:
+        super_over |= df["is_super_over"].fillna(0).to_numpy() == 1
+    flag("bad_inning", ~np.isin(inning, [1, 2]) & ~super_over)
+
+    # the Kaggle files count overs from 1; others from 0
+    base = 1 if n and np.nanmin(over) >= 1 else 0
+    flag("bad_over_ball", (over < base) | (over > base + MAX_OVERS - 1) | (ball < 1))
+
+    bad_runs = runs < 0
+    if {"batsman_runs", "extra_runs"} <= set(df.columns):
+        bad_runs |= runs != df["batsman_runs"].to_numpy() + df["extra_runs"].to_numpy()
+    flag("bad_runs", bad_runs)
+
+    duplicate = df.duplicated(["match_id", "inning", "over", "ball"], keep="first").to_numpy()
+    flag("duplicate", duplicate)
+
+    # every row against its match, by position in matches.csv
+    pos = pd.Index(matches["id"]).get_indexer(match)
+    known = pos >= 0
+    flag("unknown_match", ~known)
+
+    team1 = np.r_[_team_codes(matches["team1"]), -2][pos]
+    team2 = np.r_[_team_codes(matches["team2"]), -2][pos]
+    bat, bowl = _team_codes(df["batting_team"]), _team_codes(df["bowling_team"])
+    fits = ((bat == team1) & (bowl == team2)) | ((bat == team2) & (bowl == team1))
+    flag("team_mismatch", known & ~fits)
+
+    if "result" in matches.columns:
+        normal = np.r_[(matches["result"] == "normal").to_numpy(), False][pos]
+        has_first = np.isin(match, match[inning == 1])
+        has_second = np.isin(match, match[inning == 2])
+        flag("missing_innings", normal & ~(has_first & has_second))
+
+    # counters skip rows that are already bad, so one broken row
+    # does not shift the rest of its innings
+    usable = (flags & (REASONS["missing_field"] | REASONS["duplicate"])) == 0
+    legal_ball = legal_ball_counter(df, usable)
+    flag("excess_balls", (legal_ball > MAX_OVERS * 6) & ~super_over)
+
+    if "player_dismissed" in df.columns:
+        out = pd.Series((df["player_dismissed"].notna().to_numpy() & usable).astype(np.int16), index=df.index)
+        wickets = out.groupby([df["match_id"], df["inning"]]).cumsum().reindex(df.index).fillna(0)
+        flag("excess_wickets", wickets.to_numpy() > MAX_WICKETS)
+
+    bad = flags != 0
+    clean = df[~bad].assign(legal_ball=legal_ball[~bad])
+    quarantined = df[bad].assign(reasons=_reason_strings(flags[bad]))
+
+    seconds = time.perf_counter() - start
+    report = {
+        "rows": n,
+        "clean": int((~bad).sum()),
+        "quarantined": int(bad.sum()),
+        "reasons": {r: int(((flags & bit) != 0).sum()) for r, bit in REASONS.items()},
+        "seconds": seconds,
+        "rows_per_second": n / seconds if seconds else float("inf"),
+    }
+    return clean, quarantined, report
+
+
+def _reason_strings(flags: np.ndarray) -> np.ndarray:
+    # one string per distinct flag combination, not per row
+    combos, inverse = np.unique(flags, return_inverse=True)
+    text = np.array([
+        ";".join(r for r, bit in REASONS.items() if combo & bit) for combo in combos
+    ], dtype=object)
+    return text[inverse]
+
+
+def summary(report: dict) -> str:
+    found = ", ".join(f"{r} {c}" for r, c in report["reasons"].items() if c)
+    return (f"{report['quarantined']:,} of {report['rows']:,} deliveries quarantined"
+            f"{' (' + found + ')' if found else ''} in {report['seconds'] * 1000:.0f} ms")
+
+
+# ======================================================
+# MAIN
+# ======================================================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Validate deliveries.csv and quarantine bad rows with reason codes."
+    )
+    parser.add_argument("--matches", default="data/matches.csv")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--quarantine", default=None,
+                        help="side file for bad rows (default: <deliveries>_quarantine.csv)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matches = canonicalize_frame(pd.read_csv(args.matches))
+    deliveries = canonicalize_frame(pd.read_csv(args.deliveries))
+    read_seconds = time.perf_counter() - start
+
+    clean, quarantined, report = validate_deliveries(deliveries, matches)
+    path = args.quarantine or quarantine_path(args.deliveries)
+    quarantined.to_csv(path, index=False)
+
+    print(f"Read          : {len(deliveries):,} deliveries in {read_seconds:.1f}s")
+    print(f"Validate      : {report['seconds'] * 1000:.0f} ms "
+          f"({report['rows_per_second'] / 1e6:.1f}M rows/s)")
+    print(f"Clean         : {report['clean']:,}")
+    print(f"Quarantined   : {report['quarantined']:,} -> {path}")
+    for reason, count in report["reasons"].items():
+        if count:
+            print(f"  {reason:<16}{count:,}")
+    print(f"Legal balls   : max {clean['legal_ball'].max()} per innings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+'''
+Rebuilds pipe.pkl (the model behind app.py) from matches.csv and
+deliveries.csv without the notebook.
+
+Same steps and feature schema as "IPL Win Probability Predictor.ipynb"
+(batting_team, bowling_team, city, runs_left, balls_left, wickets,
+total_runs_x, cur_run_rate, req_run_rate), but every step is a
+vectorized column operation and all randomness is seeded.
+
+usage: python train_pipe.py [--matches matches.csv]
+                            [--deliveries deliveries.csv] [--output pipe.pkl]
+'''
+
+import argparse
+import os
+import pickle
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from sklearn import metrics
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+# the shared team / venue registry lives with the IPL engine
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'ketireddypallyvamshi05@gmail.com_IPL'))
+
+from entities import CORE_TEAMS, canonicalize_frame
+
+SEED = 1
+
+FEATURES = ['batting_team', 'bowling_team', 'city', 'runs_left',
+            'balls_left', 'wickets', 'total_runs_x', 'cur_run_rate',
+            'req_run_rate']
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    yield
+    print(f'{name:<24}{time.perf_counter() - start:8.3f}s')
+
+
+def build_dataset(matches, deliveries):
+    '''
+    One row per second innings delivery with the pipe.pkl features
+    and the result label (1 if the batting team won).
+    '''
+
+    # first innings total + 1 is the target
+
+    first_innings = deliveries[deliveries['inning'] == 1]
+    totalrun_df = (first_innings.groupby('match_id')['total_runs'].sum() + 1
+                   ).rename('total_runs_x').reset_index()
+
+    # only the eight regular franchises, no DL-method matches
+    # (Delhi Daredevils / Deccan Chargers are already folded into their
+    # current names by the registry)
+
+    match_df = matches.merge(totalrun_df, left_on='id', right_on='match_id')
+    match_df = match_df[match_df['team1'].isin(CORE_TEAMS)
+                        & match_df['team2'].isin(CORE_TEAMS)
+                        & (match_df['dl_applied'] == 0)]
+    match_df = match_df[['match_id', 'city', 'winner', 'total_runs_x']]
+
+    delivery_df = match_df.merge(
+        deliveries[deliveries['inning'] == 2], on='match_id')
+
+    grouped = delivery_df.groupby('match_id')
+
+    current_score = grouped['total_runs'].cumsum()
+    wickets_fallen = (delivery_df['player_dismissed'].notna()
+                      .groupby(delivery_df['match_id']).cumsum())
+
+    delivery_df['runs_left'] = delivery_df['total_runs_x'] - current_score
+    delivery_df['balls_left'] = 126 - (delivery_df['over'] * 6 + delivery_df['ball'])
+    delivery_df['wickets'] = 10 - wickets_fallen
+    delivery_df['cur_run_rate'] = (current_score * 6) / (120 - delivery_df['balls_left'])
+    delivery_df['req_run_rate'] = (delivery_df['runs_left'] * 6) / delivery_df['balls_left']
+    delivery_df['result'] = (delivery_df['batting_team']
+                             == delivery_df['winner']).astype(int)
+
+    final_df = delivery_df[FEATURES + ['result']]
+    final_df = final_df.replace([np.inf, -np.inf], np.nan).dropna()
+    final_df = final_df[final_df['balls_left'] != 0]
+
+    return final_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train pipe.pkl for app.py')
+    parser.add_argument('--matches', default='matches.csv')
+    parser.add_argument('--deliveries', default='deliveries.csv')
+    parser.add_argument('--output', default='pipe.pkl')
+    args = parser.parse_args()
+
+    total = time.perf_counter()
+
+    with stage('load csv'):
+        matches = pd.read_csv(args.matches)
+        deliveries = pd.read_csv(args.deliveries)
+
+    with stage('canonicalize names'):
+        matches = canonicalize_frame(matches)
+        deliveries = canonicalize_frame(deliveries)
+
+    with stage('build features'):
+        final_df = build_dataset(matches, deliveries)
+
+    print(f'{"rows":<24}{len(final_df):8d}')
+
+    X = final_df[FEATURES]
+    y = final_df['result']
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=SEED)
+
+    # batting team, bowling team and city are one-hot encoded
+
+    cf = ColumnTransformer(
+        transformers=[
+            ('trf', OneHotEncoder(sparse_output=False, drop='first'),
+             ['batting_team', 'bowling_team', 'city'])
+        ],
+        remainder='passthrough'
+    )
+
+    pipe = Pipeline(steps=[
+        ('step1', cf),
+        ('step2', LogisticRegression(solver='liblinear', random_state=SEED))
+    ])
+
+    with stage('fit'):
+        pipe.fit(X_train, y_train)
+
+    with stage('evaluate'):
+        accuracy = metrics.accuracy_score(y_test, pipe.predict(X_test))
+
+    with stage('save'):
+        with open(args.output, 'wb') as f:
+            pickle.dump(pipe, f)
+
+    print(f'{"accuracy":<24}{accuracy:8.4f}')
+    print(f'{"total":<24}{time.perf_counter() - total:8.3f}s')
+    print(f'saved {args.output}')
+
+
+if __name__ == '__main__':
+    main()